@@ -0,0 +1,149 @@
+"""
+Benchmarks for ArchiveFS.
+
+Builds a synthetic archive listing that is both deep (a long chain of
+nested directories) and wide (thousands of entries per directory),
+then times uncached ``inodeof()`` lookups and the existence checks
+used for collision detection. Also compares the memory used by the
+default and compact storage backends for a large archive.
+
+Run from the repository root with::
+
+    python -m benchmarks.archivefs
+"""
+
+import random
+import timeit
+import tracemalloc
+
+from skymodman.types.archivefs import ArchiveFS, CompactArchiveFS
+
+
+def synthetic_listing(depth=8, width=2000, seed=0):
+    """
+    Return a sorted list of archive entries describing a tree `depth`
+    directories deep, where every directory along the way also holds
+    `width` files and a handful of sibling directories.
+
+    :param int depth:
+    :param int width:
+    :param int seed: seed for the random name-case variations
+    """
+    rnd = random.Random(seed)
+    entries = []
+
+    base = ""
+    for level in range(depth):
+        for i in range(width):
+            name = f"File_{level}_{i}.dds"
+            # mix up the case a bit, like real archives do
+            if rnd.random() < 0.3:
+                name = name.upper()
+            entries.append(f"{base}{name}")
+        for j in range(8):
+            entries.append(f"{base}sibling{j}/placeholder.txt")
+        base += f"Level{level}/"
+
+    entries.sort(key=str.lower)
+    return entries
+
+
+def lookup_targets(listing, count=2000, seed=1):
+    """Choose `count` absolute paths (with scrambled case) to resolve."""
+    rnd = random.Random(seed)
+    return ["/" + rnd.choice(listing).swapcase() for _ in range(count)]
+
+
+def bench_inodeof(fs, targets, repeat=5):
+    """Time resolving every path in `targets` with a cold cache."""
+
+    def run():
+        fs.clearcaches("inodeof")
+        for t in targets:
+            fs.inodeof(t)
+
+    return min(timeit.repeat(run, number=1, repeat=repeat))
+
+
+def bench_collisions(fs, targets, repeat=5):
+    """Time existence checks for paths that do not exist."""
+    missing = [t + ".new" for t in targets]
+
+    def run():
+        fs.clearcaches("inodeof")
+        for t in missing:
+            fs.exists(t)
+
+    return min(timeit.repeat(run, number=1, repeat=repeat))
+
+
+def mod_listing(num_files=100000, seed=2):
+    """
+    Return a sorted listing resembling a large texture/mesh pack:
+    `num_files` files spread over a few hundred directories, with
+    plenty of repeated file and folder names.
+    """
+    rnd = random.Random(seed)
+    tops = ["textures", "meshes", "sound", "scripts", "interface"]
+    entries = set()
+
+    while len(entries) < num_files:
+        top = rnd.choice(tops)
+        sub = f"set{rnd.randrange(40)}/group{rnd.randrange(8)}"
+        entries.add(f"Data/{top}/{sub}/item{rnd.randrange(2000)}.dds")
+
+    return sorted(entries, key=str.lower)
+
+
+def bench_memory(fs_type, listing):
+    """
+    :return: the number of bytes allocated while building an
+        filesystem of type `fs_type` from `listing`
+    """
+    tracemalloc.start()
+    fs = fs_type.from_listing(listing)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del fs
+    return size
+
+
+def bench_glob(fs, pattern, repeat=5):
+    """
+    Time collecting every match for the glob `pattern`.
+
+    :return: (best time, number of matches)
+    """
+    def run():
+        return sum(1 for _ in fs.glob(pattern))
+
+    return (min(timeit.repeat(run, number=1, repeat=repeat)),
+            run())
+
+
+def main():
+    listing = synthetic_listing()
+    fs = ArchiveFS.from_listing(listing)
+    targets = lookup_targets(listing)
+
+    print(f"entries: {len(listing)}, lookups: {len(targets)}")
+    print(f"inodeof (uncached):   {bench_inodeof(fs, targets):.4f}s")
+    print(f"collision checks:     {bench_collisions(fs, targets):.4f}s")
+
+    listing = mod_listing()
+    print(f"memory, {len(listing)} entries:")
+    for fs_type in (ArchiveFS, CompactArchiveFS):
+        size = bench_memory(fs_type, listing)
+        print(f"  {fs_type.__name__+':':20} {size / 2**20:7.1f} MiB "
+              f"({size / len(listing):.0f} bytes/entry)")
+
+    fs = ArchiveFS.from_listing(listing)
+    print(f"glob, {len(listing)} entries:")
+    for pattern in ("**/*.esp", "**/*.dds", "data/textures/**/item1*.dds"):
+        elapsed, found = bench_glob(fs, pattern)
+        print(f"  {pattern:28} {elapsed:.4f}s ({found} matches)")
+
+
+if __name__ == '__main__':
+    main()
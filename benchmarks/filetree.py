@@ -0,0 +1,145 @@
+"""
+Benchmarks for building a mod's file tree.
+
+Compares building a tree of FSItems for a very large mod the old way
+(a PurePath for every row, inserted into a nested AutoTree, which is
+then walked to create the items) against ``FSItem.build_filetree()``,
+which creates the items directly from the sorted list of paths in a
+single pass. Reports the best build time for each, the peak memory
+allocated while building, and the memory still held afterwards (for
+the old way, that includes the cached AutoTree).
+
+Run from the repository root with::
+
+    python -m benchmarks.filetree
+"""
+
+import gc
+import random
+import timeit
+import tracemalloc
+from itertools import count
+from os.path import join
+from pathlib import PurePath
+
+from skymodman.types import FSItem
+from skymodman.utils import tree as _tree
+
+
+def mod_rows(num_files=60000, seed=3):
+    """
+    Return the sorted paths of `num_files` files in a mod laid out
+    like a large texture/mesh pack. They are encoded, so that (as
+    when reading them from the database) a new string is created for
+    each row during the build; see ``fetch()``.
+    """
+    rnd = random.Random(seed)
+    tops = ["textures", "meshes", "sound/fx", "Scripts", "Interface"]
+    rows = set()
+
+    while len(rows) < num_files:
+        top = rnd.choice(tops)
+        sub = "/".join(f"sub{rnd.randrange(12)}"
+                       for _ in range(rnd.randrange(1, 4)))
+        name = f"file{rnd.randrange(5000)}.dds"
+        # mix up the case a bit, like real mods do
+        if rnd.random() < 0.3:
+            name = name.capitalize()
+        rows.add(f"{top}/{sub}/{name}")
+
+    return [r.encode() for r in sorted(rows)]
+
+
+def fetch(rows):
+    """Yield each row as a new str, like an sqlite cursor"""
+    return (r.decode() for r in rows)
+
+
+##=============================================
+## The old way
+##=============================================
+
+def legacy_tree(rows):
+    """DB rows -> PurePath -> AutoTree, as get_mod_file_tree did"""
+    ftree = _tree.Tree()
+    for f in rows:
+        fpath = PurePath(f)
+        ftree.insert(fpath.parts[:-1], fpath.name)
+    return ftree
+
+
+def legacy_build(item, file_tree):
+    """The former recursive FSItem._build_tree()"""
+    row = count()
+    for dirs, files in file_tree.walk(recurse=False):
+        for d in dirs:
+            child = FSItem(join(item.path, d), d, item, True)
+            legacy_build(child, file_tree[d])
+            child.row = next(row)
+            item.children.append(child)
+            item._childnames.append(child.name)
+
+        for f in files:
+            child = FSItem(join(item.path, f), f, item, False)
+            child.row = next(row)
+            item.children.append(child)
+            item._childnames.append(child.name)
+
+
+def build_legacy(rows):
+    root = FSItem("", "data")
+    # get_mod_file_tree() was lru-cached, so the AutoTree stayed in
+    # memory along with the items
+    ftree = legacy_tree(fetch(rows))
+    legacy_build(root, ftree)
+    # the flattened list of files the model used to make afterwards
+    files = [f for f in root.iterchildren(True) if not f.isdir]
+    return root, files, ftree
+
+
+def build_single_pass(rows):
+    root = FSItem("", "data")
+    files = FSItem.build_filetree(root, fetch(rows))
+    return root, files
+
+
+##=============================================
+## Measurements
+##=============================================
+
+def bench_time(build, rows, repeat=3):
+    return min(timeit.repeat(lambda: build(rows), number=1,
+                             repeat=repeat))
+
+
+def bench_memory(build, rows):
+    """
+    :return: (peak bytes allocated while building, bytes still
+        allocated once the build is finished)
+    """
+    gc.collect()
+    tracemalloc.start()
+    result = build(rows)
+    gc.collect()
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    del result
+    return peak, kept
+
+
+def main():
+    rows = mod_rows()
+    print(f"files: {len(rows)}")
+
+    for label, build in (("AutoTree + walk:", build_legacy),
+                         ("single pass:", build_single_pass)):
+        elapsed = bench_time(build, rows)
+        peak, kept = bench_memory(build, rows)
+        print(f"  {label:18} {elapsed:.4f}s, "
+              f"peak {peak / 2**20:6.1f} MiB, "
+              f"tree {kept / 2**20:6.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""
+End-to-end benchmarks for the hot paths of loading a profile and
+installing a mod, run against a synthetic installation (see
+``benchmarks.synthetic``) without any of the GUI.
+
+Times, using the real managers:
+
+    * finding every file in the Skyrim Data and Mods folders and
+      adding them to the database (``find_all_mod_files``)
+    * detecting file conflicts among the mods
+    * loading the saved mod list (``load_saved_modlist``)
+    * validating the mod list against the Mods folder
+    * moving blocks of mods around in a ModCollection
+    * building ArchiveFS filesystems from a listing of every mod file
+    * parsing a large FOMOD config
+
+The results are written as JSON (to stdout, or the file given with
+``--output``) so that runs can be compared; pass the file from an
+earlier run with ``--baseline`` to print how each time has changed.
+
+Run from the repository root with::
+
+    python -m benchmarks.suite --mods 2000 --output results.json
+"""
+
+import argparse
+import json
+import logging
+import platform
+import random
+import sys
+import tempfile
+import time
+from statistics import median
+
+from skymodman.log import withlogger
+from skymodman.managers.collection import ModCollectionManager
+from skymodman.managers.database import DBManager
+from skymodman.managers.disk import IOManager
+from skymodman.managers.modmanager import ModManager
+from skymodman.installer.fomodconfig import parse_config
+from skymodman.types import AppFolder, ModCollection
+from skymodman.types.archivefs import ArchiveFS, CompactArchiveFS
+
+from benchmarks import synthetic
+
+
+@withlogger
+class BenchManager:
+    """
+    Takes the place of ModManager for the submanagers being measured:
+    it holds the folders, the list of mod folders and the submanagers
+    themselves, and borrows ModManager's own code for the operations
+    that are done there rather than in a submanager.
+    """
+
+    Folders = ModManager.Folders
+    IO = ModManager.IO
+    managed_mod_folders = ModManager.managed_mod_folders
+
+    refresh_modlist = ModManager.refresh_modlist
+    find_all_mod_files = ModManager.find_all_mod_files
+
+    def __init__(self, install):
+        """
+        :param synthetic.Install install:
+        """
+        self._folders = {
+            "skyrim": AppFolder("skyrim", "Skyrim", install.skyrim),
+            "mods": AppFolder("mods", "Mods", install.mods),
+        }
+
+        self._ioman = IOManager(mcp=self)
+        self._dbman = DBManager(mcp=self)
+        self._collman = ModCollectionManager(mcp=self)
+
+        self.refresh_modlist(self._folders["mods"])
+
+
+def timed(run, setup=None, repeat=3):
+    """
+    Call `run` `repeat` times, calling `setup` (if given) before each
+    call, untimed, and passing `run` whatever it returns (unless that
+    is None).
+
+    :return: dict with the best, median and individual times (in
+        seconds), and the result of the last call to `run` as
+        'result'
+    """
+    times = []
+    result = None
+    for _ in range(repeat):
+        arg = setup() if setup else None
+        args = () if arg is None else (arg,)
+        start = time.perf_counter()
+        result = run(*args)
+        times.append(time.perf_counter() - start)
+
+    return {"best": min(times), "median": median(times),
+            "runs": times, "result": result}
+
+
+##=============================================
+## Benchmarks
+##=============================================
+
+def bench_find_files(mgr, repeat):
+    def setup():
+        mgr._dbman.reinit(mods=False, hidden=False)
+        # make the Skyrim Data folder be walked again, too
+        mgr._ioman._vanilla_mod_info = []
+
+    def run():
+        mgr.find_all_mod_files()
+        return mgr._dbman.conn.execute(
+            "SELECT COUNT(*) FROM modfiles").fetchone()[0]
+
+    res = timed(run, setup, repeat)
+    res["rows"] = res.pop("result")
+    return res
+
+
+def bench_conflicts(mgr, repeat):
+    """Run after bench_find_files(), which fills the database"""
+    res = timed(mgr._dbman.detect_file_conflicts, repeat=repeat)
+    conflicts = res.pop("result")
+    res["conflicting_files"] = len(conflicts.by_file)
+    res["mods_with_conflicts"] = len(conflicts.by_mod)
+    return res
+
+
+def bench_load_modlist(mgr, install, repeat):
+    def run(container):
+        mgr._ioman.load_saved_modlist(install.modinfo, container)
+        return len(container)
+
+    res = timed(run, ModCollection, repeat)
+    res["mods"] = res.pop("result")
+    return res
+
+
+def bench_validate(mgr, install, repeat):
+    collman = mgr._collman
+
+    def setup():
+        collman.reset()
+        mgr._ioman.load_saved_modlist(install.modinfo,
+                                      collman.collection)
+        return mgr.managed_mod_folders
+
+    res = timed(collman.validate_mods, setup, repeat)
+    cleared, found, _ = res.pop("result")
+    res["errors"] = found
+    return res
+
+
+def bench_moves(mgr, install, repeat, num_moves=2000, seed=4):
+    """Move random blocks of 1-5 mods to random places"""
+    entries = ModCollection()
+    mgr._ioman.load_saved_modlist(install.modinfo, entries)
+    entries = list(entries)
+    size = len(entries)
+
+    rnd = random.Random(seed)
+    moves = []
+    while size > 5 and len(moves) < num_moves:
+        count = rnd.randint(1, 5)
+        old, new = (rnd.randrange(size - count + 1) for _ in range(2))
+        if old != new:
+            moves.append((old, new, count))
+
+    def run(coll):
+        for old, new, count in moves:
+            coll.move(old, new, count)
+
+    res = timed(run, lambda: ModCollection(entries), repeat)
+    del res["result"]
+    res["moves"] = len(moves)
+    return res
+
+
+def bench_archivefs(install, repeat):
+    """Build filesystems from a listing of every file in the Mods
+    folder, as though it were one huge archive"""
+    mods = install.mods
+    listing = sorted((str(p.relative_to(mods))
+                      for p in mods.rglob("*") if p.is_file()),
+                     key=str.lower)
+
+    results = {}
+    for fs_type in (ArchiveFS, CompactArchiveFS):
+        res = timed(fs_type.from_listing, lambda: listing, repeat)
+        del res["result"]
+        res["entries"] = len(listing)
+        results[fs_type.__name__] = res
+    return results
+
+
+def bench_fomod(install, repeat):
+    res = timed(parse_config, lambda: str(install.fomod_config),
+                repeat)
+    config = res.pop("result")
+    res["steps"] = len(config.installsteps)
+    return res
+
+
+def run_suite(install, repeat=3):
+    """
+    Run every benchmark against the generated `install`.
+
+    :rtype: dict
+    """
+    mgr = BenchManager(install)
+
+    results = {
+        "find_all_mod_files": bench_find_files(mgr, repeat),
+        "detect_file_conflicts": bench_conflicts(mgr, repeat),
+        "load_saved_modlist": bench_load_modlist(mgr, install, repeat),
+        "validate_mods": bench_validate(mgr, install, repeat),
+        "modcollection_moves": bench_moves(mgr, install, repeat),
+        "fomod_parse": bench_fomod(install, repeat),
+    }
+    for name, res in bench_archivefs(install, repeat).items():
+        results[f"archivefs_build.{name}"] = res
+
+    return results
+
+
+def compare(results, baseline):
+    """
+    :return: lines describing the change in the best time of each
+        benchmark in `results` from that in `baseline`
+    """
+    lines = []
+    for name, res in results.items():
+        try:
+            before = baseline["results"][name]["best"]
+        except KeyError:
+            continue
+        lines.append(f"{name:34} {before:9.4f}s -> {res['best']:9.4f}s "
+                     f"({before / res['best']:5.2f}x)")
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Time the mod manager's hot paths against a "
+                    "synthetic installation.")
+    synthetic.add_install_arguments(parser)
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="times to run each benchmark "
+                             "(default: %(default)s)")
+    parser.add_argument("--output", "-o",
+                        help="write the results to this file instead "
+                             "of stdout")
+    parser.add_argument("--baseline",
+                        help="results of an earlier run to compare "
+                             "against")
+    args = parser.parse_args()
+
+    # the managers log plenty (including warnings about the errors
+    # the synthetic mod list contains on purpose); that isn't what
+    # we're measuring
+    logging.disable(logging.WARNING)
+
+    options = synthetic.install_options(args)
+
+    with tempfile.TemporaryDirectory(prefix="skymodman-bench-",
+                                     dir=synthetic.default_root()) as root:
+        start = time.perf_counter()
+        install = synthetic.generate_install(root, **options)
+        print(f"generated {install.num_mods} mods, {install.num_files} "
+              f"files in {time.perf_counter() - start:.1f}s",
+              file=sys.stderr)
+
+        results = run_suite(install, args.repeat)
+
+    report = {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "install": dict(options, num_files=install.num_files),
+        "repeat": args.repeat,
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=1)
+    else:
+        json.dump(report, sys.stdout, indent=1)
+        print()
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print("\n".join(compare(results, baseline)), file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
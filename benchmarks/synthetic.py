@@ -0,0 +1,312 @@
+"""
+Generator for a synthetic Skyrim installation and Mods folder.
+
+Builds, under a given root directory::
+
+    Skyrim/Data/        the vanilla masters and archives, a few DLC
+                        and some loose files
+    Mods/<mod>/...      `num_mods` mod folders of `files_per_mod`
+                        (empty) files each, some with a meta.ini
+    modinfo.json        a saved mod list for those mods, in a random
+                        order, with a few mods left off and a few
+                        listed that aren't on disk
+    ModuleConfig.xml    a large FOMOD installer config
+
+A share of each mod's files (`conflict_ratio`) is drawn from a pool
+of paths common to all mods, so they conflict with other mods; the
+case of folder and file names is varied (`case_ratio`) as it is in
+real mods. Everything is seeded, so the same arguments always produce
+the same installation.
+
+Used by ``benchmarks.suite``; can also be run on its own::
+
+    python -m benchmarks.synthetic /path/to/root --mods 500
+"""
+
+import argparse
+import json
+import os
+import random
+import tempfile
+from collections import namedtuple
+from pathlib import Path
+
+from skymodman.constants import SkyrimGameInfo as skyinfo
+from skymodman.types import ModEntry
+
+Install = namedtuple("Install",
+                     "root skyrim mods modinfo fomod_config "
+                     "num_mods num_files")
+Install.__doc__ = """
+Paths and sizes of a generated installation.
+
+    * root: the directory it was generated in
+    * skyrim: the Skyrim installation folder (contains 'Data')
+    * mods: the mod-storage folder
+    * modinfo: the saved mod list
+    * fomod_config: the FOMOD ModuleConfig.xml file
+    * num_mods: number of mod folders created
+    * num_files: number of files created in the mod folders
+"""
+
+# top-level folders of mod files, with the extension of their files
+_TOPS = (("textures", ".dds"), ("meshes", ".nif"), ("sound/fx", ".wav"),
+         ("scripts", ".pex"), ("interface", ".swf"))
+
+_WORDS = ("Better", "Immersive", "Armor", "Weapons", "Textures", "HD",
+          "Lanterns", "Patch", "Overhaul", "Cities", "Quest", "Fixes",
+          "Lighting", "Flora", "Water", "Sounds", "Unofficial", "Dragon")
+
+
+def default_root():
+    """
+    A directory on tmpfs to generate installations in, so that disk
+    speed doesn't swamp what's being measured; None (the system's
+    default temp directory) if there isn't one.
+    """
+    shm = "/dev/shm"
+    if os.path.isdir(shm) and os.access(shm, os.W_OK):
+        return shm
+    return None
+
+
+def generate_install(root, num_mods=500, files_per_mod=100,
+                     conflict_ratio=0.2, case_ratio=0.3,
+                     meta_ratio=0.5, error_ratio=0.01, seed=0):
+    """
+    Generate a synthetic installation in the (existing, preferably
+    empty) directory `root`.
+
+    :param str|Path root:
+    :param int num_mods: number of mod folders to create
+    :param int files_per_mod: number of files in each mod
+    :param float conflict_ratio: share of each mod's files that come
+        from the pool of paths shared by all mods
+    :param float case_ratio: chance of a file or folder name having
+        its case changed
+    :param float meta_ratio: share of mods with a meta.ini file
+    :param float error_ratio: share of mods left off the saved mod
+        list, and (separately) of entries in the list without a folder
+    :param int seed:
+    :rtype: Install
+    """
+    rnd = random.Random(seed)
+    root = Path(root)
+
+    skyrim = root / "Skyrim"
+    mods = root / "Mods"
+
+    _make_game_data(skyrim / "Data", rnd, case_ratio)
+
+    # paths that several mods will contain
+    pool = [_mod_path(rnd, f"shared{i}")
+            for i in range(max(files_per_mod * 5, 1))]
+
+    dirnames = []
+    num_files = 0
+    for m in range(num_mods):
+        dirname = f"{m:05d} {' '.join(rnd.sample(_WORDS, 3))}"
+        mod_dir = mods / dirname
+        dirnames.append(dirname)
+
+        num_shared = int(files_per_mod * conflict_ratio)
+        paths = set(rnd.sample(pool, min(num_shared, len(pool))))
+        i = 0
+        while len(paths) < files_per_mod:
+            paths.add(_mod_path(rnd, f"mod{m}_{i}"))
+            i += 1
+
+        # keep the case of each folder the same within a mod; on
+        # a case-sensitive filesystem, varying it would make new folders
+        cased = {}
+        for p in paths:
+            parts = [cased.setdefault(d, _vary_case(rnd, d, case_ratio))
+                     for d in p.split("/")[:-1]]
+            parts.append(_vary_case(rnd, p.rsplit("/", 1)[-1],
+                                    case_ratio))
+            _touch(mod_dir.joinpath(*parts))
+        num_files += len(paths)
+
+        if rnd.random() < meta_ratio:
+            (mod_dir / "meta.ini").write_text(
+                "[General]\n"
+                f"modid={rnd.randrange(1, 80000)}\n"
+                f"version={rnd.randrange(1, 10)}.{rnd.randrange(100)}\n")
+
+    modinfo = root / "modinfo.json"
+    _write_modinfo(modinfo, dirnames, rnd, error_ratio)
+
+    fomod_config = root / "ModuleConfig.xml"
+    fomod_config.write_bytes(fomod_xml(seed=seed))
+
+    return Install(root, skyrim, mods, modinfo, fomod_config,
+                   num_mods, num_files)
+
+
+def fomod_xml(num_steps=20, groups_per_step=5, plugins_per_group=10,
+              seed=0):
+    """
+    :return: the contents of a FOMOD ModuleConfig.xml with the given
+        number of install steps, option groups per step and plugins
+        per group. Each plugin installs a few files and sets a flag
+        that later steps and the conditional installs depend on.
+    :rtype: bytes
+    """
+    rnd = random.Random(seed)
+    out = ['<?xml version="1.0" encoding="utf-8"?>\n<config>',
+           '<moduleName>Synthetic Installer</moduleName>',
+           '<moduleImage path="fomod\\images\\main.png"/>',
+           '<moduleDependencies operator="And">'
+           '<fileDependency file="Skyrim.esm" state="Active"/>'
+           '</moduleDependencies>',
+           '<requiredInstallFiles>'
+           '<folder source="Core" destination=""/>'
+           '</requiredInstallFiles>',
+           '<installSteps order="Explicit">']
+
+    flags = []
+    for s in range(num_steps):
+        out.append(f'<installStep name="Step {s}">')
+        if flags:
+            out.append('<visible><dependencies operator="Or">'
+                       f'<flagDependency flag="{rnd.choice(flags)}" '
+                       'value="On"/></dependencies></visible>')
+        out.append('<optionalFileGroups order="Explicit">')
+
+        for g in range(groups_per_step):
+            out.append(f'<group name="Group {s}.{g}" '
+                       'type="SelectExactlyOne"><plugins order="Explicit">')
+            for p in range(plugins_per_group):
+                flag = f"opt_{s}_{g}_{p}"
+                flags.append(flag)
+                out.append(
+                    f'<plugin name="Option {p}">'
+                    f'<description>Option {p} of group {g} in step {s}.'
+                    '</description>'
+                    f'<image path="fomod\\images\\{flag}.jpg"/>'
+                    '<files>'
+                    f'<folder source="Options\\{flag}" destination=""/>'
+                    f'<file source="Plugins\\{flag}.esp" priority="{p}"/>'
+                    '</files>'
+                    f'<conditionFlags><flag name="{flag}">On</flag>'
+                    '</conditionFlags>'
+                    '<typeDescriptor><type name="Optional"/>'
+                    '</typeDescriptor></plugin>')
+            out.append('</plugins></group>')
+
+        out.append('</optionalFileGroups></installStep>')
+
+    out.append('</installSteps><conditionalFileInstalls><patterns>')
+    for flag in rnd.sample(flags, min(len(flags), 100)):
+        out.append('<pattern><dependencies>'
+                   f'<flagDependency flag="{flag}" value="On"/>'
+                   '</dependencies>'
+                   f'<files><file source="Patches\\{flag}.esp"/></files>'
+                   '</pattern>')
+    out.append('</patterns></conditionalFileInstalls></config>')
+
+    return "\n".join(out).encode()
+
+
+# <editor-fold desc="helpers">
+
+def _make_game_data(data, rnd, case_ratio):
+    """The vanilla files (all present), the first three DLC, and some
+    loose files in the Skyrim Data folder"""
+    names = [*skyinfo.masters, *skyinfo.skyrim_archives]
+    for dlc in skyinfo.all_dlc[:3]:
+        names += [dlc + ".esm", dlc + ".bsa"]
+    names += [_mod_path(rnd, f"loose{i}") for i in range(50)]
+
+    for name in names:
+        _touch(data / _vary_case(rnd, name, case_ratio))
+
+
+def _mod_path(rnd, stem):
+    """A random path for a file in a mod"""
+    top, ext = rnd.choice(_TOPS)
+    subs = "/".join(f"{rnd.choice(_WORDS).lower()}{rnd.randrange(4)}"
+                    for _ in range(rnd.randrange(1, 4)))
+    return f"{top}/{subs}/{stem}{ext}"
+
+
+def _vary_case(rnd, name, ratio):
+    """Maybe change the case of `name`"""
+    if rnd.random() < ratio:
+        return rnd.choice((str.upper, str.title, str.swapcase))(name)
+    return name
+
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.touch()
+
+
+def _write_modinfo(path, dirnames, rnd, error_ratio):
+    """Save a mod list for `dirnames` as IOManager would, in a random
+    order, leaving off some mods and adding some that don't exist"""
+    listed = [d for d in dirnames if rnd.random() >= error_ratio]
+    listed += [f"Missing Mod {i}"
+               for i in range(int(len(dirnames) * error_ratio))]
+    rnd.shuffle(listed)
+
+    entries = [dict(zip(ModEntry._fields,
+                        (d, d, 0, "", int(rnd.random() < 0.9), 1)))
+               for d in listed]
+
+    with open(path, "w") as f:
+        json.dump(entries, f, indent=1)
+
+# </editor-fold>
+
+
+def add_install_arguments(parser):
+    """Add the options of ``generate_install()`` to an ArgumentParser"""
+    parser.add_argument("--mods", type=int, default=500,
+                        help="number of mods (default: %(default)s)")
+    parser.add_argument("--files-per-mod", type=int, default=100,
+                        help="files in each mod (default: %(default)s)")
+    parser.add_argument("--conflict-ratio", type=float, default=0.2,
+                        help="share of each mod's files that may "
+                             "conflict (default: %(default)s)")
+    parser.add_argument("--case-ratio", type=float, default=0.3,
+                        help="chance of a name's case being changed "
+                             "(default: %(default)s)")
+    parser.add_argument("--meta-ratio", type=float, default=0.5,
+                        help="share of mods with a meta.ini "
+                             "(default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0)
+
+
+def install_options(args):
+    """The keyword arguments for ``generate_install()`` from parsed
+    command-line `args`"""
+    return dict(num_mods=args.mods,
+                files_per_mod=args.files_per_mod,
+                conflict_ratio=args.conflict_ratio,
+                case_ratio=args.case_ratio,
+                meta_ratio=args.meta_ratio,
+                seed=args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate a synthetic Skyrim installation and "
+                    "Mods folder.")
+    parser.add_argument("root", nargs="?",
+                        help="directory to generate in (default: a new "
+                             "temporary directory, on tmpfs if possible)")
+    add_install_arguments(parser)
+    args = parser.parse_args()
+
+    root = args.root or tempfile.mkdtemp(prefix="skymodman-bench-",
+                                         dir=default_root())
+    os.makedirs(root, exist_ok=True)
+
+    install = generate_install(root, **install_options(args))
+    print(f"{install.num_mods} mods, {install.num_files} files "
+          f"in {install.root}")
+
+
+if __name__ == '__main__':
+    main()
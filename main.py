@@ -4,7 +4,7 @@ import sys
 import asyncio
 
 # from skymodman.managers import modmanager
-from skymodman import constants, log, register_manager
+from skymodman import constants, log, metrics, register_manager
 
 # module-level QApplication reference
 app = None
@@ -60,6 +60,8 @@ def main():
             loop.run_forever()
     finally:
         mmanager.DB.shutdown()
+        if metrics.is_enabled():
+            metrics.log_report()
         log.stop_listener()
     # from skymodman import skylog
     # MM = ModManager()
@@ -65,6 +65,7 @@ class EnvVars(str, Enum):
     USE_QT  = "SMM_QTGUI"
     VFS_MOUNT = "SMM_VFS"
     SKYDIR = "SMM_SKYRIMDIR"
+    METRICS = "SMM_METRICS"
 
 ##=============================================
 ## Flags
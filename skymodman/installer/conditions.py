@@ -0,0 +1,208 @@
+"""
+Evaluation of the dependency patterns in a fomod config.
+
+The states of the files a config refers to cannot change while the
+installer is running, so those parts of each condition are worked out
+just once, from a snapshot. Only the condition flags set by the
+user's choices can change; each compiled condition records which
+flags it reads, so that when one changes, only the conditions that
+depend on it have to be checked again.
+"""
+
+from collections import namedtuple, defaultdict
+
+from skymodman.installer.common import Operator, FileState
+
+__all__ = ["ConditionEvaluator", "Condition", "iter_dependencies",
+           "referenced_files"]
+
+
+# operator: And/Or
+# constant: the combined result of every part of the condition that
+#     does not depend on a flag
+# flagdeps: tuple of (flag, value) pairs still to be checked; empty
+#     if `constant` alone determines the result
+# flags: names of the flags in flagdeps
+Condition = namedtuple("Condition", "operator constant flagdeps flags")
+
+
+def iter_dependencies(config):
+    """
+    Yield every Dependencies object found in a parsed fomod config.
+
+    :param skymodman.installer.fomodconfig.FomodConfig config:
+    """
+    if config.moddeps:
+        yield config.moddeps
+
+    for pattern in config.condinstalls:
+        if pattern.dependencies:
+            yield pattern.dependencies
+
+    for step in config.installsteps:
+        if step.visible:
+            yield step.visible
+        for group in step.optionalFileGroups:
+            for plugin in group.plugins:
+                for pattern in plugin.patterns:
+                    if pattern.dependencies:
+                        yield pattern.dependencies
+
+
+def referenced_files(config):
+    """
+    :return: the set of all file paths whose state is checked by any
+        condition in `config`
+    """
+    return {fd.file
+            for deps in iter_dependencies(config)
+            for fd in deps.fileDependency}
+
+
+class ConditionEvaluator:
+    """
+    Compiles and evaluates ``common.Dependencies`` objects against a
+    fixed snapshot of file states and a changing set of flags.
+    The result for each condition is kept until one of the flags it
+    depends on is changed through ``set_flag()`` or ``unset_flag()``.
+    """
+
+    def __init__(self, file_states=None):
+        """
+
+        :param dict[str, FileState] file_states: maps lower-cased
+            file paths to their state; any file not present is
+            considered Missing
+        """
+        self.file_states = file_states or {}
+
+        # current value of each set condition flag
+        self.flags = {}
+
+        # Dependencies -> Condition
+        self._compiled = {}
+
+        # Dependencies -> last computed result
+        self._results = {}
+
+        # flag name -> Dependencies objects that read it
+        self._dependents = defaultdict(set)
+
+    def file_state(self, path):
+        """
+        :return: the recorded state of the file at `path`
+        :rtype: FileState
+        """
+        return self.file_states.get(path.lower(), FileState.M)
+
+    ##===============================================
+    ## Compilation
+    ##===============================================
+
+    def compile(self, dependencies):
+        """
+        Reduce `dependencies` to a Condition, evaluating now all the
+        parts of it that do not depend on a flag.
+
+        :param skymodman.installer.common.Dependencies dependencies:
+        :rtype: Condition
+        """
+        try:
+            return self._compiled[dependencies]
+        except KeyError:
+            pass
+
+        is_and = dependencies.operator is Operator.AND
+
+        # game and fomm version checks don't really apply to us, so
+        # they are always considered satisfied
+        static = [self.file_state(fd.file) is fd.state
+                  for fd in dependencies.fileDependency]
+        if dependencies.gameDependency:
+            static.append(True)
+        if dependencies.fommDependency:
+            static.append(True)
+
+        constant = all(static) if is_and else any(static)
+        flagdeps = tuple(dependencies.flagDependency)
+
+        # if the static part already decides it, the flags don't matter
+        if constant is not is_and:
+            flagdeps = ()
+
+        cond = Condition(dependencies.operator, constant, flagdeps,
+                         frozenset(f for f, _ in flagdeps))
+
+        self._compiled[dependencies] = cond
+        for flag in cond.flags:
+            self._dependents[flag].add(dependencies)
+
+        return cond
+
+    ##===============================================
+    ## Evaluation
+    ##===============================================
+
+    def evaluate(self, dependencies):
+        """
+        :param skymodman.installer.common.Dependencies dependencies:
+        :return: whether the condition described by `dependencies` is
+            currently satisfied
+        """
+        try:
+            return self._results[dependencies]
+        except KeyError:
+            result = self._results[dependencies] = self._evaluate(
+                self.compile(dependencies))
+            return result
+
+    def _evaluate(self, cond):
+        if not cond.flagdeps:
+            return cond.constant
+
+        flags = self.flags
+        checks = (f in flags and flags[f] == v for f, v in cond.flagdeps)
+
+        if cond.operator is Operator.AND:
+            return all(checks)
+        return any(checks)
+
+    def set_flag(self, flag, value):
+        """
+        Set condition flag `flag` to `value` and re-evaluate the
+        conditions that depend on it.
+
+        :return: the Dependencies whose result changed
+        :rtype: list
+        """
+        if flag in self.flags and self.flags[flag] == value:
+            return []
+        self.flags[flag] = value
+        return self._flag_changed(flag)
+
+    def unset_flag(self, flag):
+        """
+        Remove condition flag `flag` and re-evaluate the conditions
+        that depend on it.
+
+        :return: the Dependencies whose result changed
+        :rtype: list
+        """
+        if flag not in self.flags:
+            return []
+        del self.flags[flag]
+        return self._flag_changed(flag)
+
+    def _flag_changed(self, flag):
+        changed = []
+        results = self._results
+
+        for deps in self._dependents.get(flag, ()):
+            # if it was never evaluated, there's nothing to update
+            if deps in results:
+                new = self._evaluate(self._compiled[deps])
+                if new != results[deps]:
+                    results[deps] = new
+                    changed.append(deps)
+
+        return changed
@@ -1,275 +1,89 @@
-from itertools import chain
+import hashlib
+import os
 
 from skymodman.installer.common import *
-from skymodman.installer.element import Element
-from skymodman.thirdparty.untangle import untangle
-from skymodman.types.color import Color
-
-
-dep_checks = {
-    # key is dependency type
-    # s=self, d=dependency item
-    "fileDependency": lambda s, d: s.check_file(d.file,
-                                                d.state),
-    "flagDependency": lambda s, d: s.check_flag(d.flag,
-                                                d.value),
-    "gameDependency": lambda s, d: s.check_game_version(d),
-    "fommDependency": lambda s, d: s.check_fomm_version(d),
-}
-"""determine which "check_*" method to invoke based on dep. type"""
-
-# map operators to python functors
-operator_func = {
-    Operator.OR:  any,  # true if any item is true
-    Operator.AND: all  # true iff all items are true
-}
+from skymodman.installer.conditions import (ConditionEvaluator,
+                                            referenced_files)
+from skymodman.installer.fomodconfig import parse_config
+from skymodman.installer.selection import InstallSelection
+from skymodman.types import diqt
+
+
+# parsed configs, keyed by (archive, hash of config file contents)
+_config_cache = diqt(maxlen_=8)
+
+def load_config(config_xml, archive=None):
+    """
+    Parse the fomod config file `config_xml`, or return the result of
+    a previous parse if the same config (for the same archive) has
+    been seen recently.
+
+    :param config_xml: path to the ModuleConfig.xml file, or its raw
+        contents as bytes
+    :param archive: the mod archive the config came from
+    :rtype: skymodman.installer.fomodconfig.FomodConfig
+    """
+    if isinstance(config_xml, (bytes, bytearray)):
+        data = bytes(config_xml)
+    else:
+        with open(config_xml, "rb") as f:
+            data = f.read()
+
+    key = (os.fspath(archive) if archive else None,
+           hashlib.sha1(data).digest())
+
+    try:
+        return _config_cache[key]
+    except KeyError:
+        config = _config_cache[key] = parse_config(data)
+        return config
 
 class Fomod:
 
-    def __init__(self, config_xml, check_file_method):
+    def __init__(self, config_xml, file_states_method, archive=None):
         """
 
-        :param config_xml:
-        :param (str, FileState)->bool check_file_method: method to call with arguments
-            (relative_file_path:str, check_state:FileState) to see if a
-            given file is in a certain state (installed/missing/
-            inactive); implementation-specific
+        :param config_xml: path to the ModuleConfig.xml file (or its
+            contents as bytes)
+        :param (Iterable[str])->Dict[str, FileState] file_states_method:
+            method to call with the relative paths of all the files
+            referenced by the config's conditions; must return a
+            mapping of each lower-cased path to its current state
+            (installed/missing/inactive); implementation-specific
+        :param archive: path to the mod archive containing the config;
+            used to cache the parsed config
         """
-        fomod_config = untangle.parse(config_xml)
+        config = load_config(config_xml, archive)
 
-        ## setup placeholders
-        self.all_images = []
+        # these come from the (possibly shared) parsed config and
+        # should not be modified
+        self.all_images = config.all_images
 
-        self.modname = None
-        self.modimage = None
-        self.moddeps = None
-        self.reqfiles = []
-        self.installsteps = []
-        self.condinstalls = []
+        self.modname = config.modname
+        self.modimage = config.modimage
+        self.moddeps = config.moddeps
+        self.reqfiles = config.reqfiles
+        self.installsteps = config.installsteps
+        self.condinstalls = config.condinstalls
 
-        # used during wizard
-        self.files_to_install = []
-        self.flags = {}
+        # used during wizard;
+        # go ahead and add the required files to the install list
+        self.files_to_install = InstallSelection(self.reqfiles)
 
-        if callable(check_file_method):
-            self._check_file = check_file_method
-        else:
-            # just override to return False always;
-            # only for testing; should throw error in practice
-            self._check_file = lambda f,s: False
-
-        self.analyze(fomod_config)
-
-    ##=============================================
-    ## XML-parsing and script setup
-    ## --------------------------------------------
-    ## should only ever be called once (during
-    ## __init__) for each Fomod instance
-    ##=============================================
-    # <editor-fold desc="setup">
-
-    def analyze(self, fomod):
-        """
-
-        :param fomod: The top-level element of the xml file
-        """
-        root = fomod.config # type: Element
-
-        ## mod name
-        self.modname = ModName(root.moduleName.cdata.strip(),
-                               Position(root.moduleName['position']
-                                        or DEFAULTS["moduleName"]
-                                        ["position"]),
-                               Color.from_hexstr(
-                                   root.moduleName.colour or
-                                   DEFAULTS["moduleName"]["colour"]
-                               ))
-        ## mod image
-        defs = DEFAULTS["moduleImage"]
-        mimg = root.moduleImage or Element("moduleImage", defs)
-
-        self.modimage = ModImage(_pathfix(mimg["path"]) or defs["path"],
-
-                                 _tobool(mimg["showImage"]
-                                         or defs["showImage"]),
-
-                                 _tobool(mimg["showFade"]
-                                         or defs["showFade"]),
-
-                                 int(mimg["height"]
-                                     or defs["height"])
-                                 )
-        if self.modimage.path and self.modimage.path != "screenshot.png":
-            self.all_images.append(self.modimage.path)
-
-        ## mod dependencies
-        self.moddeps = self._getdeps(root.moduleDependencies)
-
-        ## required install files
-        self.reqfiles = self._getfiles(root.requiredInstallFiles)
-
-        # go ahead and add these to install list
-        if self.reqfiles:
-            self.files_to_install.extend(self.reqfiles)
-
-        ## conditional file installs
-        self.condinstalls = self._getpatterns(root.conditionalFileInstalls)
-
-        ## install steps
-        self.installsteps = self._getinstallsteps(root.installSteps)
+        # files added by the last add_conditional_install_files()
+        self._conditional_files = []
 
-    @staticmethod
-    def _getdeps(element):
-        if not element:
-            return None
-
-        dparent = element.dependencies
-        deps = Dependencies()
-
-        if dparent:
-            deps.operator = Operator(dparent["operator"] or "And")
+        if callable(file_states_method):
+            file_states = file_states_method(referenced_files(config))
         else:
-            dparent = element
-
-        if not len(dparent):
-            return None
-
-        deps.fileDependency = [FileDep(_pathfix(d["file"]),
-                                       FileState(d["state"]))
-                               for d in dparent.fileDependency]
-
-        deps.flagDependency = [FlagDep(d["flag"], d["value"])
-                               for d in dparent.flagDependency]
-
-        deps.gameDependency = dparent.gameDependency[
-            "version"] if dparent.gameDependency else None
-
-        deps.fommDependency = dparent.fommDependency[
-            "version"] if dparent.fommDependency else None
-
-        return  deps
-
-    @staticmethod
-    def _getfiles(element, defs = DEFAULTS["file"]):
-        if not element:
-            return None
-
-        fparent = element.files or element
-
-        files = []
-        for f in chain(fparent.file, fparent.folder):
-            # ftype = File if f._name == "file" else Folder
-
-            # File(type, source, destination,
-            #      priority, alwaysInstall, installIfUsable)
-
-            files.append(File(
-
-                # type (either 'file' or 'folder')
-                f._name.lower(),
-
-                # source
-                _pathfix(f["source"]),
-
-                # destination
-                "" if f["destination"]==""
-                   else _pathfix(f["destination"] or f["source"]),
-
-                # priority
-                int(f["priority"] or defs["priority"]),
-
-                # alwaysInstall
-                _tobool(f["alwaysInstall"] or defs["alwaysInstall"]),
-
-                # installIfUsable
-                _tobool(f["installIfUsable"] or defs["installIfUsable"])
-              ))
-        return files
-
-    def _getpatterns(self, element):
-        if not element:
-            return None
-
-        pats=[]
-        parent = element.patterns
-        if not parent:
-            parent = element
-
-        for pat in parent.pattern:
-            p = Pattern()
-
-            if pat.type:
-                p.type = PluginType(pat.type["name"])
-            p.dependencies = self._getdeps(pat)
-            p.files = self._getfiles(pat)
-            pats.append(p)
-
-        return pats
-
-    def _getinstallsteps(self, element):
-        if not element:
-            return None
-
-        steps = []
-
-        for step in element.installStep:
-            s = InstallStep(step["name"])
-            s.visible = self._getdeps(step.visible)
-            s.optionalFileGroups = self._getgroups(step.optionalFileGroups)
-
-            steps.append(s)
-        return steps
-
-    def _getgroups(self, element):
-        if not element:
-            return None
-
-        groups = []
-
-        for group in element.group:
-            g = Group(group["name"], GroupType(group["type"]))
-            g.plugin_order = group.plugins["order"]
-            g.plugins = self._getplugins(group.plugins)
-
-            groups.append(g)
-
-        return groups
-
-
-    def _getplugins(self, element):
-        if not element:
-            return None
-
-        plugs = []
-
-        for plugin in element.plugin:
-            p = Plugin(plugin["name"])
-            p.description = plugin.description.cdata
-
-            if plugin.image:
-                p.image = _pathfix(plugin.image["path"])
-                if p.image:
-                    self.all_images.append(p.image)
-
-            if plugin.conditionFlags:
-                p.conditionFlags = [Flag(f["name"], f.cdata)
-                                    for f in plugin.conditionFlags.flag]
-
-            p.files = self._getfiles(plugin)
-
-            tipe = plugin.typeDescriptor
-            if tipe.type: #simple type
-                p.type = PluginType(tipe.type["name"])
-            else: # dependency type
-                dt = tipe.dependencyType
-                p.type = PluginType(dt.defaultType["name"])
-                p.patterns = self._getpatterns(dt.patterns)
-
-            plugs.append(p)
-
-        return plugs
+            # just consider every file missing;
+            # only for testing; should throw error in practice
+            file_states = {}
 
-    # </editor-fold>
+        # the state of the files is checked once, up front; after
+        # that, only changes to the flags need be considered
+        self.conditions = ConditionEvaluator(file_states)
+        self.flags = self.conditions.flags
 
     ##=============================================
     ## Called by script-runner during installation
@@ -279,14 +93,20 @@ class Fomod:
         """
         Called after all the install steps have run; Adds any files
         that meet a conditional-install check to the list of files to
-        install
+        install. If called again (e.g. after the user returns to an
+        earlier step), the results of the previous call are replaced.
         """
+        for file in self._conditional_files:
+            self.files_to_install.discard(file)
+        self._conditional_files = []
 
         if self.condinstalls:
             for pattern in self.condinstalls:
                 if self.check_dependencies_pattern(
                         pattern.dependencies):
-                    self.files_to_install.extend(pattern.files)
+                    self._conditional_files.extend(pattern.files)
+
+        self.files_to_install.update(self._conditional_files)
 
 
     def mark_file_for_install(self, file, install=True):
@@ -297,14 +117,10 @@ class Fomod:
             remove it from the list of files to install
         """
         if install:
-            self.files_to_install.append(file)
+            self.files_to_install.add(file)
         else:
-            try:
-                self.files_to_install.remove(file)
-            except ValueError:
-                # file may not have been in list to begin with, which is ok
-                print(f"ValueError: {file}")
-                pass
+            # file may not have been in list to begin with, which is ok
+            self.files_to_install.discard(file)
 
     #=================================
     # dependency checks
@@ -318,18 +134,10 @@ class Fomod:
         :return: boolean indicating whether the dependencies were
             satisfied.
         """
-        # print(self.check_file.cache_info())
-
-        # condition will be one of the builtin 'any' or 'all' functions
-        condition = operator_func[dependencies.operator]
-
-        return condition(
-            dep_checks[dtype](self, dep)
-            for dtype, dep in dependencies)
+        return self.conditions.evaluate(dependencies)
 
     def check_file(self, file, state):
-        # Manager caches the results of the most recent checks
-        return self._check_file(file, state)
+        return self.conditions.file_state(file) is state
 
     def check_flag(self, flag, value):
         return flag in self.flags \
@@ -352,41 +160,21 @@ class Fomod:
     ##=============================================
 
     def set_flag(self, flag, value):
-        self.flags[flag] = value
+        """
+        :return: the dependency patterns whose result changed as a
+            consequence
+        """
+        return self.conditions.set_flag(flag, value)
 
     def unset_flag(self, flag):
-        try:
-            del self.flags[flag]
-        except KeyError:
-            pass
-
-
-
-
-# <editor-fold desc="helpers">
-def _pathfix(path:str):
-
-    return path.replace('\\', '/')
-
-def _tobool(val):
-    v = val.lower()
-    if v in ("true", "t", "yes", "y", "1"):
-        return True
-    if v in ("false", "f", "no", "n", "0"):
-        return False
-
-    # fallback
-    return bool(val)
+        """
+        :return: the dependency patterns whose result changed as a
+            consequence
+        """
+        return self.conditions.unset_flag(flag)
 
-# </editor-fold>
 
-# I don't know if this is the right way to do this...
-# but it was the only way I could figure out (short of
-# duplicating most of its code) to get untangle
-# to use my Element subclass above
 
-setattr(untangle, "_Element", untangle.Element)
-setattr(untangle, "Element", Element)
 
 #
 # if __name__ == '__main__':
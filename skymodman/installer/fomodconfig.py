@@ -0,0 +1,379 @@
+"""
+Single-pass, streaming reader for FOMOD ModuleConfig.xml files.
+
+Rather than first building a generic tree of xml elements and then
+walking it to find the bits we care about, the SAX handler below
+creates the ``common.*`` objects directly as the elements go by.
+"""
+
+from collections import namedtuple
+from io import BytesIO
+from xml.sax import make_parser, handler
+
+from skymodman.installer.common import *
+from skymodman.types.color import Color
+
+__all__ = ["FomodConfig", "parse_config"]
+
+
+FomodConfig = namedtuple("FomodConfig",
+                         "modname modimage moddeps reqfiles "
+                         "condinstalls installsteps all_images")
+"""The fully-parsed contents of a ModuleConfig.xml file. These should
+be treated as read-only, as the same FomodConfig may be shared by
+several Fomod instances."""
+
+
+def parse_config(source):
+    """
+    Parse a fomod config file.
+
+    :param source: path to the ModuleConfig.xml file, an open binary
+        file object, or the raw contents of the file as bytes
+    :rtype: FomodConfig
+    """
+    if isinstance(source, (bytes, bytearray)):
+        source = BytesIO(source)
+
+    parser = make_parser()
+    config_handler = ConfigHandler()
+    parser.setContentHandler(config_handler)
+    parser.parse(source)
+
+    return config_handler.result()
+
+
+class ConfigHandler(handler.ContentHandler):
+    """
+    SAX handler that builds the objects for a FomodConfig as the
+    document is read.
+
+    Every element with a ``_start_<name>``  or ``_end_<name>`` method
+    is handled by that method; all others are ignored (though their
+    children are not).
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        # names of the currently-open elements
+        self._path = []
+
+        # text content of the current element; None when the element
+        # is not one whose text we need
+        self._text = None
+
+        ## results
+        self.modname = None
+        self.modimage = None
+        self.moddeps = None
+        self.reqfiles = []
+        self.condinstalls = []
+        self.installsteps = []
+        self.all_images = []
+
+        ## the objects currently being built
+        self._name_attrs = None
+        self._step = None # type: InstallStep
+        self._group = None # type: Group
+        self._plugin = None # type: Plugin
+        self._pattern = None # type: Pattern
+        self._deps = None # type: Dependencies
+        self._files = None # type: list
+        self._flag = None # type: str
+
+        # depth of nested "dependencies" elements; the common.*
+        # objects have no place for these, so they are skipped
+        self._nested_deps = 0
+
+    def result(self):
+        """
+        :rtype: FomodConfig
+        """
+        if self.modname is None:
+            self._start_moduleName({})
+            self._end_moduleName()
+        if self.modimage is None:
+            self._start_moduleImage({})
+
+        return FomodConfig(self.modname, self.modimage, self.moddeps,
+                           self.reqfiles, self.condinstalls,
+                           self.installsteps, self.all_images)
+
+    ##===============================================
+    ## SAX callbacks
+    ##===============================================
+
+    def startElement(self, name, attributes):
+        start = getattr(self, "_start_" + name, None)
+        if start is not None:
+            start(attributes)
+
+        self._path.append(name)
+
+    def endElement(self, name):
+        self._path.pop()
+
+        end = getattr(self, "_end_" + name, None)
+        if end is not None:
+            end()
+
+    def characters(self, content):
+        if self._text is not None:
+            self._text.append(content)
+
+    @property
+    def _parent(self):
+        """Name of the element containing the one being handled"""
+        return self._path[-1] if self._path else None
+
+    def _collect_text(self):
+        self._text = []
+
+    def _take_text(self):
+        text = "".join(self._text)
+        self._text = None
+        return text
+
+    ##===============================================
+    ## Module name, image
+    ##===============================================
+
+    def _start_moduleName(self, attrs):
+        self._name_attrs = dict(attrs)
+        self._collect_text()
+
+    def _end_moduleName(self):
+        attrs = self._name_attrs
+        defs = DEFAULTS["moduleName"]
+
+        self.modname = ModName(self._take_text().strip(),
+                               Position(attrs.get("position")
+                                        or defs["position"]),
+                               Color.from_hexstr(attrs.get("colour")
+                                                 or defs["colour"]))
+
+    def _start_moduleImage(self, attrs):
+        defs = DEFAULTS["moduleImage"]
+
+        self.modimage = ModImage(
+            _pathfix(attrs.get("path") or defs["path"]),
+            _tobool(attrs.get("showImage") or defs["showImage"]),
+            _tobool(attrs.get("showFade") or defs["showFade"]),
+            int(attrs.get("height") or defs["height"]))
+
+        if self.modimage.path != "screenshot.png":
+            self.all_images.append(self.modimage.path)
+
+    ##===============================================
+    ## Dependencies
+    ##===============================================
+
+    def _start_moduleDependencies(self, attrs):
+        self._deps = _newdeps(attrs)
+
+    def _end_moduleDependencies(self):
+        self.moddeps = self._finish_deps()
+
+    def _start_visible(self, attrs):
+        self._deps = _newdeps(attrs)
+
+    def _end_visible(self):
+        self._step.visible = self._finish_deps()
+
+    def _start_dependencies(self, attrs):
+        if self._nested_deps or self._parent == "dependencies":
+            self._nested_deps += 1
+        elif self._deps is not None:
+            # a wrapper within <moduleDependencies> or <visible>
+            self._deps.operator = Operator(attrs.get("operator")
+                                           or DEFAULTS["dependencies"]
+                                           ["operator"])
+        else:
+            # within a <pattern>
+            self._deps = _newdeps(attrs)
+
+    def _end_dependencies(self):
+        if self._nested_deps:
+            self._nested_deps -= 1
+        elif self._parent == "pattern":
+            self._pattern.dependencies = self._finish_deps()
+
+    def _start_fileDependency(self, attrs):
+        if self._deps is not None and not self._nested_deps:
+            self._deps.fileDependency.append(
+                FileDep(_pathfix(attrs["file"]),
+                        FileState(attrs["state"])))
+
+    def _start_flagDependency(self, attrs):
+        if self._deps is not None and not self._nested_deps:
+            self._deps.flagDependency.append(
+                FlagDep(attrs["flag"], attrs["value"]))
+
+    def _start_gameDependency(self, attrs):
+        if self._deps is not None and not self._nested_deps:
+            self._deps.gameDependency = attrs.get("version")
+
+    def _start_fommDependency(self, attrs):
+        if self._deps is not None and not self._nested_deps:
+            self._deps.fommDependency = attrs.get("version")
+
+    def _finish_deps(self):
+        """
+        :return: the Dependencies being built, or None if it turned
+            out to be empty
+        """
+        deps, self._deps = self._deps, None
+        return deps if len(deps) else None
+
+    ##===============================================
+    ## Files
+    ##===============================================
+
+    def _start_requiredInstallFiles(self, attrs):
+        self._files = self.reqfiles
+
+    def _end_requiredInstallFiles(self):
+        self._files = None
+
+    def _start_file(self, attrs, ftype="file"):
+        if self._files is None:
+            return
+
+        defs = DEFAULTS[ftype]
+        source = _pathfix(attrs["source"])
+        destination = attrs.get("destination")
+
+        self._files.append(File(
+            ftype,
+            source,
+            # an empty destination means the root of the install
+            "" if destination == ""
+               else _pathfix(destination or source),
+            int(attrs.get("priority") or defs["priority"]),
+            _tobool(attrs.get("alwaysInstall")
+                    or defs["alwaysInstall"]),
+            _tobool(attrs.get("installIfUsable")
+                    or defs["installIfUsable"])
+        ))
+
+    def _start_folder(self, attrs):
+        self._start_file(attrs, "folder")
+
+    ##===============================================
+    ## Patterns
+    ##===============================================
+
+    def _start_pattern(self, attrs):
+        self._pattern = Pattern()
+        self._files = self._pattern.files
+
+        if self._plugin is not None:
+            self._plugin.patterns.append(self._pattern)
+        else:
+            self.condinstalls.append(self._pattern)
+
+    def _end_pattern(self):
+        self._pattern = None
+        self._files = self._plugin.files if self._plugin else None
+
+    def _start_type(self, attrs):
+        ptype = PluginType(attrs["name"])
+
+        if self._parent == "pattern":
+            self._pattern.type = ptype
+        elif self._plugin is not None:
+            self._plugin.type = ptype
+
+    def _start_defaultType(self, attrs):
+        self._plugin.type = PluginType(attrs["name"])
+
+    ##===============================================
+    ## Install steps, groups, plugins
+    ##===============================================
+
+    def _start_installStep(self, attrs):
+        self._step = InstallStep(attrs.get("name"))
+        self.installsteps.append(self._step)
+
+    def _end_installStep(self):
+        self._step = None
+
+    def _start_group(self, attrs):
+        self._group = Group(attrs.get("name"), GroupType(attrs["type"]))
+        self._step.optionalFileGroups.append(self._group)
+
+    def _end_group(self):
+        self._group = None
+
+    def _start_plugins(self, attrs):
+        self._group.plugin_order = attrs.get("order")
+
+    def _start_plugin(self, attrs):
+        self._plugin = Plugin(attrs.get("name"))
+        self._files = self._plugin.files
+        self._group.plugins.append(self._plugin)
+
+    def _end_plugin(self):
+        self._plugin = None
+        self._files = None
+
+    def _start_description(self, attrs):
+        if self._plugin is not None:
+            self._collect_text()
+
+    def _end_description(self):
+        if self._text is not None:
+            self._plugin.description = _squeeze(self._take_text())
+
+    def _start_image(self, attrs):
+        if self._plugin is not None and attrs.get("path"):
+            self._plugin.image = _pathfix(attrs["path"])
+            self.all_images.append(self._plugin.image)
+
+    def _start_flag(self, attrs):
+        if self._plugin is not None:
+            self._flag = attrs["name"]
+            self._collect_text()
+
+    def _end_flag(self):
+        if self._flag is not None:
+            self._plugin.conditionFlags.append(
+                Flag(self._flag, self._take_text()))
+            self._flag = None
+
+
+# <editor-fold desc="helpers">
+
+def _newdeps(attrs):
+    return Dependencies(Operator(attrs.get("operator")
+                                 or DEFAULTS["dependencies"]
+                                 ["operator"]))
+
+def _pathfix(path:str):
+
+    return path.replace('\\', '/')
+
+def _tobool(val):
+    v = val.lower()
+    if v in ("true", "t", "yes", "y", "1"):
+        return True
+    if v in ("false", "f", "no", "n", "0"):
+        return False
+
+    # fallback
+    return bool(val)
+
+def _squeeze(text):
+    """
+    Strip surrounding whitespace from `text` and reduce any runs of
+    blank lines within it to a single blank line.
+    """
+    lines = [l.rstrip() for l in text.strip().splitlines()]
+    squeezed = []
+    for line in lines:
+        if line or (squeezed and squeezed[-1]):
+            squeezed.append(line)
+    return "\n".join(squeezed)
+
+# </editor-fold>
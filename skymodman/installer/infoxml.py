@@ -1,7 +1,16 @@
 """Parse the info.xml file present in FOMOD/other archives"""
 
+from skymodman.installer.element import Element
 from skymodman.thirdparty.untangle import untangle
 
+# I don't know if this is the right way to do this...
+# but it was the only way I could figure out (short of
+# duplicating most of its code) to get untangle
+# to use my Element subclass
+if untangle.Element is not Element:
+    setattr(untangle, "_Element", untangle.Element)
+    setattr(untangle, "Element", Element)
+
 # example_xml="""
 # <?xml version="1.0" encoding="UTF-16"?>
 # <!--header line may not be present-->
@@ -69,7 +78,7 @@ class InfoXML:
     def get_set_value(self, root, name):
         try:
             # so...it seems that replacing the normal Element
-            # class in fomod.py with my customized Element subclass
+            # class (above) with my customized Element subclass
             # means that we get the new Element wherever we use untangle
             # in the rest of the project...ok then. well, the only
             # big difference is that, instead of throwing AttributeError
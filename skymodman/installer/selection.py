@@ -0,0 +1,125 @@
+__all__ = ["InstallSelection"]
+
+
+class InstallSelection:
+    """
+    The set of fomod File entries chosen for installation.
+
+    Entries are keyed by their (case-insensitive) source and
+    destination, so the same file can only be extracted once however
+    many times it is selected. Each key keeps every File added for it,
+    so that a file chosen by two plugins stays selected until both are
+    deselected, and is installed at the highest priority among those
+    still selected. Adding and removing take constant time (for the
+    few duplicates a key will have), and iteration follows the order
+    in which entries were first added.
+    """
+
+    __slots__ = ("_entries", "_ordered")
+
+    def __init__(self, files=()):
+        # key -> [representative File, list of the Files added];
+        # dicts keep insertion order
+        self._entries = {}
+
+        # cached result of in_install_order()
+        self._ordered = None
+
+        self.update(files)
+
+    @staticmethod
+    def key(file):
+        """
+        :param skymodman.installer.common.File file:
+        :return: the identity of `file` within the selection
+        """
+        return file.source.lower(), file.destination.lower()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        yield from (e[0] for e in self._entries.values())
+
+    def __contains__(self, file):
+        return self.key(file) in self._entries
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}({list(self)!r})"
+
+    def add(self, file):
+        """
+        Select `file`. If an entry with the same source and
+        destination was already selected, the one with the higher
+        priority is installed.
+
+        :param skymodman.installer.common.File file:
+        """
+        k = self.key(file)
+        try:
+            entry = self._entries[k]
+        except KeyError:
+            self._entries[k] = [file, [file]]
+        else:
+            entry[1].append(file)
+            if file.priority > entry[0].priority:
+                entry[0] = file
+            else:
+                # the install order can't have changed
+                return
+
+        self._ordered = None
+
+    def update(self, files):
+        """Add each item from `files`"""
+        for f in files:
+            self.add(f)
+
+    def discard(self, file):
+        """
+        Deselect `file` once. The entry with its source and
+        destination is only dropped from the selection when every File
+        added for it has been discarded; until then, the one with the
+        highest priority of those left is installed. Nothing happens
+        if `file` was not selected.
+
+        :param skymodman.installer.common.File file:
+        """
+        k = self.key(file)
+        try:
+            entry = self._entries[k]
+            entry[1].remove(file)
+        except (KeyError, ValueError):
+            return
+
+        if not entry[1]:
+            del self._entries[k]
+        elif entry[0] == file:
+            # the first of the highest priority, as add() would pick
+            entry[0] = max(entry[1], key=lambda f: f.priority)
+        else:
+            # the install order can't have changed
+            return
+
+        self._ordered = None
+
+    def clear(self):
+        self._entries.clear()
+        self._ordered = None
+
+    def in_install_order(self):
+        """
+        Return the selected entries in the order they should be
+        installed: by ascending priority (so that higher-priority
+        entries overwrite lower-priority ones), then by source path,
+        then by the order they were selected. The ordering is computed
+        once and reused until the selection changes.
+
+        :rtype: list[skymodman.installer.common.File]
+        """
+        if self._ordered is None:
+            self._ordered = sorted(
+                self,
+                key=lambda f: (f.priority, f.source.lower()))
+
+        return self._ordered
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+
+# Form implementation generated from reading ui file 'skymodman/interface/designer/ui/profile_diff_dialog.ui'
+#
+# Created by: PyQt5 UI code generator 5.5.1
+#
+# WARNING! All changes made in this file will be lost!
+
+from PyQt5 import QtCore, QtGui, QtWidgets
+
+class Ui_ProfileDiffDialog(object):
+    def setupUi(self, ProfileDiffDialog):
+        ProfileDiffDialog.setObjectName("ProfileDiffDialog")
+        ProfileDiffDialog.resize(500, 600)
+        self.verticalLayout = QtWidgets.QVBoxLayout(ProfileDiffDialog)
+        self.verticalLayout.setObjectName("verticalLayout")
+        self.horizontalLayout = QtWidgets.QHBoxLayout()
+        self.horizontalLayout.setObjectName("horizontalLayout")
+        self.label_from = QtWidgets.QLabel(ProfileDiffDialog)
+        self.label_from.setObjectName("label_from")
+        self.horizontalLayout.addWidget(self.label_from)
+        self.combo_from = QtWidgets.QComboBox(ProfileDiffDialog)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.combo_from.sizePolicy().hasHeightForWidth())
+        self.combo_from.setSizePolicy(sizePolicy)
+        self.combo_from.setObjectName("combo_from")
+        self.horizontalLayout.addWidget(self.combo_from)
+        self.label_to = QtWidgets.QLabel(ProfileDiffDialog)
+        self.label_to.setObjectName("label_to")
+        self.horizontalLayout.addWidget(self.label_to)
+        self.combo_to = QtWidgets.QComboBox(ProfileDiffDialog)
+        sizePolicy = QtWidgets.QSizePolicy(QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Fixed)
+        sizePolicy.setHorizontalStretch(0)
+        sizePolicy.setVerticalStretch(0)
+        sizePolicy.setHeightForWidth(self.combo_to.sizePolicy().hasHeightForWidth())
+        self.combo_to.setSizePolicy(sizePolicy)
+        self.combo_to.setObjectName("combo_to")
+        self.horizontalLayout.addWidget(self.combo_to)
+        self.verticalLayout.addLayout(self.horizontalLayout)
+        self.diff_tree = QtWidgets.QTreeWidget(ProfileDiffDialog)
+        self.diff_tree.setEditTriggers(QtWidgets.QAbstractItemView.NoEditTriggers)
+        self.diff_tree.setUniformRowHeights(True)
+        self.diff_tree.setObjectName("diff_tree")
+        self.diff_tree.headerItem().setText(0, "1")
+        self.diff_tree.header().setVisible(False)
+        self.verticalLayout.addWidget(self.diff_tree)
+        self.summary_label = QtWidgets.QLabel(ProfileDiffDialog)
+        self.summary_label.setText("")
+        self.summary_label.setObjectName("summary_label")
+        self.verticalLayout.addWidget(self.summary_label)
+        self.buttonBox = QtWidgets.QDialogButtonBox(ProfileDiffDialog)
+        self.buttonBox.setOrientation(QtCore.Qt.Horizontal)
+        self.buttonBox.setStandardButtons(QtWidgets.QDialogButtonBox.Close)
+        self.buttonBox.setObjectName("buttonBox")
+        self.verticalLayout.addWidget(self.buttonBox)
+        self.label_from.setBuddy(self.combo_from)
+        self.label_to.setBuddy(self.combo_to)
+
+        self.retranslateUi(ProfileDiffDialog)
+        self.buttonBox.rejected.connect(ProfileDiffDialog.reject)
+        QtCore.QMetaObject.connectSlotsByName(ProfileDiffDialog)
+
+    def retranslateUi(self, ProfileDiffDialog):
+        _translate = QtCore.QCoreApplication.translate
+        ProfileDiffDialog.setWindowTitle(_translate("ProfileDiffDialog", "Compare Profiles"))
+        self.label_from.setText(_translate("ProfileDiffDialog", "&Compare:"))
+        self.label_to.setText(_translate("ProfileDiffDialog", "&to:"))
+
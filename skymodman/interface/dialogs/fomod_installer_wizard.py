@@ -16,6 +16,7 @@ from PyQt5.QtWidgets import (QWizard, QWizardPage,
 from skymodman.installer.common import GroupType, PluginType#, Dependencies, Operator
 from skymodman.interface.designer.uic.plugin_wizpage_ui import Ui_InstallStepPage
 from skymodman.interface.designer.uic.installation_wizpage_ui import Ui_FinalPage
+from skymodman.interface.thumbnails import ThumbnailCache
 
 class FomodInstaller(QWizard):
 
@@ -41,6 +42,10 @@ class FomodInstaller(QWizard):
         self.rootpath = files_path
         self.step_pages = []
 
+        # plugin images are decoded in the background and kept here
+        # until needed
+        self.thumbnails = ThumbnailCache(parent=self)
+
         # make sure this is empty
         FomodInstaller.Pages = []
 
@@ -93,7 +98,8 @@ class FomodInstaller(QWizard):
                     self.rootpath,
                     self.fomod.modname.name,
                     step, next(self.page_count),
-                    self.installer
+                    self.installer,
+                    self.thumbnails
                 ))
 
             self.addPage(self.step_pages[-1])
@@ -113,6 +119,21 @@ class FomodInstaller(QWizard):
         self.addPage(_final_page)
         FomodInstaller.Pages.append(_final_page)
 
+    def done(self, result):
+        """
+        Called when the wizard is finished or cancelled. Stop
+        extracting and decoding the plugin images before the installer
+        cleans up the directory they were extracted to.
+        """
+        for page in self.step_pages:
+            if page.task is not None:
+                page.task.cancel()
+                page.task = None
+        self.installer.cancel_fomod_image_extraction()
+
+        self.thumbnails.shutdown()
+        super().done(result)
+
 
 class StartPage(QWizardPage):
     """Splashpage-like page that shows at the start of fomods with
@@ -322,7 +343,8 @@ class InstallStepPage(QWizardPage, Ui_InstallStepPage):
         GroupType.ANY: " (Optional)"
     }
 
-    def __init__(self, path, modname, step, pageid, install_manager, *args):
+    def __init__(self, path, modname, step, pageid, install_manager,
+                 thumbnails, *args):
         """
 
         :param path:
@@ -330,11 +352,23 @@ class InstallStepPage(QWizardPage, Ui_InstallStepPage):
         :param step:
         :param pageid:
         :param install_manager:
+        :param ThumbnailCache thumbnails: shared source of the
+            decoded plugin images
         """
         super().__init__(*args)
         self.step = step
         self.installman = install_manager
 
+        self.thumbnails = thumbnails
+        # handle for the load_images() task
+        self.task = None
+        # path of the image the user is waiting to see, if it
+        # wasn't ready when they hovered over its plugin
+        self._awaited_image = None
+        # image (as given in the config) of the last plugin hovered
+        self._hovered_image = None
+        self.thumbnails.thumbnail_ready.connect(self.on_thumbnail_ready)
+
         self.modroot =Path(path)
         self.setupUi(self)
         self.setTitle(modname)
@@ -425,6 +459,55 @@ class InstallStepPage(QWizardPage, Ui_InstallStepPage):
             for c in g.children():
                 g.check_child_type(c)
 
+        # make sure the images for this step's plugins have been
+        # extracted, and start decoding them so they're (hopefully)
+        # ready by the time the user gets to them
+        if self.task is not None:
+            self.task.cancel()
+        self.task = asyncio.get_event_loop().create_task(
+            self.load_images())
+
+    async def load_images(self):
+        """
+        Extract the images for this step (if they haven't been already)
+        and queue them for decoding. Then, extract those for the
+        following step, so that they're ready if the user moves on.
+        """
+        man = self.installman
+
+        await man.extract_fomod_images(man.step_images(self.step))
+        self.thumbnails.prefetch(self.plugin_image_paths())
+
+        # the user may have hovered over a plugin before its image
+        # was available
+        if self._hovered_image:
+            imgpath = man.get_fomod_image(self._hovered_image)
+            if imgpath:
+                self.show_image(imgpath)
+
+        try:
+            next_page = FomodInstaller.Pages[self.pageid + 1]
+        except IndexError:
+            return
+        if isinstance(next_page, InstallStepPage):
+            await man.extract_fomod_images(
+                man.step_images(next_page.step))
+
+    def plugin_image_paths(self):
+        """
+        :return: the extracted locations of all the images used by
+            the plugins on this page that are available
+        """
+        paths = []
+        for group in self.step.optionalFileGroups:
+            for plugin in group.plugins:
+                if plugin.image:
+                    imgpath = self.installman.get_fomod_image(
+                        plugin.image)
+                    if imgpath:
+                        paths.append(imgpath)
+        return paths
+
     def cleanupPage(self):
         """
         When going 'back' to a previous page, unmark all groups and
@@ -503,6 +586,8 @@ class InstallStepPage(QWizardPage, Ui_InstallStepPage):
             plugin = item.data(0, Qt.UserRole)
             self.plugin_description_view.setText(plugin.description)
 
+            self._hovered_image = plugin.image
+
             # show image if there is one
             if plugin.image:
                 imgpath = self.installman.get_fomod_image(plugin.image)
@@ -510,7 +595,25 @@ class InstallStepPage(QWizardPage, Ui_InstallStepPage):
 
                 # if exists(imgpath):
                 if imgpath:
-                    self.label.setScaledPixmap(imgpath)
+                    self.show_image(imgpath)
+
+    def show_image(self, imgpath):
+        """
+        Display the image at `imgpath` if it has already been decoded;
+        otherwise, request it and show it once it's ready.
+        """
+        image = self.thumbnails.get(imgpath)
+
+        if image is None:
+            self._awaited_image = imgpath
+            self.thumbnails.request(imgpath)
+        else:
+            self._awaited_image = None
+            self.label.setScaledImage(image, imgpath)
+
+    def on_thumbnail_ready(self, imgpath):
+        if imgpath == self._awaited_image and self.isVisible():
+            self.show_image(imgpath)
 
     def isComplete(self):
         """
@@ -73,6 +73,11 @@ class ManualInstallDialog(QDialog, Ui_mod_structure_dialog):
         # self.mod_structure_column_view.owner = self
         # self.mod_structure_column_view.setResizeGripsVisible(False)
 
+        self.action_reset_layout = QtWidgets.QAction("Reset Layout",
+                                                     self)
+        self.action_flatten_dir = QtWidgets.QAction("Move Contents Up",
+                                                    self)
+
         # create custom context menu
         self.rclickmenu = self.__setup_context_menu()
         self.rclicked_inode = None
@@ -92,10 +97,7 @@ class ManualInstallDialog(QDialog, Ui_mod_structure_dialog):
         # self.mod_structure_column_view.setToolTip(_tree_tooltip)
 
         ## Hide the Trash folder
-        self.mod_structure_view.setRowHidden(
-            self.modfsmodel.row4path(self.modfsmodel.trash),
-            self.mod_structure_view.rootIndex(), # should still be "/" at this point
-            True)
+        self.hide_trash()
 
 
         self._icon_ok = icons.get("status-ok")
@@ -218,7 +220,9 @@ class ManualInstallDialog(QDialog, Ui_mod_structure_dialog):
              self.action_set_toplevel,
              self.action_rename,
              self.action_delete,
-             self.action_create_directory])
+             self.action_flatten_dir,
+             self.action_create_directory,
+             self.action_reset_layout])
 
         return rclickmenu
 
@@ -230,6 +234,8 @@ class ManualInstallDialog(QDialog, Ui_mod_structure_dialog):
         self.action_rename.triggered.connect(self.rename)
         self.action_create_directory.triggered.connect(self.create_dir)
         self.action_delete.triggered.connect(self.delete_file)
+        self.action_reset_layout.triggered.connect(self.reset_layout)
+        self.action_flatten_dir.triggered.connect(self.flatten_dir)
 
 
     def get_rclickmenu(self, for_view):
@@ -242,7 +248,9 @@ class ManualInstallDialog(QDialog, Ui_mod_structure_dialog):
              self.action_set_toplevel,
              self.action_rename,
              self.action_delete,
-             self.action_create_directory])
+             self.action_flatten_dir,
+             self.action_create_directory,
+             self.action_reset_layout])
 
         return rclickmenu
 
@@ -280,6 +288,34 @@ class ManualInstallDialog(QDialog, Ui_mod_structure_dialog):
         self.fsroot = QModelIndex()
 
 
+    def hide_trash(self):
+        """
+        Hide the model's Trash folder from the tree view
+        """
+        self.mod_structure_view.setRowHidden(
+            self.modfsmodel.row4path(self.modfsmodel.trash),
+            QModelIndex(), # "/"
+            True)
+
+    def reset_layout(self, *args):
+        """
+        Undo all changes made to the archive structure at once
+        """
+        self.LOGGER << "reset_layout()"
+        self.modfsmodel.reset_layout()
+
+        # the model reset cleared the view's root and hidden rows
+        self.fsroot = QModelIndex()
+        self.hide_trash()
+
+    def flatten_dir(self, *args):
+        """
+        Replace the directory targeted by the last context-menu event
+        with its contents
+        """
+        fsmod = self.modfsmodel
+        fsmod.flatten_dir(fsmod.inode2path(self.rclicked_inode))
+
     def rename(self, *args):
         # self.LOGGER << "rename()"
         self.mod_structure_view.edit(
@@ -345,8 +381,16 @@ class ManualInstallDialog(QDialog, Ui_mod_structure_dialog):
         self.action_rename.setVisible(non_root)
         self.action_delete.setVisible(non_root)
 
+        # show flatten option if user clicked on a (non-root) directory
+        self.action_flatten_dir.setVisible(clicked_isdir and non_root)
+
         # always show create-dir option.
         # self.action_create_directory
+
+        # show reset option once anything has been changed
+        self.action_reset_layout.setVisible(
+            not self.undostack.isClean())
+
         self.get_rclickmenu(view).exec_(global_pos)
 
     def custom_context_menu(self, position):
@@ -381,9 +425,16 @@ class ManualInstallDialog(QDialog, Ui_mod_structure_dialog):
         self.action_rename.setVisible(non_root)
         self.action_delete.setVisible(non_root)
 
+        # show flatten option if user clicked on a (non-root) directory
+        self.action_flatten_dir.setVisible(clicked_isdir and non_root)
+
         # always show create-dir option.
         # self.action_create_directory
 
+        # show reset option once anything has been changed
+        self.action_reset_layout.setVisible(
+            not self.undostack.isClean())
+
         self.rclickmenu.exec_(self.mod_structure_view.mapToGlobal(position))
 
     # def check_top_level(self, parent=None, first=-1, last=-1,
@@ -0,0 +1,118 @@
+from PyQt5.QtCore import pyqtSlot
+from PyQt5.QtWidgets import QDialog, QTreeWidgetItem
+
+from skymodman.interface.designer.uic.profile_diff_dialog_ui import Ui_ProfileDiffDialog
+from skymodman.log import withlogger
+
+
+@withlogger
+class ProfileDiffDialog(QDialog, Ui_ProfileDiffDialog):
+    """
+    Dialog window showing the differences between the saved states of
+    two profiles: mods added, removed, enabled, disabled or moved, and
+    files hidden or unhidden. The comparison is redone whenever the user
+    picks a different profile from either list.
+    """
+
+    # (ProfileDiff field, heading for its section of the tree)
+    _sections = (
+        ("added", "Added mods"),
+        ("removed", "Removed mods"),
+        ("enabled", "Enabled mods"),
+        ("disabled", "Disabled mods"),
+        ("moved", "Moved mods"),
+        ("hidden", "Hidden files"),
+        ("unhidden", "Unhidden files"),
+    )
+
+    def __init__(self, *, manager, combobox_model, current=None,
+                 **kwargs):
+        """
+
+        :param skymodman.managers.modmanager.ModManager manager:
+        :param skymodman.interface.models.ProfileListModel combobox_model:
+        :param str current: name of the profile to compare from; the
+            first profile in the model if not given
+        """
+        super().__init__(**kwargs)
+
+        self.setupUi(self)
+
+        self.Manager = manager
+
+        # set the models and starting selections before connecting
+        # the signals so the comparison only runs once
+        self.combo_from.setModel(combobox_model)
+        self.combo_to.setModel(combobox_model)
+
+        start = combobox_model.profiles.index(current) \
+            if current in combobox_model.profiles else 0
+
+        self.combo_from.setCurrentIndex(start)
+        # default to comparing against the next profile in the list
+        self.combo_to.setCurrentIndex(
+            (start + 1) % max(combobox_model.rowCount(), 1))
+
+        self.combo_from.currentIndexChanged[int].connect(self.compare)
+        self.combo_to.currentIndexChanged[int].connect(self.compare)
+
+        self.compare()
+
+    @pyqtSlot(int)
+    def compare(self, index=None):
+        """Compare the selected profiles and show the results"""
+
+        self.diff_tree.clear()
+
+        profile_a = self.combo_from.currentData()
+        profile_b = self.combo_to.currentData()
+
+        if not (profile_a and profile_b):
+            self.summary_label.setText("")
+            return
+
+        if profile_a == profile_b:
+            self.summary_label.setText("Choose two different profiles "
+                                       "to compare.")
+            return
+
+        try:
+            diff = self.Manager.compare_profiles(profile_a, profile_b)
+        except Exception as e:
+            # most likely a malformed or unreadable profile file
+            self.LOGGER.exception(e)
+            self.summary_label.setText(
+                f"Could not compare profiles: {e}")
+            return
+
+        counts = []
+        for field, heading in self._sections:
+            entries = getattr(diff, field)
+            if not entries:
+                continue
+
+            if isinstance(entries, dict):
+                # hidden/unhidden: mod -> list of file paths
+                count = sum(map(len, entries.values()))
+                children = [self._item(mod, paths)
+                            for mod, paths in entries.items()]
+            else:
+                count = len(entries)
+                children = [QTreeWidgetItem([key]) for key in entries]
+
+            section = QTreeWidgetItem([f"{heading} ({count})"])
+            section.addChildren(children)
+            self.diff_tree.addTopLevelItem(section)
+
+            counts.append(f"{count} {field}")
+
+        self.summary_label.setText(", ".join(counts).capitalize()
+                                   if counts else "No differences.")
+
+    @staticmethod
+    def _item(text, children):
+        """Create a tree item with a child item for each of the
+        strings in `children`"""
+        item = QTreeWidgetItem([text])
+        item.addChildren([QTreeWidgetItem([c]) for c in children])
+        return item
@@ -206,6 +206,10 @@ class InstallerUI(QObject):
                 ).run_in_executor(ex, mi_dialog.exec_)
             await f
 
+        # keep the user's changes in case the archive is opened again
+        self.installer.save_layout(
+            mi_dialog.modfsmodel.current_layout())
+
         del ManualInstallDialog
 
 
@@ -10,7 +10,7 @@ from PyQt5 import QtWidgets, QtGui, QtCore
 from PyQt5.QtCore import Qt, pyqtSlot
 from PyQt5.QtWidgets import QMessageBox
 
-from skymodman import constants, Manager
+from skymodman import constants, metrics, Manager
 from skymodman.constants import qModels as M, Tab as TAB
 from skymodman.constants.keystrings import UI as KeyStr_UI
 # (
@@ -115,6 +115,23 @@ class ModManagerWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             icon=QtGui.QIcon().fromTheme("edit-clear"),
             triggered=self.remove_missing)
 
+        ## Action that shows the differences between two profiles;
+        ## added to the profiles menu
+        # noinspection PyArgumentList
+        self.action_compare_profiles = QtWidgets.QAction(
+            "&Compare Profiles...",
+            self,
+            objectName="action_compare_profiles",
+            icon=QtGui.QIcon().fromTheme("view-list-compact"))
+
+        ## Action that shows the timings recorded by skymodman.metrics
+        # noinspection PyArgumentList
+        self.action_timing_report = QtWidgets.QAction(
+            "&Timing Report...",
+            self,
+            objectName="action_timing_report",
+            icon=QtGui.QIcon().fromTheme("utilities-system-monitor"))
+
         ## Action that will cancel any active asyncio task
         # noinspection PyArgumentList
         self.action_cancel_task = QtWidgets.QAction(
@@ -358,6 +375,13 @@ class ModManagerWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.file_toolBar.addActions([self.action_new_profile,
                                       self.action_delete_profile])
 
+        # the compare action isn't in the designer file; put it at the
+        # end of the profiles menu
+        self.menu_profiles.addSeparator()
+        self.menu_profiles.addAction(self.action_compare_profiles)
+        self.menu_file.insertAction(self.action_preferences,
+                                    self.action_timing_report)
+
 
         # Action Group for the mod-movement buttons.
         # this just makes it easier to enable/disable them all at once
@@ -477,8 +501,11 @@ class ModManagerWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                 self.profile_helper.on_remove_profile_action),
             (self.action_rename_profile     ,
                 self.profile_helper.on_rename_profile_action),
+            (self.action_compare_profiles   ,
+                self.profile_helper.on_compare_profiles_action),
 
             (self.action_preferences        , self.edit_preferences),
+            (self.action_timing_report      , self.show_timing_report),
             (self.action_quit               , self.close),
             (self.action_install_mod        , self.install_mod_archive),
             (self.action_manual_install     , partial(self.install_mod_archive, True)),
@@ -600,6 +627,10 @@ class ModManagerWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
             # listen to profile helper for new profile
             (prof.newProfileLoaded,     self.on_profile_load),
+            # ...and for the progress of loading it
+            (prof.profileLoadStarted,   self.on_profile_load_started),
+            (prof.profileLoadProgress,  self.on_profile_load_progress),
+            (prof.profileLoadFinished,  self.on_profile_load_finished),
             # enable/disable rename/remove-profile actions as needed
             (prof.enableProfileActions, self.update_profile_actions),
 
@@ -656,6 +687,8 @@ class ModManagerWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         ## File Viewer
         self.filetree_fileviewer.setup(self.filetree_modlist,
                                        self.filetree_filefilter)
+        self.filetree_fileviewer.watch_mod_table(
+            self.models[M.mod_table])
 
     def _setup_undo_manager(self):
         """
@@ -756,6 +789,50 @@ class ModManagerWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         # also recheck alerts when loading new profile
         # self.update_alerts()
 
+    @pyqtSlot('QString')
+    def on_profile_load_started(self, profile_name):
+        """
+        A profile has started loading in the background. Until it's
+        done, the mod collection and database are being rebuilt, so
+        empty the views and keep the user away from anything that
+        would use that data.
+
+        :param str profile_name:
+        """
+        self.mod_table.unload_data()
+        self.filetree_fileviewer.reset_view()
+
+        self.manager_tabs.setEnabled(False)
+        for action in (self.action_install_mod,
+                       self.action_manual_install):
+            action.setEnabled(False)
+        self.update_UI()
+
+        self.show_statusbar_progress(f"Loading {profile_name}:")
+        # let the cancel button stop the load
+        self.task = self.profile_helper.load_task
+
+    @pyqtSlot(int, int, str)
+    def on_profile_load_progress(self, stage, num_stages, text):
+        """
+        :param int stage: the stage of the profile load now starting
+        :param int num_stages: how many stages there are
+        :param str text: description of the stage
+        """
+        self.sb_progress_bar.setMaximum(num_stages)
+        self.update_statusbar_progress(stage, f"{text}:")
+
+    @pyqtSlot()
+    def on_profile_load_finished(self):
+        """Re-enable the interface once a profile load is over (by the
+        time this is called, the views have been reloaded if needed)"""
+        self.hide_statusbar_progress()
+
+        self.manager_tabs.setEnabled(True)
+        for action in (self.action_install_mod,
+                       self.action_manual_install):
+            action.setEnabled(True)
+
     @pyqtSlot(bool)
     def on_make_or_clear_mod_selection(self, has_selection):
         """
@@ -1246,6 +1323,33 @@ class ModManagerWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             # TODO: open directory for unmanaged mod
 
 
+    @pyqtSlot()
+    def show_timing_report(self):
+        """
+        Send the report of the timings recorded so far to the log and
+        show it in a message box. If timings are not being recorded,
+        offer to start recording them.
+        """
+        from skymodman.interface.dialogs import message
+
+        if not metrics.is_enabled():
+            if message('question', 'Timing Report',
+                       'Timings are not being recorded.',
+                       'Start recording the duration of disk, database '
+                       'and installation operations now? (To record '
+                       'from startup, set the environment variable '
+                       f'{constants.EnvVars.METRICS.value}=1.)',
+                       parent=self):
+                metrics.enable()
+            return
+
+        metrics.log_report()
+        message('information', 'Timing Report',
+                'Timings recorded so far (in milliseconds) have been '
+                'written to the log.',
+                buttons='ok', parent=self,
+                detailed_text=metrics.report())
+
     @pyqtSlot()
     def remove_missing(self):
         """
@@ -6,6 +6,7 @@ from PyQt5.QtCore import Qt, pyqtSignal, QAbstractItemModel, QModelIndex, QMimeD
 from skymodman import exceptions
 from skymodman.constants import OverwriteMode
 from skymodman.interface.dialogs.file_exists_dialog import FileExistsDialog
+from skymodman.interface.dialogs.message import message
 from skymodman.types.archivefs import archivefs
 from skymodman.types.archivefs.archivefs import ArchiveFS, PureCIPath, CIPath
 from skymodman.utils import icons
@@ -27,6 +28,36 @@ class UndoCmd(QtWidgets.QUndoCommand):
         self.end_redo = call_after_redo
         self.end_undo = call_after_undo
 
+        # snapshots of the filesystem from before and after the
+        # command was first performed
+        self._before = None
+        self._after = None
+
+    def _apply_redo(self, fs, operation):
+        """
+        The first time the command is performed, call `operation`,
+        capturing the state of `fs` before and after. Every later redo
+        just restores the "after" state, which takes constant time
+        however large the filesystem is.
+
+        :param ArchiveFS fs:
+        :param operation: callable that makes the command's changes
+        """
+        if self._after is None:
+            self._before = fs.snapshot()
+            operation()
+            self._after = fs.snapshot()
+        else:
+            fs.restore(self._after)
+
+    def _apply_undo(self, fs):
+        """
+        Return `fs` to its state from before the command was performed.
+
+        :param ArchiveFS fs:
+        """
+        fs.restore(self._before)
+
 class TrashCommand(UndoCmd):
 
     def __init__(self, path, trash_path, *args, **kwargs):
@@ -43,7 +74,8 @@ class TrashCommand(UndoCmd):
         self.inode = path.inode
         self.orig_name = path.name
         self.orig_location = PureCIPath(path.parent)
-        self.pathfor = type(trash_path).FS.pathfor
+        self.fs = type(trash_path).FS
+        self.pathfor = self.fs.pathfor
 
         self.trash = trash_path
 
@@ -54,8 +86,18 @@ class TrashCommand(UndoCmd):
         return self.pathfor(self.inode)
 
     def redo(self):
-        ## move to trash
         self.begin_redo()
+        self._apply_redo(self.fs, self._totrash)
+        self.end()
+
+    def undo(self):
+        # restore to original location
+        self.begin_undo()
+        self._apply_undo(self.fs)
+        self.end()
+
+    def _totrash(self):
+        ## move to trash
         prefix = 0
         gettname = ("{}_" + self.orig_name).format
         trashname = gettname(prefix)
@@ -67,14 +109,6 @@ class TrashCommand(UndoCmd):
 
         self.path.rename(self.trash / trashname)
 
-        self.end()
-
-    def undo(self):
-        # restore to original location
-        self.begin_undo()
-        self.path.rename(self.orig_location / self.orig_name)
-        self.end()
-
 class MoveCommand(UndoCmd):
     """
     Command for moving a path `source_path` to a different folder
@@ -97,7 +131,8 @@ class MoveCommand(UndoCmd):
 
         # print("MoveCommand(", source_path,",", target_path, ")")
 
-        self.getpath = type(source_path).FS.get_path
+        self.fs = type(source_path).FS
+        self.getpath = self.fs.get_path
 
         # self._name = source_path.name
 
@@ -111,18 +146,17 @@ class MoveCommand(UndoCmd):
         self.do_redo = partial(self._domove,
                                str(source_path),
                                str(target_path))
-        self.do_undo = partial(self._domove,
-                               str(target_path),
-                               str(source_path))
 
     def redo(self):
         self.begin_redo() # emits beginMoveRows
-        self.do_redo()
+        self._apply_redo(self.fs, self.do_redo)
         self.end() # emits endMoveRows
 
     def undo(self):
+        # restoring the earlier state also brings back anything that
+        # was overwritten by the move
         self.begin_undo()
-        self.do_undo()
+        self._apply_undo(self.fs)
         self.end()
 
     def _domove(self, src, dest):
@@ -138,7 +172,8 @@ class RenameCommand(UndoCmd):
         self.old_name = path.name
         self.new_name = new_name
 
-        self.getpath = type(path).FS.pathfor
+        self.fs = type(path).FS
+        self.getpath = self.fs.pathfor
 
     @property
     def path(self):
@@ -146,12 +181,13 @@ class RenameCommand(UndoCmd):
 
     def redo(self):
         self.begin_redo()
-        self.path.chname(self.new_name)
+        self._apply_redo(self.fs,
+                         lambda: self.path.chname(self.new_name))
         self.end()
 
     def undo(self):
         self.begin_undo()
-        self.path.chname(self.old_name)
+        self._apply_undo(self.fs)
         self.end()
 
 class InsertDirectoryCommand(UndoCmd):
@@ -160,17 +196,42 @@ class InsertDirectoryCommand(UndoCmd):
 
         self._path = PureCIPath(dir_path)
 
-        self._mkdir = type(dir_path).FS.mkdir
-        self._rmdir = type(dir_path).FS.rmdir
+        self.fs = type(dir_path).FS
 
     def redo(self):
         self.begin_redo()
-        self._mkdir(self._path)
+        self._apply_redo(self.fs, partial(self.fs.mkdir, self._path))
         self.end_redo()
 
     def undo(self):
         self.begin_undo()
-        self._rmdir(self._path)
+        self._apply_undo(self.fs)
+        self.end_undo()
+
+class BatchCommand(UndoCmd):
+    """
+    Applies an ArchiveFS batch (any number of moves, renames and
+    removals) as a single undoable action.
+    """
+    def __init__(self, fsbatch, text, *args, **kwargs):
+        """
+
+        :param archivefs.FSBatch fsbatch: a validated batch
+        :param str text: description for the undo stack
+        """
+        super().__init__("batch", text, *args, **kwargs)
+
+        self.fs = fsbatch.fs
+        self.batch = fsbatch
+
+    def redo(self):
+        self.begin_redo()
+        self._apply_redo(self.fs, self.batch.apply)
+        self.end_redo()
+
+    def undo(self):
+        self.begin_undo()
+        self._apply_undo(self.fs)
         self.end_undo()
 
 
@@ -205,7 +266,6 @@ class ModArchiveTreeModel(QAbstractItemModel):
         super().__init__(*args, **kwargs)
 
         self._fs = owner.structure # type: ArchiveFS
-        self._backupfs = self._fs.mkdupefs()
 
         self._currentroot_inode = ArchiveFS.ROOT_INODE
         self._currentroot = self._fs.rootpath
@@ -233,9 +293,13 @@ class ModArchiveTreeModel(QAbstractItemModel):
 
         # create a 'Trash' folder to use for deletions
         # (and easy restorations)
-        self._fs.mkdir("/.trash")
+        # (a previously-saved layout may have one already)
+        self._fs.mkdir("/.trash", exist_ok=True)
         self.trash = self._fs.get_path("/.trash")
 
+        # the original layout of the archive, for reset_layout()
+        self._initial_state = self._fs.snapshot()
+
         self.undostack = owner.undostack # type: QtWidgets.QUndoStack
 
         self._owner = owner
@@ -578,6 +642,75 @@ class ModArchiveTreeModel(QAbstractItemModel):
         self._invalidate_caches(self._sorted_dirlist)
         self.endRemoveRows()
 
+    def _begin_layout_change(self):
+        """Call before an operation that may rearrange any number of
+        items in the tree."""
+        # noinspection PyUnresolvedReferences
+        self.layoutAboutToBeChanged.emit()
+
+    def _end_layout_change(self):
+        """Call after a layout-changing operation."""
+        self._invalidate_caches(self._sorted_dirlist)
+
+        # persistent indexes are tied to inodes (their internalId()),
+        # so just look up where each inode is now
+        old_indexes = self.persistentIndexList()
+        new_indexes = [
+            self.index4inode(idx.internalId())
+                if self._fs.exists(idx.internalId())
+                else QModelIndex()
+            for idx in old_indexes]
+
+        self.changePersistentIndexList(old_indexes, new_indexes)
+
+        # noinspection PyUnresolvedReferences
+        self.layoutChanged.emit()
+        self.folder_structure_changed.emit()
+
+    def apply_batch(self, fsbatch, text):
+        """
+        Push the changes collected in `fsbatch` to the undo stack as a
+        single action. Rather than signaling each change to attached
+        views individually, the whole batch is reported as one layout
+        change.
+
+        :param archivefs.FSBatch fsbatch:
+        :param str text: description of the action for the undo stack
+        :return: True if the changes were made; False if they could
+            not be (the reason is shown to the user)
+        """
+        try:
+            fsbatch.validate()
+        except archivefs.FSError as e:
+            message('warning', "Cannot Complete Operation",
+                    text=str(e), buttons='ok')
+            return False
+
+        if len(fsbatch):
+            self.undostack.push(
+                BatchCommand(fsbatch, text,
+                             call_before_redo=self._begin_layout_change,
+                             call_before_undo=self._begin_layout_change,
+                             call_after_redo=self._end_layout_change,
+                             call_after_undo=self._end_layout_change))
+        return True
+
+    def flatten_dir(self, dirpath):
+        """
+        Move the contents of the directory `dirpath` up into its parent,
+        then remove the (now empty) directory.
+
+        :param CIPath dirpath:
+        """
+        fsbatch = archivefs.FSBatch(self._fs)
+
+        for child in dirpath.iterdir():
+            fsbatch.move(child, dirpath.sparent)
+        fsbatch.remove(dirpath)
+
+        return self.apply_batch(fsbatch,
+                                f"Move contents of {dirpath.name} up")
+
     def move_to_dir(self, src_path, target_dir):
         """Move the file located at src_path from its current
         location to within `target_dir`"""
@@ -846,6 +979,34 @@ class ModArchiveTreeModel(QAbstractItemModel):
         )
         return True
 
+    def reset_layout(self):
+        """
+        Return the archive structure to its original layout, discarding
+        all changes made by the user along with the undo history.
+        """
+        self.beginResetModel()
+
+        self._fs.restore(self._initial_state)
+        self.undostack.clear()
+
+        self._currentroot_inode = ArchiveFS.ROOT_INODE
+        self._currentroot = self._realroot
+        self._invalidate_caches()
+
+        self.endResetModel()
+        self.folder_structure_changed.emit()
+
+    def current_layout(self):
+        """
+        Return a copy of the filesystem as the user has arranged it,
+        minus the contents of the Trash folder.
+
+        :rtype: ArchiveFS
+        """
+        layout = self._fs.mkdupefs()
+        layout.rmtree(self.trash)
+        return layout
+
     ##===============================================
     ## Utilities
     ##===============================================
@@ -1,6 +1,6 @@
-from functools import lru_cache
 from bisect import bisect_left
 from collections import deque
+from os.path import basename
 
 from PyQt5.QtCore import Qt, QModelIndex, QAbstractItemModel, pyqtSlot
 from PyQt5.QtWidgets import QUndoStack
@@ -13,12 +13,13 @@ from skymodman.interface.qundo.commands.hide_files import HideFileCommand, HideD
 
 
 # actually provides a small (but noticeable) speedup
-# Qt_Checked = Qt.Checked
+Qt_Checked = Qt.Checked
 Qt_Unchecked = Qt.Unchecked
-# Qt_PartiallyChecked = Qt.PartiallyChecked
+Qt_PartiallyChecked = Qt.PartiallyChecked
 Qt_CheckStateRole = Qt.CheckStateRole
 Qt_DisplayRole = Qt.DisplayRole
 Qt_DecorationRole = Qt.DecorationRole
+Qt_ToolTipRole = Qt.ToolTipRole
 
 COLUMNS = (COL_NAME, COL_PATH, COL_CONFLICTS) = range(3)
 ColHeaders = ("Name", "Path", "Conflicts")
@@ -29,10 +30,27 @@ class ModFileTreeModel(QAbstractItemModel):
     A custom model that presents a view into the actual files saved
     within a mod's folder. It is vastly simplified compared to the
     QFileSystemModel, and only supports editing the state of the
-    checkbox on each file or folder (though there is some neat trickery
-    that propagates a check-action on a directory to all of its
-    descendants)
+    checkbox on each file or folder (checking or unchecking a
+    directory applies to all of its descendants)
+
+    Only the sorted list of the mod's file paths is loaded up front;
+    the items for the contents of a directory are not created until
+    the directory is first expanded (see ``fetchMore()``). Because the
+    list is sorted, the files below any directory occupy a contiguous
+    range of it (the item's `span`).
+
+    Which files are hidden is recorded in a bytearray with one entry
+    for each file in that list, whether or not an item has been
+    created for it. Hiding or unhiding a directory is then a single
+    slice assignment, and the checkstate of a directory is found by
+    counting the hidden files in its span.
     """
+
+    subtree_load_limit = 5000
+    """When a directory holding no more than this many files (at any
+    depth) is loaded, everything below it is loaded at once, so that
+    expanding its subdirectories costs nothing further. For most mods,
+    this means the whole tree is built when the mod is selected."""
     #TODO: calculate and inform the user of any file-conflicts that will occur in their mod-setup to help them decide what needs to be hidden.
 
     # rootPathChanged = pyqtSignal(str)
@@ -52,12 +70,20 @@ class ModFileTreeModel(QAbstractItemModel):
         self.mod = None
         """:type: skymodman.types.ModEntry"""
 
-        # maintain a flattened list of the files for the current mod
-        self._files = [] # type: list [QFSItem]
+        # sorted, flattened list of the paths of the files in the
+        # current mod
+        self._paths = [] # type: list [str]
+
+        # 1 for each file in _paths that is currently hidden, else 0
+        self._hidden = bytearray()
+
+        # the hidden files for the current 'clean state' of the tree
+        # (should correspond to entries in "hiddenfiles" db table),
+        # in the same form as _hidden
+        self._saved_state = bytes()
 
-        # set of hidden files for the current 'clean state' of the tree
-        # (should correspond to entries in "hiddenfiles" db table)
-        self._saved_state = set()
+        # lowercase path -> File_Conflict, for files that conflict
+        self._conflicts = {}
 
         self.command_queue = deque()
 
@@ -65,9 +91,6 @@ class ModFileTreeModel(QAbstractItemModel):
         """Set the mod that this model is focusing on to `mod_entry`.
         Pass ``None`` to reset the model to empty"""
 
-        # clear the index-cache
-        self._locate.cache_clear()
-
         # tells the view to get ready to redisplay its contents
         self.beginResetModel()
         self.mod = mod_entry
@@ -75,6 +98,9 @@ class ModFileTreeModel(QAbstractItemModel):
         if mod_entry is None: # reset Model to show nothing
             self.rootitem=None
             self.modname=None
+            self._paths = []
+            self._hidden = bytearray()
+            self._saved_state = bytes()
 
         else:
             # the mod's _unique_ name
@@ -93,8 +119,8 @@ class ModFileTreeModel(QAbstractItemModel):
     @property
     def current_hidden_file_indices(self):
         """Rather than querying the database, this examines the current
-        state of the FSItems in the internal _files list"""
-        return [i for i, item in enumerate(self._files) if item.hidden]
+        hidden-state of the files"""
+        return list(_set_positions(self._hidden))
 
     def _setup_or_reload_tree(self):
         """
@@ -102,89 +128,256 @@ class ModFileTreeModel(QAbstractItemModel):
         """
         self._load_tree()
 
-        # now mark hidden files
-        self._mark_hidden_files(self._saved_state)
+        # create the top level of the tree
+        self._populate(self.rootitem)
 
         # this used to call resetModel() stuff, too, but I decided
         # this wasn't the place for that. It's a little barren now...
 
     def _load_tree(self):
         """
-        Build the tree from the rootitem
+        Load the list of files for the current mod and create the root
+        item of the tree
         """
+        self._paths = [f for f in self.manager.get_mod_file_list(self.modname)
+                       if basename(f).lower() != "meta.ini"]
+
         # name for this item is never actually seen
-        self.rootitem = QFSItem(path="", name="data", parent=None)
+        self.rootitem = QFSItem(path="", name="data", parent=None,
+                                span=range(len(self._paths)))
+
+        self._hidden = bytearray(len(self._paths))
+        for i in self._get_hidden_file_indices():
+            self._hidden[i] = 1
+
+        # reset the "saved state" (hidden files on load)
+        self._saved_state = bytes(self._hidden)
+
+        self.refresh_conflicts()
+
+    def _scan_directory(self, item):
+        """
+        Yield a (name, path, span, isdir) tuple for each direct child
+        of the directory `item`: subdirectories first, then files.
+        Rather than stepping through every file below the directory,
+        the contents of each subdirectory are skipped over in a single
+        binary search.
+
+        :param QFSItem item:
+        """
+        paths = self._paths
+        prefix = item.path + "/" if item.path else ""
+        plen = len(prefix)
+
+        files = []
+
+        i, stop = item.span.start, item.span.stop
+        while i < stop:
+            path = paths[i]
+            sep = path.find("/", plen)
+
+            if sep < 0:
+                files.append((path[plen:], path, range(i, i+1), False))
+                i += 1
+            else:
+                dpath = path[:sep]
+                # '0' is the character following '/', so this is the
+                # first path after everything in the directory
+                end = bisect_left(paths, dpath + "0", i, stop)
+
+                yield path[plen:sep], dpath, range(i, end), True
+                i = end
+
+        yield from files
+
+    def _populate(self, item):
+        """
+        Create the child items for the directory `item` and add them
+        to it. If there are few enough files below `item`, the items
+        for its entire contents are created.
+
+        :param QFSItem item:
+        """
+        if len(item.span) <= self.subtree_load_limit:
+            self._load_subtree(item)
+        else:
+            for child in self._create_children(item):
+                item.add_child(child)
+
+    def _load_subtree(self, item):
+        """
+        Create the items for everything below the directory `item` in
+        a single pass over its files.
+        """
+        span = item.span
+        files = QFSItem.build_filetree(item,
+                                       self._paths[span.start:span.stop],
+                                       start=span.start)
+
+        conflicts = self._conflicts
+        for f in files:
+            f.conflict = conflicts.get(f.lpath)
+
+    def _create_children(self, item):
+        """
+        :return: new items for the contents of the directory `item`
+        :rtype: list[QFSItem]
+        """
+        conflicts = self._conflicts
+        children = []
+
+        for name, path, span, isdir in self._scan_directory(item):
+            child = QFSItem(path, name, item, isdir, span=span)
+
+            if not isdir:
+                child.conflict = conflicts.get(child.lpath)
+
+            children.append(child)
+
+        return children
 
+    ##=============================================
+    ## Lazy loading
+    ##=============================================
 
-        # build yonder tree
-        QFSItem.build_filetree(self.rootitem,
-                               self.mod.filetree,
-                               name_filter=lambda n: n.lower() == "meta.ini")
+    def hasChildren(self, parent=QModelIndex(), *args, **kwargs):
+        """Directories have children whether or not they have been
+        loaded yet"""
+        if not self.rootitem:
+            return False
 
-        # create flattened list of just the files
-        self._files = [f for f in
-                       self.rootitem.iterchildren(recursive=True)
-                       if not f.isdir]
+        item = self.getitem(parent)
+        return item.isdir and len(item.span) > 0
 
-        # reset the "saved state" (indices of hidden files on load)
-        self._saved_state = self._get_hidden_file_indices()
+    def canFetchMore(self, parent):
+        """True if `parent` is a directory whose contents have not yet
+        been loaded"""
+        if not self.rootitem:
+            return False
 
+        item = self.getitem(parent)
+        return item.isdir and not item.child_count and len(item.span) > 0
 
-    @lru_cache()
-    def _locate(self, file):
-        """Given an FSItem or a file path (str), return the index of
-        that item (or the item with that path) in the flattened file
-        list"""
+    def fetchMore(self, parent):
+        """Create the items for the contents of the directory at
+        `parent`"""
+        item = self.getitem(parent)
+        if item.child_count:
+            return
 
-        # perform a binary search for the file/path
-        i = bisect_left(self._files, file)
+        if len(item.span) <= self.subtree_load_limit:
+            count = sum(1 for _ in self._scan_directory(item))
 
-        # make sure the index returned is of the exact item searched for
-        try:
-            if self._files[i] == file:
-                return i
-        except IndexError:
-            # this will only happen if 'file' doesn't exist in list
-            # and would have come after the final item, so `i` will
-            # be equal to len(self._files). Point is, file wasn't there
-            pass
+            self.beginInsertRows(parent, 0, count - 1)
+            self._load_subtree(item)
+        else:
+            children = self._create_children(item)
 
-        raise ValueError
+            self.beginInsertRows(parent, 0, len(children) - 1)
+            for child in children:
+                item.add_child(child)
+
+        self.endInsertRows()
+
+    def refresh_conflicts(self):
+        """
+        Look up which of the current mod's files conflict with other
+        mods (and which mod wins each conflict), and record that on
+        the items so that data() need not work it out while painting.
+        Called again whenever the order or enabled-state of the mods
+        changes while the mod is shown (see
+        ``FileTabTreeView.watch_mod_table()``), in which case the
+        Conflicts column is updated for the files whose winner changed.
+        """
+        if self.mod is None:
+            return
+
+        self._conflicts = details = self.manager.file_conflict_details(
+            self.modname)
+
+        # update the files that have already been loaded, noting the
+        # directories containing those whose conflict has changed
+        changed = set()
+        if self.rootitem:
+            for item in self.rootitem.iterchildren(recursive=True):
+                if not item.isdir:
+                    conflict = details.get(item.lpath)
+                    if conflict != item.conflict:
+                        item.conflict = conflict
+                        changed.add(item.parent)
+
+        # one signal for all the children of each such directory
+        for d in changed:
+            last = d.child_count - 1
+            self.emit_dataChanged(
+                self.createIndex(0, COL_CONFLICTS, d[0]),
+                self.createIndex(last, COL_CONFLICTS, d[last]))
 
     def _get_hidden_file_indices(self):
         """Get the set of currently hidden files from the database
         and return a list of the indices corresponding to those files
-        in self._files"""
+        in self._paths"""
 
-        hidden = set()
-
-        # the alternative to this (searching for each file by path to
-        # get index) would be to do some sort of...math...or something
-        # with the start/end index of the mod's entries in the database,
-        # referencing position of each file returned...
-        # but ehhhhhhhh, math.
+        hidden = []
+        paths = self._paths
 
+        # both lists are sorted, so each search can begin where the
+        # previous one left off
+        i = 0
         for hf in self.manager.hidden_files_for_mod(self.mod.directory):
-            # NTS: As the number of hidden files approaches the total
-            # number of files in the mod, this bin search algo becomes
-            # less and less efficient compared to just going through
-            # the loop linearly once. Might be a moot point, though,
-            # as hiding the vast majority of files in a mod seems a
-            # very unlikely thing to want to do.
-            try:
-                hidden.add(self._locate(hf))
-            except ValueError:
+            i = bisect_left(paths, hf, i)
+
+            if i < len(paths) and paths[i] == hf:
+                hidden.append(i)
+            else:
                 self.LOGGER.error(f"Hidden file {hf!r} was not found")
 
         return hidden
 
-    def _mark_hidden_files(self, hidden_file_indices):
+    ##=============================================
+    ## Hidden state
+    ##=============================================
+
+    def checkstate(self, item):
+        """
+        :return: Qt.Unchecked if `item` is a hidden file or a directory
+            whose files are all hidden, Qt.Checked if none are hidden,
+            or Qt.PartiallyChecked for a directory with some of each
+        """
+        span = item.span
+        hidden = self._hidden.count(1, span.start, span.stop)
 
-        # note:: if there is an IndexError here, THE WORLD WILL BURN
-        for idx in hidden_file_indices:
-            # use the internal _set_checkstate to avoid the
-            # parent.child_state invalidation step
-            self._files[idx]._set_checkstate(Qt_Unchecked, False)
+        if not hidden:
+            return Qt_Checked
+        if hidden == len(span):
+            return Qt_Unchecked
+        return Qt_PartiallyChecked
+
+    def is_hidden(self, item):
+        """Return whether the file `item` is hidden"""
+        return bool(self._hidden[item.span.start])
+
+    def hidden_snapshot(self, span):
+        """
+        :return: a copy of the hidden-states of the files in `span`,
+            suitable for passing to ``restore_hidden()``
+        :rtype: bytes
+        """
+        return bytes(self._hidden[span.start:span.stop])
+
+    def set_hidden(self, span, hide):
+        """Hide or unhide all the files in `span`
+
+        :param range span:
+        :param bool hide:
+        """
+        self._hidden[span.start:span.stop] = (b"\x01" if hide
+                                              else b"\x00") * len(span)
+
+    def restore_hidden(self, span, snapshot):
+        """Reset the hidden-states of the files in `span` to those
+        recorded in `snapshot`"""
+        self._hidden[span.start:span.stop] = snapshot
 
     def getitem(self, index) -> QFSItem:
         """Extracts actual item from given index
@@ -295,26 +488,29 @@ class ModFileTreeModel(QAbstractItemModel):
             elif col == COL_NAME:
                 return item.name
             else: # column must be "Conflicts"
-                try:
-                    # TODO: provide a way (perhaps a drop-down list on the Conflicts column) to easily identify and navigate to the other mods containing a conflicting file
-                    if item.lpath in self.manager.file_conflicts.by_mod[self.modname]:
-                        return "Yes"
-                # if the mod was not in the conflict map,
-                # then return none
-                except KeyError:
-                    return None
+                # TODO: provide a way (perhaps a drop-down list on the Conflicts column) to easily identify and navigate to the other mods containing a conflicting file
+                conflict = item.conflict
+                if conflict:
+                    if conflict.winner == self.modname:
+                        return f"Overrides {len(conflict.others)}"
+                    if conflict.winner is None:
+                        return f"Yes ({len(conflict.others)})"
+                    return f"Overridden by {conflict.winner}"
+
+        elif col == COL_CONFLICTS:
+            if role == Qt_ToolTipRole and item.conflict:
+                return "Also in:\n" + "\n".join(item.conflict.others)
 
         # if it's not the display role, we only care about the name column
         elif col == COL_NAME:
             if role == Qt_CheckStateRole:
-                # hides the complexity of the tristate workings
-                return item.checkState
+                return self.checkstate(item)
             elif role == Qt_DecorationRole:
                 return item.icon
 
     def setData(self, index, value, role=Qt_CheckStateRole):
         """Only the checkStateRole can be edited in this model.
-        Most of the machinery for that is in the QFSItem class
+        The change is made by a HideFileCommand or HideDirectoryCommand
 
         :param QModelIndex index:
         :param value:
@@ -364,6 +560,26 @@ class ModFileTreeModel(QAbstractItemModel):
                 self.getIndexFromItem(item_botright)
             )
 
+    def emit_itemTreeChanged(self, item_path):
+        """
+        Emit dataChanged for the last item in `item_path`, for each of
+        the other (ancestor) items in it, and--if the last item is a
+        directory--for every loaded item below it.
+
+        :param list[QFSItem] item_path: as returned by
+            ``item_path_from_row_path()``
+        """
+        for item in item_path:
+            self.emit_itemDataChanged(item, item)
+
+        dirs = [item_path[-1]]
+        while dirs:
+            d = dirs.pop()
+            if d.child_count:
+                # one signal for all the children of each directory
+                self.emit_itemDataChanged(d[0], d[d.child_count-1])
+                dirs.extend(c for c in d.iterchildren() if c.isdir)
+
     def queue_command(self, command):
         """
         After creating a QUndoCommand, put it our command queue for
@@ -425,20 +641,31 @@ class ModFileTreeModel(QAbstractItemModel):
         """
 
         # hidden files right now
-        current_state = set(self.current_hidden_file_indices)
+        current_state = self._hidden
 
         # hidden files when last saved
         clean_state = self._saved_state
 
-        # deltas
-        to_hide = [self._files[i].path for i in sorted(current_state - clean_state)]
-        to_unhide = [self._files[i].path for i in  sorted(clean_state - current_state)]
+        # deltas: xor-ing the two states (as big ints) leaves a 1 for
+        # each file that has changed
+        size = len(current_state)
+        changed = (int.from_bytes(current_state, "little")
+                   ^ int.from_bytes(clean_state, "little")
+                   ).to_bytes(size, "little")
+
+        to_hide = []
+        to_unhide = []
+        for i in _set_positions(changed):
+            if current_state[i]:
+                to_hide.append(self._paths[i])
+            else:
+                to_unhide.append(self._paths[i])
 
         # update database, write to disk
         self.manager.save_hidden_files(self.mod.directory, to_unhide, to_hide)
 
         # make the current state the saved state
-        self._saved_state = current_state
+        self._saved_state = bytes(current_state)
 
 
 class ModFileTreeModel_QUndo(ModFileTreeModel):
@@ -503,6 +730,16 @@ class ModFileTreeModel_QUndo(ModFileTreeModel):
         # revert to 'clean' state
         self._stack.setIndex(self._stack.cleanIndex())
 
+
+def _set_positions(flags):
+    """Yield the index of each byte in `flags` that is equal to 1"""
+    find = flags.find
+    i = find(1)
+    while i >= 0:
+        yield i
+        i = find(1, i+1)
+
+
 if __name__ == '__main__':
     # noinspection PyUnresolvedReferences
     from sqlite3 import Row
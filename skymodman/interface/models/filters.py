@@ -10,6 +10,9 @@ class ActiveModsListFilter(QSortFilterProxyModel):
 
         self._onlyactive = True
 
+        # the text typed in the filter box
+        self._filtertext = ''
+
 
     @property
     def onlyShowActive(self):
@@ -29,6 +32,15 @@ class ActiveModsListFilter(QSortFilterProxyModel):
         self._onlyactive = enabled
         self.invalidateFilter()
 
+    def setFilterWildcard(self, text):
+        """
+        Show only the mods matching `text`, as found by the source
+        model's search index (rather than by matching every row
+        against a regular expression)
+        """
+        self._filtertext = text
+        self.invalidateFilter()
+
     def resetInternalData(self):
         self._onlyactive = True
         # self.invalidateFilter()
@@ -53,7 +65,13 @@ class ActiveModsListFilter(QSortFilterProxyModel):
 
         if self.sourceModel().mod_missing(mod): return False
 
-        return super().filterAcceptsRow(row, parent)
+        if self._filtertext:
+            # the index keeps the results for the current text, so
+            # this is just a lookup after the first row
+            return mod.key in self.sourceModel().search_index.find(
+                self._filtertext)
+
+        return True
 
 
 
@@ -1,11 +1,9 @@
-from functools import partial
-import re
-
 from PyQt5 import QtGui
 from PyQt5.QtCore import Qt, pyqtSignal, QAbstractItemModel, QModelIndex, QMimeData
 
 from skymodman.constants import (Column as COL, ModError)
 from skymodman.log import withlogger
+from skymodman.types.searchindex import ModSearchIndex
 
 # region moduleConstants
 # VISIBLE_COLS  = [COL.ORDER, COL.ENABLED, COL.NAME, COL.MODID,
@@ -114,6 +112,9 @@ class ModTable_TreeModel(QAbstractItemModel):
         self.mods = []
         """:type: skymodman.types.modcollection.ModCollection"""
         self.errors = {} # type: dict [str, int]
+
+        # for finding mods by name, folder, id or version
+        self.search_index = ModSearchIndex()
         # self.errtypes = ModError.NONE
 
         # self.vheader_field = COL_ORDER
@@ -349,10 +350,11 @@ class ModTable_TreeModel(QAbstractItemModel):
 
     def search(self, text, start_index, direction=1) -> QModelIndex:
         """
-        Search for the given text in the mod list (names, by default),
-        and return the model index of the first or next matching entry.
+        Search for the given text in the mod list (names, folders, mod
+        ids and versions), and return the model index of the first or
+        next matching entry.
 
-        :param str text: search text
+        :param str text: search text; ``*`` and ``?`` are wildcards
         :param QModelIndex start_index: the currently selected index;
             search will begin here and search down the table
         :param int direction: if negative, search backwards from
@@ -362,63 +364,24 @@ class ModTable_TreeModel(QAbstractItemModel):
         # an invalid index will have row==-1
         current_row = start_index.row()
 
-        reverse = direction < 0
-
-        # Wildcard matching:
-        #replace any '*' and '?' with '.*' and '.', respectively,
-        # but maintain any '.' (or other re metachars) in the text as
-        # literal chars
-        regex = re.sub(r'\\\?', '.',
-                       re.sub(r'\\\*', '.*',
-                            re.escape(text))
-                       )
+        # the rows of all the matches; no need to look at the others
+        rows = [self.mods.index(k) for k in self.search_index.find(text)]
 
-        # compile for performance
-        regex = re.compile(regex, re.IGNORECASE)
-
-        # setup function to compare a mod's name with the regex
-        def findstr(modentry):
-            return regex.search(modentry.name)
-
-        # and set that function as the first arg for the method that
-        # searches parts of the list
-        searcher = partial(self._search_slice, findstr)
+        if not rows:
+            return QModelIndex()
 
-        try:
-            # search backwards if dir<0
-            next_result = searcher(
-                start=current_row-1,
-                step=-1) if reverse else searcher(
-                start=current_row+1)
-
-        except StopIteration:
-            # we've reached one end of the list, so wrap search
-            # to the opposite end and continue until we either find a
-            # match or return to the starting point.
-            try:
-                next_result = searcher(
-                    end=current_row-1,
-                    step=-1) if reverse else searcher(
-                    end=current_row + 1)
-            except StopIteration:
-                return QModelIndex()
-
-        if next_result:
-            return self.createIndex(next_result.ordinal, COL_NAME)
-
-        # i don't think we'll ever reach here...
-        # but better safe than sorry, I guess
-        self.LOGGER << "<--End of mod table search"
-        return QModelIndex()
+        if direction < 0:
+            if current_row < 0:
+                current_row = len(self.mods)
+            # when we reach the start of the list, wrap around to the
+            # end (which may bring us back to where we started)
+            row = max((r for r in rows if r < current_row),
+                      default=max(rows))
+        else:
+            row = min((r for r in rows if r > current_row),
+                      default=min(rows))
 
-    def _search_slice(self, match_func, start=None, end=None, step=1):
-        if start is None:
-            if end is None:
-                return next(filter(match_func, self.mods[::step]))
-            return next(filter(match_func, self.mods[:end:step]))
-        elif end is None:
-            return next(filter(match_func, self.mods[start::step]))
-        return next(filter(match_func, self.mods[start:end:step]))
+        return self.createIndex(row, COL_NAME)
 
     ##===============================================
     ## Setting Data
@@ -457,7 +420,9 @@ class ModTable_TreeModel(QAbstractItemModel):
             elif index.column() == COL_NAME:
                 # assume name is valid (view does check)
 
-                self.mods[index.row()].name = value
+                mod = self.mods[index.row()]
+                mod.name = value
+                self.search_index.update(mod)
 
                 self.dataChanged.emit(index, index)
 
@@ -612,6 +577,7 @@ class ModTable_TreeModel(QAbstractItemModel):
         # so we shouldn't modify it (unless specifically told to do so
         # by user interaction, of course)
         self.mods = self.Manager.modcollection
+        self.search_index.rebuild(self.mods)
 
         # see if we currently have any errors
         self.check_mod_errors()
@@ -619,6 +585,21 @@ class ModTable_TreeModel(QAbstractItemModel):
         self.endResetModel()
         self.tablehaschanges.emit(False)
 
+    def unload_data(self):
+        """
+        Let go of the application's mod collection and show an empty
+        table. Called while a new profile is loading, since the
+        collection is rebuilt in the background during that time.
+        """
+        self.beginResetModel()
+
+        self.mods = []
+        self.errors = {}
+        self.search_index.rebuild(())
+
+        self.endResetModel()
+        self.tablehaschanges.emit(False)
+
     def check_mod_errors(self):
         """
         Check which mods, if any, encountered errors during load and
@@ -760,6 +741,9 @@ class ModTable_TreeModel(QAbstractItemModel):
 
         self.beginRemoveRows(parent, row, end)
 
+        for i in range(row, end+1):
+            self.search_index.discard(self.mods[i].key)
+
         self.Manager.Collector.delete_items(row, count)
 
         self.endRemoveRows()
@@ -788,6 +772,9 @@ class ModTable_TreeModel(QAbstractItemModel):
 
         self.Manager.Collector.insert_items(row, entries, errors)
 
+        for e in entries:
+            self.search_index.add(e)
+
         self.endInsertRows()
 
     def add_mod(self, entry):
@@ -1,3 +1,5 @@
+import asyncio
+
 from PyQt5 import QtCore, QtWidgets
 from PyQt5.QtCore import Qt, pyqtSignal as Signal, pyqtSlot as Slot
 
@@ -6,6 +8,7 @@ from skymodman.constants.keystrings import INI
 from skymodman.log import withlogger
 from skymodman.interface.models import ProfileListModel
 from skymodman.interface.dialogs import message
+from skymodman.interface.ui_utils import blocked_signals
 
 @withlogger
 class ProfileHandler(QtCore.QObject):
@@ -16,6 +19,18 @@ class ProfileHandler(QtCore.QObject):
 
     enableProfileActions = Signal(bool, str, bool)
 
+    profileLoadStarted = Signal(str)
+    """emitted with the name of the profile when it starts loading in
+    the background (including when it replaces a load in progress)"""
+
+    profileLoadProgress = Signal(int, int, str)
+    """emitted with (stage, number of stages, description) as each stage
+    of the load begins"""
+
+    profileLoadFinished = Signal()
+    """emitted when loading is over, whether it succeeded or not;
+    on success, newProfileLoaded has been emitted just before"""
+
     def __init__(self, parent, *args, **kwargs):
 
         self._parent = parent # the main window
@@ -38,10 +53,27 @@ class ProfileHandler(QtCore.QObject):
         # currently selected index in the profile-selector box
         self._selidx = -1
 
+        # the task loading a profile in the background, if any, and
+        # the name of that profile
+        self._load_task = None # type: asyncio.Task
+        self._loading = None # type: str
+        # incremented for each load; lets a load that has been replaced
+        # by a newer one know that it was superseded
+        self._load_serial = 0
+        # held by the load that is using the Manager
+        self._load_lock = None # type: asyncio.Lock
+
     @property
     def current_index(self):
         return self._selidx
 
+    @property
+    def load_task(self):
+        """The asyncio.Task loading a profile, or None if no profile
+        is currently being loaded. Cancelling the task stops the load
+        and returns to the previously active profile."""
+        return self._load_task
+
     def setup(self, manager, selector):
         """Once the Manager has been initialized, call this to populate
         the profile list model and associate the selector combobox
@@ -127,7 +159,7 @@ class ProfileHandler(QtCore.QObject):
 
         old_index = self._selidx
 
-        if index == old_index:
+        if index == old_index and self._load_task is None:
             # ignore this; it just means that the user clicked cancel
             # in the "save changes" dialog and we're resetting the
             # displayed profile name.
@@ -142,6 +174,17 @@ class ProfileHandler(QtCore.QObject):
             new_profile = self._selector.currentData(
                 Qt.UserRole)
 
+            if self._load_task is not None:
+                # the user picked a different profile while one was
+                # still loading; there can be no unsaved changes at
+                # this point, so just switch to loading the new one
+                if new_profile != self._loading:
+                    self.LOGGER.info(
+                        f"Activating profile '{new_profile}' instead "
+                        f"of '{self._loading}'")
+                    self._begin_profile_load(new_profile, index)
+                return
+
             # if no active profile, just load the selected one.
             # if somehow selected the same profile, do nothing
 
@@ -167,32 +210,115 @@ class ProfileHandler(QtCore.QObject):
                 self.LOGGER.info(
                     f"Activating profile '{new_profile}'")
 
-                if self.Manager.activate_profile(new_profile):
+                # No => "Don't save changes, drop them"
+                # if reply == QtWidgets.QMessageBox.No:
 
-                    self.LOGGER << "Resetting views for new profile"
+                # Whether they clicked "no" or not, we
+                # don't bother reverting, mods list is getting
+                # reset
 
-                    # update our variable which tracks the current index
-                    self._selidx = index
+                self._begin_profile_load(new_profile, index)
 
-                    # No => "Don't save changes, drop them"
-                    # if reply == QtWidgets.QMessageBox.No:
+    def _begin_profile_load(self, profile_name, index):
+        """
+        Start loading the profile `profile_name` (shown at `index` in
+        the profile selector) in the background. If another profile is
+        already loading, that load is cancelled; the new one waits for
+        it to wind down before starting.
 
-                    # Whether they clicked "no" or not, we
-                    # don't bother reverting, mods list is getting
-                    # reset; just disable the buttons
-                    # self.mod_table.undo_stack.clear()
+        :param str profile_name:
+        :param int index:
+        """
+        if self._load_task is not None:
+            self._load_task.cancel()
+
+        if self._load_lock is None:
+            self._load_lock = asyncio.Lock()
+
+        self._load_serial += 1
+        self._loading = profile_name
+        self._load_task = asyncio.get_event_loop().create_task(
+            self._load_profile(profile_name, index, self._load_serial))
+
+        # no renaming/removing profiles while one is loading
+        self.enableProfileActions.emit(False, "Remove Profile", False)
 
-                    # update name
-                    self._profile_name = new_profile
-                    # disable/enable buttons as needed
-                    self.check_enable_actions()
+        # let the rest of the app get off the data
+        self.profileLoadStarted.emit(profile_name)
+
+    async def _load_profile(self, profile_name, index, serial):
+        """
+        Have the Manager activate `profile_name`, then let everyone
+        know how it went.
+
+        :param int serial: the value of ``_load_serial`` for this load
+        """
 
-                    # tell rest of app about new profile
-                    self.newProfileLoaded.emit(new_profile)
-                else:
-                    self.LOGGER.error("Profile Activation failed.")
-                    self._selector.setCurrentIndex(old_index)
+        try:
+            # only one load may use the Manager at a time; a superseded
+            # load finishes the stage it's on before it lets go
+            async with self._load_lock:
+                success = await self.Manager.activate_profile_async(
+                    profile_name, progress=self.profileLoadProgress.emit)
 
+        except asyncio.CancelledError:
+            if serial == self._load_serial:
+                # cancelled by the user rather than superseded
+                self._load_cancelled(profile_name)
+            raise
+
+        self._load_task = self._loading = None
+
+        if success:
+            self.LOGGER << "Resetting views for new profile"
+
+            # update our variable which tracks the current index
+            self._selidx = index
+            # update name
+            self._profile_name = profile_name
+        else:
+            # the Manager has gone back to the previous profile (if
+            # any); show that in the selector
+            self.LOGGER.error("Profile Activation failed.")
+            if not self.Manager.profile:
+                # nothing to go back to (e.g. this load replaced one
+                # that was cancelled partway through)
+                self._profile_name = None
+                self._selidx = -1
+            with blocked_signals(self._selector):
+                self._selector.setCurrentIndex(self._selidx)
+
+        self._load_finished()
+
+    def _load_cancelled(self, profile_name):
+        """
+        The user cancelled loading `profile_name`, which leaves the
+        Manager with no active profile. Go back to the profile that
+        was active before, unless that's the one that was cancelled.
+        """
+        self._load_task = self._loading = None
+
+        if self._profile_name and self._profile_name != profile_name:
+            self.LOGGER << f"Reloading profile '{self._profile_name}'"
+            with blocked_signals(self._selector):
+                self._selector.setCurrentIndex(self._selidx)
+            self._begin_profile_load(self._profile_name, self._selidx)
+        else:
+            self._profile_name = None
+            self._selidx = -1
+            with blocked_signals(self._selector):
+                self._selector.setCurrentIndex(-1)
+            self._load_finished()
+
+    def _load_finished(self):
+        # disable/enable buttons as needed
+        self.check_enable_actions()
+
+        # tell rest of app about new (or restored) profile
+        if self._profile_name:
+            self.newProfileLoaded.emit(self._profile_name)
+
+        self.profileLoadFinished.emit()
 
     @Slot()
     def on_new_profile_action(self):
@@ -221,6 +347,24 @@ class ProfileHandler(QtCore.QObject):
         del NewProfileDialog
 
 
+    @Slot()
+    def on_compare_profiles_action(self):
+        """
+        Show a dialog listing the differences between the saved states
+        of two profiles, starting with the active one.
+        """
+
+        from skymodman.interface.dialogs.profile_diff_dialog \
+            import ProfileDiffDialog
+
+        popup = ProfileDiffDialog(manager=self.Manager,
+                                  combobox_model=self.model,
+                                  current=self._profile_name,
+                                  parent=self._parent)
+        popup.exec_()
+
+        del ProfileDiffDialog
+
     @Slot()
     def on_remove_profile_action(self):
         """
@@ -0,0 +1,139 @@
+from collections import OrderedDict
+
+from PyQt5.QtCore import (Qt, QObject, QRunnable, QThreadPool, QSize,
+                          pyqtSignal)
+from PyQt5.QtGui import QImage, QImageReader
+
+
+class ThumbnailCache(QObject):
+    """
+    Decodes images on worker threads, scaling them down to at most
+    `max_size` as they are read, and keeps a limited number of the
+    results (as QImages) in memory. The most recently used images are
+    kept; the least recently used are dropped first.
+
+    QPixmaps can only be created on the GUI thread, so it is left to
+    the consumer to convert the images when (and if) they are shown.
+    """
+
+    thumbnail_ready = pyqtSignal(str)
+    """Emitted with the path of an image when it has been decoded and
+    is available from ``get()``"""
+
+    def __init__(self, max_size=QSize(1280, 1280), capacity=32,
+                 max_threads=2, parent=None):
+        """
+
+        :param QSize max_size: images larger than this (in either
+            dimension) are scaled to fit within it, keeping their
+            aspect ratio
+        :param int capacity: maximum number of images to keep
+        :param int max_threads: maximum number of images that will be
+            decoded at the same time
+        """
+        super().__init__(parent)
+
+        self.max_size = max_size
+        self.capacity = capacity
+
+        self._cache = OrderedDict() # path -> QImage
+        self._pending = set()
+        # set by shutdown(); no more requests are accepted after that
+        self._closed = False
+
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads)
+
+        # receives the results from the worker threads; being owned by
+        # the GUI thread, its signals are delivered there
+        self._signals = _DecodeSignals(self)
+        self._signals.decoded.connect(self._on_decoded)
+
+    def get(self, path):
+        """
+        :return: the decoded image for `path` if it is in the cache,
+            otherwise None
+        :rtype: QImage
+        """
+        try:
+            self._cache.move_to_end(path)
+        except KeyError:
+            return None
+        return self._cache[path]
+
+    def request(self, path):
+        """
+        Begin decoding the image at `path` in the background if it is
+        neither cached nor already being decoded. ``thumbnail_ready``
+        will be emitted once it is available. Does nothing once
+        ``shutdown()`` has been called.
+        """
+        if self._closed \
+                or path in self._cache or path in self._pending:
+            return
+
+        self._pending.add(path)
+        self._pool.start(_DecodeTask(path, self.max_size, self._signals))
+
+    def prefetch(self, paths):
+        """Request each of the images in `paths`"""
+        for p in paths:
+            self.request(p)
+
+    def clear(self):
+        """Drop all cached images and any decodes not yet started"""
+        self._pool.clear()
+        self._pending.clear()
+        self._cache.clear()
+
+    def shutdown(self):
+        """Drop everything (as ``clear()``), wait for any running
+        decodes to finish, and ignore any further requests; e.g.
+        before the images are deleted"""
+        self._closed = True
+        self.clear()
+        self._pool.waitForDone()
+
+    def _on_decoded(self, path, image):
+        if path not in self._pending:
+            # cleared while decoding
+            return
+        self._pending.discard(path)
+
+        if image.isNull():
+            # unreadable; nothing to show
+            return
+
+        self._cache[path] = image
+        while len(self._cache) > self.capacity:
+            self._cache.popitem(last=False)
+
+        self.thumbnail_ready.emit(path)
+
+
+class _DecodeSignals(QObject):
+    decoded = pyqtSignal(str, QImage)
+
+
+class _DecodeTask(QRunnable):
+    """Reads and scales a single image in a worker thread"""
+
+    def __init__(self, path, max_size, signals):
+        super().__init__()
+        self.path = path
+        self.max_size = max_size
+        self.signals = signals
+
+    def run(self):
+        reader = QImageReader(self.path)
+        reader.setAutoTransform(True)
+
+        size = reader.size()
+        if size.isValid() and (size.width() > self.max_size.width()
+                               or size.height() > self.max_size.height()):
+            # let the decoder do the scaling; for many formats this
+            # is much cheaper than decoding at full size first
+            reader.setScaledSize(size.scaled(self.max_size,
+                                             Qt.KeepAspectRatio))
+
+        self.signals.decoded.emit(self.path, reader.read())
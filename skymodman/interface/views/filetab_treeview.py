@@ -119,6 +119,34 @@ class FileTabTreeView(QtWidgets.QTreeView):
         # cleanup
         del ModFileTreeModel_QUndo, FileViewerTreeFilter
 
+    def watch_mod_table(self, table_model):
+        """
+        Keep the Conflicts column current with the order and
+        enabled-state of the mods: refresh it whenever mods are moved,
+        added, removed or enabled/disabled in the mod table (including
+        through undo/redo), or the table is reset (e.g. on revert).
+
+        :param skymodman.interface.models.ModTable_TreeModel table_model:
+        """
+        from skymodman.interface.models.modtable_treemodel import \
+            COL_ENABLED
+
+        def refresh(*args):
+            self._srcmodel.refresh_conflicts()
+
+        def on_data_changed(topleft, bottomright, *args):
+            # e.g. a mod's name being edited doesn't affect conflicts
+            if topleft.column() <= COL_ENABLED <= bottomright.column():
+                refresh()
+
+        for signal in (table_model.rowsMoved,
+                       table_model.rowsInserted,
+                       table_model.rowsRemoved,
+                       table_model.modelReset):
+            signal.connect(refresh)
+
+        table_model.dataChanged.connect(on_data_changed)
+
     def reset_view(self):
         """Reset view to a clean state"""
 
@@ -355,6 +355,15 @@ class ModTable_TreeView(QtWidgets.QTreeView):
             self._model.index(0),
             qISM.NoUpdate)
 
+    def unload_data(self):
+        """
+        Empty the table (and its undo stack) while a new profile is
+        being loaded. ``reset_view()`` fills it again.
+        """
+        self._searchbox.clear()
+        self.undo_stack.clear()
+        self._model.unload_data()
+
     def toggle_selection_checkstate(self):
         """
         Toggle the enabled-state of the currently selected mod(s)
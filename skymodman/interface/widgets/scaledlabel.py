@@ -28,14 +28,29 @@ class ScaledLabel(QLabel):
         :param from_file:
         """
         self._pixmap = get_pixmap_from_file(from_file)
+        self._show_scaled(from_file)
 
+    def setScaledImage(self, image, key):
+        """
+        Like setScaledPixmap(), but for an already-loaded QImage (such
+        as one decoded by a background thread). Only the conversion
+        to a pixmap happens here.
+
+        :param QtGui.QImage image:
+        :param key: identifies the image for the scaled-pixmap cache;
+            usually the path it was loaded from
+        """
+        self._pixmap = QPixmap.fromImage(image)
+        self._show_scaled(key)
+
+    def _show_scaled(self, key):
         # if there have been any resize events since we last
         # loaded a pixmap, clear the cached scale-results.
         if not self._scaled_cache_valid:
             self.scale_pixmap.cache_clear()
             self._scaled_cache_valid = True
 
-        self.setPixmap(self.scale_pixmap(from_file))
+        self.setPixmap(self.scale_pixmap(key))
 
 
     @lru_cache(8)
@@ -23,7 +23,12 @@ def getconn(path):
     ``None`` and sensible commit/rollback policies when used as a
     context manager.
     """
-    conn = sqlite3.connect(path, factory=HappyConn)
+    # profiles are loaded in a worker thread (see
+    # ModManager.activate_profile_async()), so the connection can't be
+    # tied to the thread that created it. Access is never concurrent:
+    # the interface stays off the database while a profile loads.
+    conn = sqlite3.connect(path, factory=HappyConn,
+                           check_same_thread=False)
     # "isolation_level = None" seems like a simple-enough thing
     # to understand, but in truth it replaces the dark magic
     # of pysqlite's auto-transactions with a new kind of dark
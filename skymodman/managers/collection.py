@@ -43,6 +43,32 @@ class ModCollectionManager(Submanager):
     def reset(self):
         self._collection.clear()
 
+    def snapshot(self):
+        """
+        Copy the current state of the collection (order and fields of
+        every entry) and the mod errors, such that later changes to
+        either will not affect the copy.
+
+        :return: a value that can be passed to ``restore()``
+        """
+        return (tuple(tuple(m) for m in self._collection),
+                dict(self._errors),
+                self._errtypes)
+
+    def restore(self, snapshot):
+        """
+        Replace the contents of the collection and the mod errors with
+        a copy of those saved by ``snapshot()``.
+        """
+        entries, errors, errtypes = snapshot
+
+        self._collection.clear()
+        self._collection.extend(ModEntry._make(m) for m in entries)
+
+        self._errors.clear()
+        self._errors.update(errors)
+        self._errtypes = errtypes
+
     ##=============================================
     ## Collection manipulation
     ##=============================================
@@ -2,6 +2,7 @@ from pathlib import PurePath
 from itertools import repeat
 from collections import defaultdict, namedtuple
 
+from skymodman import metrics
 from skymodman.managers.base import Submanager, BaseDBManager
 
 from skymodman.log import withlogger
@@ -47,6 +48,11 @@ _SCHEMA = """
 
 File_Conflict_Map = namedtuple("File_Conflict_Map", "by_file by_mod")
 
+# others: tuple of the other mods containing the same file
+# winner: the mod whose copy of the file will actually be used, or
+#     None if no mod containing the file is enabled
+File_Conflict = namedtuple("File_Conflict", "others winner")
+
 # from skymodman.utils import humanizer
 # @humanizer.humanize
 @withlogger
@@ -121,6 +127,7 @@ class DBManager(BaseDBManager, Submanager):
     ## Table population
     ##=============================================
 
+    @metrics.timed
     def add_to_mods_table(self, mod_list):
         """
         Does not check for an empty mods table.
@@ -140,6 +147,8 @@ class DBManager(BaseDBManager, Submanager):
                 # mark db as initialized (if it wasn't already)
                 self._empty['mods'] = False
 
+            metrics.count("DBManager.rows_inserted", c.rowcount)
+
     def populate_mods_table(self, mod_list):
         """Similar to add_to_mods_table, but this first checks to see if
         the mods table is empty before attempting to add any data to it.
@@ -152,6 +161,7 @@ class DBManager(BaseDBManager, Submanager):
                 "Attempted to populate non-empty table 'mods'.")
 
     # noinspection PyShadowingBuiltins
+    @metrics.timed
     def add_files(self, type, for_mod, files):
         """
         Record the list of filepaths in the database keyed by the mod
@@ -166,12 +176,54 @@ class DBManager(BaseDBManager, Submanager):
             table = type + "files"
             if table in self._tablenames:
                 with self.conn:
-                    self.conn.executemany(
+                    c = self.conn.executemany(
                         "INSERT INTO " + table + " VALUES (?, ?)",
                         zip(repeat(for_mod), files))
 
                     self._empty[table] = False
 
+                metrics.count("DBManager.rows_inserted", c.rowcount)
+
+    # noinspection PyShadowingBuiltins
+    @metrics.timed
+    def dump_files(self, type):
+        """
+        Return every row of one of the file tables, e.g. to put them
+        back later with ``restore_files()``.
+
+        :param type: 'mod', 'missing', or 'hidden'
+        :return: list of (mod directory, filepath) tuples
+        :rtype: list[tuple[str, str]]
+        """
+        table = type + "files"
+        if table not in self._tablenames or self._empty[table]:
+            return []
+
+        return [tuple(r) for r in self.conn.execute(
+            "SELECT directory, filepath FROM " + table)]
+
+    # noinspection PyShadowingBuiltins
+    @metrics.timed
+    def restore_files(self, type, rows):
+        """
+        Add rows previously obtained from ``dump_files()`` back into
+        the appropriate table.
+
+        :param type: 'mod', 'missing', or 'hidden'
+        :param rows: sequence of (mod directory, filepath) tuples
+        """
+        if rows:
+            table = type + "files"
+            if table in self._tablenames:
+                with self.conn:
+                    c = self.conn.executemany(
+                        "INSERT INTO " + table + " VALUES (?, ?)", rows)
+
+                    self._empty[table] = False
+
+                metrics.count("DBManager.rows_inserted", c.rowcount)
+
+    @metrics.timed
     def remove_files(self, for_mod):
         """
         Remove all data rows from the modfiles table that belong to the
@@ -207,6 +259,7 @@ class DBManager(BaseDBManager, Submanager):
     ## Mostly convenenience methods
     ##=============================================
 
+    @metrics.timed
     def detect_file_conflicts(self):
         """
         Using the data in the 'modfiles' table, detect any file
@@ -259,10 +312,12 @@ class DBManager(BaseDBManager, Submanager):
         else:
             self.LOGGER << "No entries present in modfiles table"
 
-        # convert to normal dicts when adding to conflict map
+        # convert to normal dicts when adding to conflict map; the
+        # per-mod sets allow constant-time membership tests
         return File_Conflict_Map(
-            by_file=dict(conflicts),
-            by_mod=dict(mods_with_conflicts))
+            by_file={f: tuple(mods) for f, mods in conflicts.items()},
+            by_mod={m: frozenset(files)
+                    for m, files in mods_with_conflicts.items()})
 
         # for c in mods_with_conflicts['Bethesda Hi-Res DLC Optimized']:
         #     print("other mods containing file '%s'" % c)
@@ -8,7 +8,7 @@ from typing import List #, Dict, Tuple, Any
 from pathlib import Path
 from collections import namedtuple
 
-from skymodman import exceptions
+from skymodman import exceptions, metrics
 # from skymodman.constants import ModError
 from skymodman.managers.base import Submanager
 from skymodman.log import withlogger
@@ -62,6 +62,7 @@ class IOManager(Submanager):
     ##=============================================
 
     # def load_mod_info
+    @metrics.timed
     def load_saved_modlist(self, json_source, container):
         """
         read the saved mod information from a json file and
@@ -190,6 +191,7 @@ class IOManager(Submanager):
 
         return True
 
+    @metrics.timed
     def create_mods_from_directories(self, directories):
         """Given the names of some directories within the Mod-install
         Appfolder, create ModEntry objects representing each directory.
@@ -246,6 +248,7 @@ class IOManager(Submanager):
     ## Loading file lists
     ##=============================================
 
+    @metrics.timed
     def load_all_mod_files(self):
         """
         This generates tuples of the form
@@ -297,6 +300,7 @@ class IOManager(Submanager):
             # yield (mdir, mfiles)
 
     @staticmethod
+    @metrics.timed
     def files_for_mod_dir(mod_repo, dir_name,
                           ## byte-code opti-hack
                           join=os.path.join,
@@ -325,8 +329,12 @@ class IOManager(Submanager):
                                   mod_root).lower()
                           for f in files)
 
+        metrics.count("IOManager.files_walked", len(mfiles))
+        metrics.observe("IOManager.files_per_mod", len(mfiles))
+
         return mfiles
 
+    @metrics.timed
     def load_unmanaged_files(self):
         """
         Yield the files for the unamanged 'Vanilla' mods and any other
@@ -359,6 +367,7 @@ class IOManager(Submanager):
     ## loading list of hidden files
     ##=============================================
 
+    @metrics.timed
     def load_hidden_files(self, json_source):
         """
         A generator which reads the list of hidden files from the saved
@@ -426,6 +435,7 @@ class IOManager(Submanager):
     ## Writing Data
     ##=============================================
 
+    @metrics.timed
     def save_mod_info(self, json_target, mod_container):
         """
         Write the data from the sequence of ``ModEntry`` objects
@@ -579,7 +589,7 @@ def vanilla_mods(skyrim_dir) -> List[VModInfo]:
             try:
                 um_files.remove(f.lower())
                 isp=True
-            except KeyError:
+            except ValueError:
                 info.missing_files.append(f)
 
         dlc_mods[dlc] = info._replace(is_present=isp)
@@ -4,11 +4,13 @@ import re
 from collections import deque
 from pathlib import Path #, PurePath
 
+from skymodman import metrics
 from skymodman.managers.base import Submanager
 from skymodman.installer.fomod import Fomod
 from skymodman.installer.infoxml import InfoXML
 
 from skymodman.types.archivefs import archivefs as arcfs
+from skymodman.types.archivefs.compact import CompactArchiveFS
 from skymodman.log import withlogger
 # from skymodman.utils.tree import Tree
 from skymodman.utils.archive import ArchiveHandler
@@ -21,6 +23,10 @@ class InstallManager(Submanager):
     directories into the appropriate locations.
     """
 
+    # archives with more files than this will be represented by the
+    # more memory-efficient CompactArchiveFS in mkarchivefs()
+    COMPACT_FS_THRESHOLD = 50000
+
     # noinspection PyArgumentList
     def __init__(self, mod_archive, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -30,14 +36,22 @@ class InstallManager(Submanager):
         self.arc_path = Path(mod_archive)
         self.archive_files = None
         self.archive_dirs = None
+        # sorted, indexed version of the above; see get_listing()
+        self.listing = None
         self.fomod = None # holds parsed fomod config
         self.info = None  # holds parsed info.xml
 
         # maintain a mapping of lower-case versions of the image-paths
-        # defined in the fomod config to the actual filesystem-location
-        # of the extracted images (likely in a temp dir, having been
-        # extracted for display with the Fomod-installer)
+        # defined in the fomod config to the actual (case-sensitive)
+        # paths of those images in the archive. The images are
+        # extracted for display with the Fomod-installer as needed,
+        # likely to a temp dir (self._image_dir)
         self.normalized_imgpaths = {}
+        self._image_dir = None
+        # lower-case paths of the images that are on disk; and those
+        # currently being extracted, mapped to the task extracting them
+        self._extracted_images = set()
+        self._extracting_images = {}
 
         # name of the directory where we will install the mod
         # (initial value is tentative)
@@ -120,6 +134,7 @@ class InstallManager(Submanager):
             self._install_dirname = self.info.name.lower()
 
 
+    @metrics.timed
     async def prepare_fomod(self, xmlfile, extract_dir=None):
         """
         Using the specified ModuleConfig.xml file `xmlfile`,
@@ -127,9 +142,9 @@ class InstallManager(Submanager):
         archive in an earlier phase of installation), parse and
         analyze the script to prepare a Fomod object to give to an
         installer interface. Go ahead and mark any files marked as
-        'required installs' for installation. Finally, extract any
-        images that were referenced in the script so that they can be
-        shown during the installation process.
+        'required installs' for installation. Finally, extract the
+        images shown on the first pages of the installer; the rest
+        can be extracted as needed with ``extract_fomod_images()``.
 
         :param xmlfile:
         :param extract_dir: Where any images referenced by the script
@@ -141,53 +156,143 @@ class InstallManager(Submanager):
         self.files_installed = deque()
 
         # todo: figure out what sort of things can go wrong while reading the fomod config, wrap them in a FomodError (within fomod.py), and catch that here so we can report it without crashing
-        self.fomod = Fomod(xmlfile, self.mainmanager.checkFileState)
+        self.fomod = Fomod(xmlfile, self.mainmanager.get_file_states,
+                           self.archive)
 
         # we don't want to extract the entire archive before we start,
-        # but we do need to extract any images defined in the
-        # config file so that they can be shown during installation
+        # but we do need any images defined in the config file so
+        # that they can be shown during installation. Only those
+        # needed right away are extracted now; those for each install
+        # step are extracted as the wizard gets to it.
+        self.normalized_imgpaths = {}
+        self._extracted_images = set()
+        self._extracting_images = {}
+        self._image_dir = extract_dir
+
         if self.archive \
                 and self.fomod.all_images \
                 and extract_dir is not None:
 
-            # this is the only place we do this, so no need to have
-            # another coroutine for it...
-            #XX await self._extract_fomod_images(extract_dir)
-
-            # todo: maybe check to see if the images were inside the fomod directory, in which case they're already extracted.  Or, maybe only extract the config file by default instead of the entire fomod dir...
+            # map the image paths to archive entries using the listing
+            # rather than looking on the disk
+            wanted = {img.lower() for img in self.fomod.all_images}
+            listing = await self.get_listing()
+            self.normalized_imgpaths = {
+                f.lower(): f for f in listing.files
+                if f.lower() in wanted}
 
-            await self.extract(extract_dir,
-                               entries=self.fomod.all_images)
+            first_images = [self.fomod.modimage.path]
+            if self.fomod.installsteps:
+                first_images.extend(
+                    self.step_images(self.fomod.installsteps[0]))
 
-            join = os.path.join
-            relpath = os.path.relpath
-            # get lowercase, relative versions of all files extracted
-            # so far and store them for later reference
-            norm_fomodfiles = {}
-            for root, dirs, files in os.walk(extract_dir):
-                for f in files:
-                    norm_fomodfiles[
-                        relpath(join(root, f), extract_dir).lower()
-                    ] = join(root, f)
-
-            # ok, so this contains more than just the img paths...but
-            # it's the most reliable way to make sure all the images
-            # are represented correctly.
-            self.normalized_imgpaths = norm_fomodfiles
+            await self.extract_fomod_images(first_images)
 
         # pprint(self.files_to_install)
 
+    @staticmethod
+    def step_images(step):
+        """
+        :param skymodman.installer.common.InstallStep step:
+        :return: the paths of the images used by the plugins in `step`
+        """
+        return [plugin.image
+                for group in step.optionalFileGroups
+                for plugin in group.plugins
+                if plugin.image]
+
+    @metrics.timed
+    async def extract_fomod_images(self, images):
+        """
+        Extract those of the fomod config's `images` that have not
+        already been extracted to the image directory given to
+        ``prepare_fomod()``. If some are already being extracted (by an
+        earlier call), wait for that to finish, too, so that when this
+        returns all of `images` that are in the archive are on disk.
+
+        :param images: image paths as specified in the config
+        """
+        if self._image_dir is None:
+            return
+
+        entries = {}
+        # tasks of earlier calls that are extracting some of `images`
+        pending = set()
+        for img in images:
+            key = img.lower()
+            if key in self._extracted_images:
+                continue
+            if key in self._extracting_images:
+                pending.add(self._extracting_images[key])
+                continue
+            try:
+                entry = self.normalized_imgpaths[key]
+            except KeyError:
+                # not in the archive
+                continue
+
+            if os.path.exists(os.path.join(self._image_dir, entry)):
+                # e.g. was in the already-extracted fomod folder
+                self._extracted_images.add(key)
+            else:
+                entries[key] = entry
+
+        task = None
+        if entries:
+            task = asyncio.ensure_future(self._extract_images(entries))
+            for key in entries:
+                self._extracting_images[key] = task
+
+        if pending:
+            # an error in another call's extraction is reported to
+            # that call; asyncio.wait() doesn't raise it (or cancel
+            # the task if we are cancelled)
+            await asyncio.wait(pending)
+        if task is not None:
+            # shielded so that, if we are cancelled, the other calls
+            # waiting for these images still get them
+            await asyncio.shield(task)
+
+    def cancel_fomod_image_extraction(self):
+        """
+        Cancel any extractions started by ``extract_fomod_images()``
+        that are still running, e.g. when the installer is closed and
+        the image directory is about to be removed.
+        """
+        for task in set(self._extracting_images.values()):
+            task.cancel()
+
+    async def _extract_images(self, entries):
+        """
+        :param dict[str, str] entries: mapping of lower-case image
+            paths to the archive entries to extract for them
+        """
+        # prepare_fomod() replaces these; if that happens while we're
+        # extracting, leave the new ones alone
+        extracted = self._extracted_images
+        extracting = self._extracting_images
+        try:
+            await self.extract(self._image_dir,
+                               entries=list(entries.values()))
+            extracted.update(entries)
+        finally:
+            for key in entries:
+                extracting.pop(key, None)
+
     def get_fomod_image(self, image_path):
         """
         Guaranteed to return the actual extraction path for an image
         path specified in a fomod config file even in spite of
-        name-case-conflicts, so long as the file exists. If it does
-        not exist, ``None`` is returned.
+        name-case-conflicts, so long as the file exists and has been
+        extracted (see ``extract_fomod_images()``). Otherwise, ``None``
+        is returned.
         """
-        try:
-            return self.normalized_imgpaths[image_path.lower()]
-        except KeyError:
-            return None
+        key = image_path.lower()
+
+        if key in self._extracted_images:
+            return os.path.join(self._image_dir,
+                                self.normalized_imgpaths[key])
+        return None
 
     async def num_fomod_files_to_install(self):
         """
@@ -196,10 +301,12 @@ class InstallManager(Submanager):
         files and directories that need to be extracted from the
         archive.
         """
+        listing = await self.get_listing()
+
         n = 0
         for f in self.fomod.files_to_install:
             if f.type == "folder":
-                n += await self.count_folder_contents(f.source)
+                n += listing.count(f.source)
             else:
                 n += 1
 
@@ -210,6 +317,7 @@ class InstallManager(Submanager):
     ##=============================================
 
     # srcdestpairs=None,
+    @metrics.timed
     async def extract(self, destination, entries=None, callback=None):
         """
         Extract all or select items from the installer's associated
@@ -244,6 +352,24 @@ class InstallManager(Submanager):
 
         # srcdestpairs = srcdestpairs,
 
+    @metrics.timed
+    async def get_listing(self):
+        """
+        Return the ``ArchiveListing`` for the associated archive,
+        requesting it from the archive handler if that has not
+        been done yet.
+
+        :rtype: skymodman.utils.archive.ArchiveListing
+        """
+        if self.listing is None:
+            self.listing = await self.archiver.archive_listing(
+                self.archive)
+
+            self.archive_dirs = self.listing.dirs
+            self.archive_files = self.listing.files
+
+        return self.listing
+
     # noinspection PyTypeChecker
     async def archive_contents(self, *, dirs=True, files=True):
         """
@@ -252,9 +378,7 @@ class InstallManager(Submanager):
         :param dirs: include directories in the output
         :param files: include files in the output
         """
-        if self.archive_files is None:
-            self.archive_dirs, self.archive_files = \
-                await self.archiver.list_archive(self.archive)
+        await self.get_listing()
 
         if not dirs and not files:
             # if both are false, that's dumb. set both true.
@@ -284,14 +408,11 @@ class InstallManager(Submanager):
         """
 
         self.LOGGER << "counting files"
-        if self.archive_files is None:
-            # we've not attempted to list the archive before
-            return len([f async for f in self.archive_contents(dirs=include_dirs)])
-        else:
-            if include_dirs:
-                return len(self.archive_dirs) + len(self.archive_files)
-            return len(self.archive_files)
-        # return len(await self.archive_contents(dirs=include_dirs))
+        listing = await self.get_listing()
+
+        if include_dirs:
+            return len(listing)
+        return len(listing.files)
 
     async def count_folder_contents(self, folder):
         """
@@ -301,16 +422,9 @@ class InstallManager(Submanager):
         """
         self.LOGGER << f"Counting contents of archive folder {folder!r}"
 
-        folder = folder.rstrip('/') + '/'
+        listing = await self.get_listing()
 
-        c = 0
-        async for f in self.archive_contents():
-            if f.startswith(folder): c+=1
-
-        return c
-        # return len(
-        #     [f async for f in self.archive_contents()
-        #      if f.startswith(folder)])
+        return listing.count(folder)
 
     # async def mod_structure_tree(self):
     #     """
@@ -328,27 +442,51 @@ class InstallManager(Submanager):
     #
     #     return modtree
 
+    @metrics.timed
     async def mkarchivefs(self):
         """
         Create an instance of an ArchiveFS pseudo-filesystem from the
-        installer's associated mod archive.
+        installer's associated mod archive. If a layout has been saved
+        for the archive (see ``save_layout()``), the fs is loaded from
+        that instead.
 
         :return: the created archivefs instance
         """
-        # create an empty archivefs--just has a root.
-        modfs : arcfs.ArchiveFS = arcfs.ArchiveFS()
+        listing = await self.get_listing()
+
+        if len(listing.files) > self.COMPACT_FS_THRESHOLD:
+            fs_type = CompactArchiveFS
+        else:
+            fs_type = arcfs.ArchiveFS
+
+        if listing.layout is not None:
+            return fs_type.from_bytes(listing.layout)
 
-        # add path of each file in the archive; since intermediate
-        # directories are created automatically, there's no need to do
-        # mkdir--although this method DOES mean that, if the archive contains
-        # any empty directories, they will not be present in the fs. Not sure
+        # build the fs from the path of each file in the archive; since
+        # intermediate directories are created automatically, there's
+        # no need to include the directory entries--although this
+        # DOES mean that, if the archive contains any empty
+        # directories, they will not be present in the fs. Not sure
         # yet if this is going to be an issue.
-        async for arc_entry in self.archive_contents(dirs=False):
-            # add root anchor to all entries
-            modfs.touch("/"+arc_entry)
+        modfs : arcfs.ArchiveFS = fs_type.from_listing(listing.files)
+
+        # reloading from the serialized form is much quicker than
+        # building from the listing
+        listing.layout = modfs.to_bytes()
 
         return modfs
 
+    def save_layout(self, modfs):
+        """
+        Store the (possibly user-modified) structure of `modfs` with
+        the cached listing of the archive, so that it will be used the
+        next time ``mkarchivefs()`` is called for the archive.
+
+        :param arcfs.ArchiveFS modfs:
+        """
+        if self.listing is not None:
+            self.listing.layout = modfs.to_bytes()
+
     ##=============================================
     ## Actual installation
     ##=============================================
@@ -384,12 +522,8 @@ class InstallManager(Submanager):
 
         # check top 2 levels
         # accumulate names
-        _names = []
-        ext_re = re.compile(r".*\.(es[pm]|bsa)$")
-        for f in filter(lambda s: ext_re.search(s.lower()),
-                           self.archive_files):
-            # if re.search(r".*\.(es[pm]|bsa)$", f.lower()):
-                _names.append(split(bname(f))[0])
+        _names = [split(bname(f))[0] for f in self.archive_files
+                  if f.lower().endswith((".esp", ".esm", ".bsa"))]
 
         print(f"names from esp/bsa ({len(_names)}):")
         for n in _names:
@@ -432,6 +566,7 @@ class InstallManager(Submanager):
         return ""
 
 
+    @metrics.timed
     async def install_archive(self, start_dir=None, callback=None):
         """
         Install the entire contents of the associated archive to its
@@ -469,12 +604,13 @@ class InstallManager(Submanager):
             # make sure startdir ends with a single "/"
             start_dir = start_dir.rstrip("/")+"/"
 
+            listing = await self.get_listing()
+
             await self.extract(destination=self.install_dir,
                                # filter archive contents based on
                                # containing directory
-                               entries=[e async for e in
-                                        self.archive_contents(dirs=False)
-                                        if e.startswith(start_dir)],
+                               entries=listing.subtree(start_dir,
+                                                       dirs=False),
                                callback=track_progress)
 
             # fix file paths
@@ -485,6 +621,7 @@ class InstallManager(Submanager):
             await self.extract(destination=self.install_dir,
                            callback=track_progress)
 
+    @metrics.timed
     async def rewind_install(self, callback=print):
         """
         Called when an install is cancelled during file copy/unpacking.
@@ -582,6 +719,7 @@ class InstallManager(Submanager):
     # Fomod Installation
     #---------------------------------
 
+    @metrics.timed
     async def install_fomod_files(self, dest_dir=None, callback=None):
         """
 
@@ -599,15 +737,12 @@ class InstallManager(Submanager):
             # dest_dir="/tmp/testinstall"
             dest_dir = self.install_dir
 
-        # get list of files from fomod
-        to_install = self.fomod.files_to_install
+        # get list of files from fomod, sorted by priority, then
+        # by name
+        to_install = self.fomod.files_to_install.in_install_order()
 
         progress = self.files_installed
 
-        # sort files by priority, then by name
-        to_install.sort(key=lambda f: f.priority)
-        to_install.sort(key=lambda f: f.source.lower())
-
 
         if callback is None:
             def _callback(*args): pass
@@ -650,6 +785,7 @@ class InstallManager(Submanager):
                 dmm(installed, destination,
                     overwite=True, name_mod=str.lower)
 
+    @metrics.timed
     async def rewind_fomod_install(self, callback=print):
         """
         Called when an install is cancelled during file copy/unpacking.
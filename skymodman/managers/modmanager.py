@@ -1,13 +1,15 @@
-from pathlib import Path, PurePath
+import asyncio
+import os
+from pathlib import Path
 from functools import lru_cache
 from itertools import chain
+from collections import namedtuple
 
 from typing import Set, Dict, List
 
-from skymodman.utils import tree as _tree
-
 # from skymodman import exceptions
-from skymodman.types import Alert, AppFolder
+from skymodman.types import Alert, AppFolder, FSItem
+from skymodman.types.statecache import StateCache
 from skymodman.managers import (config as _config,
                                 database as _database,
                                 profiles as _profiles,
@@ -21,6 +23,7 @@ from skymodman.constants.keystrings import (Dirs as ks_dir,
                                             INI as ks_ini)
 from skymodman.installer.common import FileState
 from skymodman.log import withlogger
+from skymodman.utils import profilediff
 
 ## appfolder defaults
 appfolder_defaults = {
@@ -85,6 +88,11 @@ class ModManager:
         # track when we're switching profiles
         self.in_profile_switch=False
 
+        # fully-loaded state of recently used profiles (and of the mod
+        # files found in each recently used set of directories), so
+        # that switching back to them needn't rebuild it all
+        self._profile_states = StateCache(self.PROFILE_CACHE_SIZE)
+
     ##=============================================
     ## Setup
     ##=============================================
@@ -226,12 +234,14 @@ class ModManager:
         Return an object containing information about conflicting files.
         Use as follows:
 
-            * file_conflicts.by_file: dict[str, list[str]] -- a mapping
-                of file paths to a list of mods containing a file with
-                the same file path
-            * file_conflicts.by_mod: dict[str, list[str]] -- a mapping
-                of mod names to a list of files contained by that mod
-                which are in conflict with some other mod.
+            * file_conflicts.by_file: dict[str, tuple[str]] -- a
+                mapping of file paths to the mods containing a file
+                with the same file path
+            * file_conflicts.by_mod: dict[str, frozenset[str]] -- a
+                mapping of mod names to the set of files contained by
+                that mod which are in conflict with some other mod.
+
+        See also ``file_conflict_details()``.
         """
         # this type is defined in DB-manager
         #File_Conflict_Map = namedtuple("File_Conflict_Map",
@@ -406,18 +416,9 @@ class ModManager:
 
         except Exception as e:
             # if ANY errors occur, rollback the profile-switch
-            self.LOGGER.exception(e)
-            self.LOGGER << "Error while activating profile. Rolling back."
-
+            self._rollback_profile(old_profile, e)
             if old_profile:
-                # we can't be sure quite how far the activation process
-                # made it before failing, so just do a fresh assignment
-                # of the old_profile
                 self._load_profile(old_profile.name)
-            else:
-                # if we came from no profile, make sure we're back there
-                self._profileman.set_active_profile(None)
-
 
             success = False
         else:
@@ -429,6 +430,58 @@ class ModManager:
 
         return success
 
+    async def activate_profile_async(self, profile, progress=None,
+                                     executor=None):
+        """
+        Like ``activate_profile()``, but run the slow stages of loading
+        the profile (reading the modinfo file, scanning the mods
+        directory, detecting conflicts) in `executor`, so that the
+        event loop (and thus the interface) stays responsive.
+
+        The switch can be abandoned by cancelling the task running this
+        coroutine. The stage in progress is allowed to finish, the rest
+        are skipped, and no profile will be active afterwards (so
+        that the next activation does a full load); CancelledError is
+        then raised as usual.
+
+        :param str profile:
+        :param progress: if given, called on the event loop's thread as
+            each stage starts with the number of the stage, the total
+            number of stages, and a description of the stage
+        :param executor: where to run the stages; if None, the event
+            loop's default executor is used
+        :return: True if the profile was activated, False if an error
+            occurred (in which case the previously active profile, if
+            any, has been reloaded)
+        """
+        old_profile = self.profile
+
+        self.in_profile_switch = True
+
+        success = True
+        try:
+            await self._load_profile_async(profile, progress, executor)
+
+        except asyncio.CancelledError:
+            self.LOGGER.warning(f"Activation of profile '{profile}' "
+                                f"was cancelled")
+            # whatever was loaded is incomplete; forget about it
+            self._profileman.set_active_profile(None)
+            raise
+
+        except Exception as e:
+            self._rollback_profile(old_profile, e)
+            if old_profile:
+                await self._load_profile_async(old_profile.name,
+                                               progress, executor)
+            success = False
+        else:
+            self.set_config_value(ks_ini.LAST_PROFILE, profile)
+        finally:
+            self.in_profile_switch = False
+
+        return success
+
     def new_profile(self, name, copy_from=None):
         """
         Create and return a new Profile object with the specified name,
@@ -471,6 +524,28 @@ class ModManager:
             self._configman.update_genvalue(ks_ini.LAST_PROFILE,
                                             profile.name)
 
+    def compare_profiles(self, profile_a, profile_b):
+        """
+        Find the differences between the saved mod lists and hidden
+        files of two profiles. Neither profile is loaded, so unsaved
+        changes to the active profile are not included.
+
+        :param str|Profile profile_a: name or Profile object of the
+            profile to compare from
+        :param str|Profile profile_b: same, for the profile to
+            compare to
+        :rtype: skymodman.utils.profilediff.ProfileDiff
+        """
+        if isinstance(profile_a, str):
+            profile_a = self._profileman[profile_a]
+        if isinstance(profile_b, str):
+            profile_b = self._profileman[profile_b]
+
+        self.LOGGER << f"Comparing profiles: {profile_a.name!r}->" \
+                       f"{profile_b.name!r}"
+
+        return profilediff.diff_profiles(profile_a, profile_b)
+
     def get_profiles(self, names=True, objects=False):
         """
         Generator that iterates over all existing profiles.
@@ -528,77 +603,228 @@ class ModManager:
     ## Internal profile mgmt helpers
     ##---------------------------------
 
+    ## Rough limit (in bytes) on the memory used to keep the state of
+    ## recently used profiles; see _cache_profile_state()
+    PROFILE_CACHE_SIZE = 64 * 2**20
+
+    ## The stages of loading a profile, in order
+    PROFILE_LOAD_STAGES = ("Activating profile",
+                           "Loading mod list",
+                           "Finding mod files",
+                           "Detecting file conflicts",
+                           "Loading hidden files")
+
     def _load_profile(self, profile:str):
         """internal handler for assigning new profile"""
         self.LOGGER << "<==Method called"
 
-        # if we have no active profile, treat this as a 'first run'
-        if not self.profile:
-            self._load_first_profile(profile)
-        else:
-            self._change_profile(profile)
+        for _ in self._profile_load_steps(profile):
+            pass
 
-    def _load_first_profile(self, profile_name):
-        """Called when the first profile is selected (and any time we
-        go from (no profile)->(some profile))"""
+    async def _load_profile_async(self, profile, progress, executor):
+        """
+        Run the stages of ``_profile_load_steps()``, all but the first
+        in `executor`.
 
-        ## **Notes on this stuff can be found under _change_profile()
+        See ``activate_profile_async()`` for the parameters.
+        """
+        self.LOGGER << "<==Method called"
 
-        self.LOGGER << f"Loading initial profile: {profile_name}"
+        loop = asyncio.get_event_loop()
+        steps = self._profile_load_steps(profile)
+        num_stages = len(self.PROFILE_LOAD_STAGES)
 
-        # this will enable any profile overrides there may be
-        self._profileman.set_active_profile(profile_name)
+        stage = 0
+        try:
+            while stage is not None:
+                if progress:
+                    progress(stage, num_stages,
+                             self.PROFILE_LOAD_STAGES[stage])
+
+                if stage == 0:
+                    # activating the profile may send out folder-change
+                    # notifications, so it stays on this thread
+                    stage = next(steps, None)
+                else:
+                    stage = await _wait_for_stage(
+                        loop.run_in_executor(executor, next, steps, None))
+        finally:
+            # if we were cancelled, this skips the remaining stages
+            steps.close()
 
-        # self.check_dirs()
+    def _profile_load_steps(self, profile_name):
+        """
+        Load the data for the profile `profile_name`, one stage at a
+        time. Before each stage after the first, the index of that
+        stage in ``PROFILE_LOAD_STAGES`` is yielded; the stage is run
+        when the generator is resumed. Closing the generator early
+        leaves the rest of the data unloaded.
+
+        If there is no active profile, everything is loaded from
+        scratch. Otherwise, the table of mod files (and the list of
+        conflicts) is only rebuilt if the new profile uses a different
+        Mods or Skyrim directory than the current one.
+
+        :param str profile_name:
+        """
+
+        if not self.profile:
+            # treat this as a 'first run'
+            self.LOGGER << f"Loading initial profile: {profile_name}"
 
-        if self._update_modinfo(True, True):
-            self.find_all_mod_files(True, True)
-            self._file_conflicts = self._dbman.detect_file_conflicts()
+            # this will enable any profile overrides there may be
+            self._profileman.set_active_profile(profile_name)
 
-        self.load_hidden_files()
+            moddir_changed = skydir_changed = True
+        else:
+            self.LOGGER << f"loading data for profile: {profile_name}"
+            # keep references to currently (soon to be previously)
+            # configured directories
+            prev_dirs = {d: self._folders[d].path for d in ks_dir}
+
+            self._profileman.set_active_profile(profile_name)
+
+            # ...only the MODS dir is ever checked; is there actually a
+            # need  to track them all here?
+
+            moddir_changed = prev_dirs['mods']   != self._folders['mods']
+            skydir_changed = prev_dirs['skyrim'] != self._folders['skyrim']
+
+        # if the profile was loaded recently and nothing it was built
+        # from has changed since, put back what we had
+        state = self._profile_states.get(("profile", profile_name),
+                                         self._profile_fingerprint())
+        files = None
+
+        yield 1
+        if state is not None:
+            self.LOGGER << "Restoring mod list from cache"
+            self._dbman.reinit(files=moddir_changed)
+            self._collman.restore(state.collection)
+            self._populate_mods_table()
 
+            rescan = moddir_changed or skydir_changed
+        else:
+            # load/generate modinfo and mod table, as needed; if that
+            # worked, find all mod-related files on disk (if required)
+            # and analyze for conflicts
+            rescan = self._update_modinfo(moddir_changed, skydir_changed) \
+                     and (moddir_changed or skydir_changed)
+
+        yield 2
+        if rescan:
+            files = self._profile_states.get(self._files_cache_key(),
+                                             self._files_fingerprint())
+            if files is not None:
+                self.LOGGER << "Restoring mod files from cache"
+                self._dbman.reinit(mods=False, hidden=False)
+                self._dbman.restore_files('mod', files.modfiles)
+                self._dbman.restore_files('missing', files.missing)
+            else:
+                self.find_all_mod_files(moddir_changed, skydir_changed)
+
+        yield 3
+        if rescan:
+            if files is not None:
+                self._file_conflicts = files.conflicts
+            else:
+                # with all discovered files loaded into the database,
+                # detect which mods contain files with the same name
+                self._file_conflicts = self._dbman.detect_file_conflicts()
+                self._cache_mod_files()
+
+        yield 4
+        if state is not None:
+            self._dbman.restore_files('hidden', state.hidden)
+        else:
+            # always need to re-check hidden files
+            # todo: clear out saved hidden files for mods that have been uninstalled.
+            self.load_hidden_files()
+            self._cache_profile_state()
+
+        # finally, clear the "list of enabled mods" cache
+        # (used by installer)
         self._enabledmods = None
 
-    def _change_profile(self, profile_name):
+    def _rollback_profile(self, old_profile, error):
         """
-        Called to change from one profile to another (as opposed to
-        starting with no profile)
+        Log `error`, which occurred while activating a profile, and
+        prepare to reload `old_profile`.
 
-        :param profile_name:
+        :param skymodman.types.Profile old_profile: the profile that
+            was active before the failed switch (may be None)
         """
+        self.LOGGER.exception(error)
+        self.LOGGER << "Error while activating profile. Rolling back."
 
-        self.LOGGER << f"loading data for profile: {profile_name}"
-        # keep references to currently (soon to be previously)
-        # configured directories
-        prev_dirs = {d: self._folders[d].path for d in ks_dir}
+        # we can't be sure quite how far the activation process made it
+        # before failing, so unset the active profile; the old one (if
+        # any) will then get a full, fresh load, and if we came from no
+        # profile, we're back there.
+        self._profileman.set_active_profile(None)
 
-        # this will enable any profile overrides there may be
-        self._profileman.set_active_profile(profile_name)
+    ##=================================
+    ## Profile state cache
+    ##---------------------------------
 
-        # ...only the MODS dir is ever checked; is there actually a
-        # need  to track them all here?
+    def _profile_fingerprint(self):
+        """
+        Summarize everything the loaded state of the active profile is
+        built from: the directories in use, the profile's modinfo and
+        hidden-files files, and the list of installed mods.
+        """
+        profile = self.profile
+        return (self._folders['mods'].path,
+                self._folders['skyrim'].path,
+                _stat_signature(profile.modinfo),
+                _stat_signature(profile.hidden_files),
+                tuple(self._managed_mods))
 
-        moddir_changed = prev_dirs['mods']   != self._folders['mods']
-        skydir_changed = prev_dirs['skyrim'] != self._folders['skyrim']
+    def _files_cache_key(self):
+        return ("files",
+                self._folders['mods'].path,
+                self._folders['skyrim'].path)
 
-        # load/generate modinfo and mod table, as needed
-        if self._update_modinfo(moddir_changed, skydir_changed) and (
-                    moddir_changed or skydir_changed):
-            # if we successfully managed to load/generate mod info,
-            # find all mod-related files on disk (if required) and
-            # analyze for conflicts
-            self.find_all_mod_files(moddir_changed, skydir_changed)
-            # with all discovered files loaded into the database,
-            # detect which mods contain files with the same name
-            self._file_conflicts = self._dbman.detect_file_conflicts()
+    def _files_fingerprint(self):
+        """
+        Summarize what the table of mod files is built from. Like the
+        rest of the profile-loading code, this assumes that the
+        contents of an installed mod don't change behind our back;
+        installing or removing a mod is noticed, though.
+        """
+        return (_stat_signature(self._folders['mods'].path),
+                tuple(self._managed_mods))
 
-        # always need to re-check hidden files
-        # todo: clear out saved hidden files for mods that have been uninstalled.
-        self.load_hidden_files()
+    def _cache_profile_state(self):
+        """
+        Remember the current (saved) state of the active profile: the
+        mod collection with its errors, and the hidden files.
+        """
+        collection = self._collman.snapshot()
+        hidden = self._dbman.dump_files('hidden')
 
-        # finally, clear the "list of enabled mods" cache
-        # (used by installer)
-        self._enabledmods = None
+        self._profile_states.put(
+            ("profile", self.profile.name),
+            self._profile_fingerprint(),
+            _ProfileState(collection, hidden),
+            _rows_size(collection[0]) + _rows_size(hidden))
+
+    def _cache_mod_files(self):
+        """
+        Remember the files found in the current mods and Skyrim
+        directories, along with the conflicts among them
+        """
+        modfiles = self._dbman.dump_files('mod')
+        missing = self._dbman.dump_files('missing')
+        conflicts = self._file_conflicts
+
+        self._profile_states.put(
+            self._files_cache_key(),
+            self._files_fingerprint(),
+            _FileState(modfiles, missing, conflicts),
+            _rows_size(modfiles) + _rows_size(missing)
+            # the by_mod map holds (roughly) as much again
+            + 2 * _rows_size(conflicts.by_file.items()))
 
     def _update_modinfo(self, moddir_changed, skydir_changed):
         """
@@ -807,10 +1033,57 @@ class ModManager:
             # except exceptions.InvalidAppDirectoryError as e:
                 self.LOGGER.error("Mods directory is unset or could not be found")
 
+    def file_conflict_details(self, mod_ident):
+        """
+        For each file in the given mod that conflicts with another mod,
+        determine which other mods contain it and which mod's version
+        of the file wins (i.e. the enabled mod that comes last in the
+        install order).
+
+        :param str mod_ident: the unique identifier of the mod
+        :return: mapping of (lower-case) file paths to
+            ``File_Conflict(others, winner)`` tuples; files that do not
+            conflict are not included
+        :rtype: dict[str, skymodman.managers.database.File_Conflict]
+        """
+        conflicts = self._file_conflicts
+        if not conflicts:
+            return {}
+
+        try:
+            files = conflicts.by_mod[mod_ident]
+        except KeyError:
+            return {}
+
+        collection = self.modcollection
+
+        # files not belonging to a mod in the collection (i.e. those
+        # of the base game) are always present, but are overridden by
+        # any enabled mod; disabled mods never win
+        def rank(mod):
+            try:
+                entry = collection[mod]
+            except KeyError:
+                return -1
+            return collection.index(mod) if entry.enabled else -2
+
+        details = {}
+        for f in files:
+            mods = conflicts.by_file[f]
+
+            winner = max(mods, key=rank)
+            if rank(winner) == -2:
+                winner = None
+
+            details[f] = _database.File_Conflict(
+                tuple(m for m in mods if m != mod_ident), winner)
+
+        return details
+
     def iter_mod_files(self, mod_ident):
         """
         Iterate over the files contained by the given mod as stored
-        in the database
+        in the database, in sorted order
 
         :param str mod_ident: the unique identifier of the mod (the
             mod's directory name, for managed mods)
@@ -820,7 +1093,10 @@ class ModManager:
                     self._dbman.select(
                         'filepath',
                         FROM='modfiles',
-                        WHERE="directory = ?",
+                        # the (directory, filepath) uniqueness
+                        # constraint is backed by an index, so this
+                        # doesn't require an extra sort
+                        WHERE="directory = ? ORDER BY filepath",
                         params=(mod_ident,)))
 
     # cache the results of the ... most recent queries
@@ -835,26 +1111,23 @@ class ModManager:
         """
         return list(self.iter_mod_files(mod_ident))
 
-    @lru_cache(12)
     def get_mod_file_tree(self, mod_ident):
         """
 
         :param mod_ident: the unique identifier of the mod (the
             mod's directory name, for managed mods)
-        :return: an AutoTree structure where each containing dict
-            represents a directory and the leaves-list of each
-            dict are the files contained within that directory
+        :return: the root FSItem of a tree of items for the mod's
+            files, built directly from the (sorted) rows in the
+            database. This is not cached: holding on to the items for
+            several large mods would take far more memory than building
+            them again does time.
+        :rtype: FSItem
         """
 
-        ftree = _tree.Tree()
-        for f in self.iter_mod_files(mod_ident):
-            # convert to path
-            fpath = PurePath(f)  # XXX: should we add mod root?
-            pathparts = fpath.parts[:-1]
+        root = FSItem("", mod_ident)
+        FSItem.build_filetree(root, self.iter_mod_files(mod_ident))
 
-            ftree.insert(pathparts, fpath.name)
-
-        return ftree
+        return root
 
     def load_hidden_files(self):
         """
@@ -894,6 +1167,11 @@ class ModManager:
         # reset so that next install will reflect the new state
         self._enabledmods = None
 
+        # what's on disk is now what we have; (during a profile load,
+        # this happens once loading is finished)
+        if not self.in_profile_switch:
+            self._cache_profile_state()
+
     def save_hidden_files(self, for_mod, unhide, hide):
         """
         Write the collection of hidden files (stored on the profile
@@ -926,6 +1204,8 @@ class ModManager:
         with self.profile.hidden_files.open('w') as f:
             f.write(str(self._dbman.get_hidden_file_tree()))
 
+        self._cache_profile_state()
+
     ##=============================================
     ## Configuration Management Interface
     ##=============================================
@@ -1085,6 +1365,42 @@ class ModManager:
     ##=============================================
 
 
+    def get_file_states(self, files):
+        """
+        Determine the current activation state of each of the given
+        files with as few database queries as possible. The result
+        is a snapshot; it will not reflect later changes to the mods.
+
+        :param typing.Iterable[str] files: paths of files relative to
+            the data directory
+        :return: mapping of each (lower-cased) path to its FileState
+        :rtype: Dict[str, FileState]
+        """
+        files = {f.lower() for f in files}
+
+        states = dict.fromkeys(files, FileState.M)
+
+        # keep well under sqlite's limit on query parameters
+        chunksize = 500
+        files = list(files)
+
+        for i in range(0, len(files), chunksize):
+            chunk = files[i:i+chunksize]
+            for r in self._dbman.select(
+                    "directory", "lower(filepath) AS lpath",
+                    FROM="modfiles",
+                    WHERE="lower(filepath) IN ({})".format(
+                        ",".join("?" * len(chunk))),
+                    params=chunk):
+
+                if self.mod_is_enabled(r['directory']):
+                    # active if any mod providing it is enabled
+                    states[r['lpath']] = FileState.A
+                elif states[r['lpath']] is FileState.M:
+                    states[r['lpath']] = FileState.I
+
+        return states
+
     @lru_cache(256)
     def checkFileState(self, file, state):
         """
@@ -1149,3 +1465,54 @@ class ModManager:
     #     return self._dbman.conn.cursor()
 
 
+
+
+# <editor-fold desc="helpers">
+
+# what's kept in the profile-state cache for a profile...
+_ProfileState = namedtuple("_ProfileState", "collection hidden")
+# ...and for a set of mods/skyrim directories
+_FileState = namedtuple("_FileState", "modfiles missing conflicts")
+
+def _stat_signature(path):
+    """
+    :return: (modification time, size) of the file or directory at
+        `path`, or None if it does not exist
+    """
+    try:
+        st = os.stat(path)
+    except (OSError, TypeError):
+        return None
+    return st.st_mtime_ns, st.st_size
+
+def _rows_size(rows):
+    """Rough number of bytes held by a sequence of tuples of strings
+    (and other small objects)"""
+    return sum(64 + sum(50 + len(f) if isinstance(f, str) else 32
+                        for f in row)
+               for row in rows)
+
+async def _wait_for_stage(future):
+    """
+    Await the result of `future`, which is running a stage of a profile
+    load in another thread. If the awaiting task is cancelled, the
+    thread can't be stopped, so wait for it to finish the stage anyway
+    (no two stages may run at once) before letting the CancelledError
+    through.
+
+    :param asyncio.Future future:
+    """
+    try:
+        return await asyncio.shield(future)
+    except asyncio.CancelledError:
+        while not future.done():
+            try:
+                await asyncio.wait((future,))
+            except asyncio.CancelledError:
+                pass
+        if not future.cancelled():
+            # retrieve it so asyncio doesn't complain
+            future.exception()
+        raise
+
+# </editor-fold>
@@ -0,0 +1,347 @@
+"""
+Lightweight timing and counting of the application's hot paths.
+
+Operations are measured with the ``timed`` decorator or the ``span``
+context manager, which record how long each call takes; ``count``
+adds to a named counter (e.g. rows inserted) and ``observe`` records
+a value in a named histogram (e.g. files per mod). A report of
+everything recorded can be sent through the application's log queue
+with ``log_report()``, which is done at shutdown.
+
+Recording is off unless the SMM_METRICS environment variable is set
+(to anything other than "0") or ``enable()`` is called. While off,
+each instrumented call costs a single flag check.
+"""
+
+import os
+import threading
+from functools import wraps
+from inspect import (isasyncgenfunction, iscoroutinefunction,
+                     isgeneratorfunction)
+from math import frexp
+from time import perf_counter
+
+from skymodman.constants import EnvVars
+
+__all__ = ["enable", "disable", "is_enabled", "timed", "span", "count",
+           "observe", "reset", "snapshot", "report", "log_report"]
+
+_enabled = os.getenv(EnvVars.METRICS.value, "0") not in ("", "0")
+
+# guards the two tables below; operations run on executor threads, too
+_lock = threading.Lock()
+# name -> _Histogram
+_histograms = {}
+# name -> int
+_counters = {}
+
+
+def enable():
+    """Start recording"""
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    """Stop recording; what has been recorded is kept"""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+##=============================================
+## Recording
+##=============================================
+
+def timed(name=None):
+    """
+    Decorator that records the duration of each call to the decorated
+    function under `name` (by default, its qualified name, e.g.
+    'DBManager.add_files').
+
+    Coroutine functions are timed until they return. For generator
+    functions, only the time spent inside the generator is counted,
+    not that spent by the caller between items. Async generators are
+    timed from the first item until they finish.
+
+    Can also be used without the parentheses: ``@timed``.
+    """
+    if callable(name):
+        return timed()(name)
+
+    def decorator(func):
+        label = name or func.__qualname__
+
+        if isasyncgenfunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not _enabled:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                    return
+
+                start = perf_counter()
+                try:
+                    async for item in func(*args, **kwargs):
+                        yield item
+                finally:
+                    _record(label, perf_counter() - start)
+
+        elif iscoroutinefunction(func):
+            @wraps(func)
+            async def wrapper(*args, **kwargs):
+                if not _enabled:
+                    return await func(*args, **kwargs)
+
+                start = perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    _record(label, perf_counter() - start)
+
+        elif isgeneratorfunction(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not _enabled:
+                    return (yield from func(*args, **kwargs))
+
+                gen = func(*args, **kwargs)
+                elapsed = 0.0
+                start = perf_counter()
+                try:
+                    for item in gen:
+                        elapsed += perf_counter() - start
+                        yield item
+                        start = perf_counter()
+                    elapsed += perf_counter() - start
+                finally:
+                    gen.close()
+                    _record(label, elapsed)
+
+        else:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not _enabled:
+                    return func(*args, **kwargs)
+
+                start = perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    _record(label, perf_counter() - start)
+
+        return wrapper
+
+    return decorator
+
+
+def span(name):
+    """
+    Context manager that records how long its block takes under
+    `name`::
+
+        with metrics.span("IOManager.walk"):
+            ...
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def count(name, n=1):
+    """Add `n` to the counter `name`"""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def observe(name, value):
+    """Record `value` in the histogram `name`"""
+    if _enabled:
+        _record(name, value, timing=False)
+
+
+def reset():
+    """Forget everything recorded so far"""
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+##=============================================
+## Reporting
+##=============================================
+
+def snapshot():
+    """
+    :return: dict with 'histograms' (name -> dict of count, total,
+        mean, min, p50, p95, max) and 'counters' (name -> value)
+    """
+    with _lock:
+        return {
+            "histograms": {name: h.summary()
+                           for name, h in _histograms.items()},
+            "counters": dict(_counters),
+        }
+
+
+def report():
+    """
+    :return: tables of everything recorded so far: the operations
+        recorded with ``timed`` and ``span`` (times in milliseconds,
+        slowest in total first), the other histograms, and the
+        counters
+    :rtype: str
+    """
+    snap = snapshot()
+    if not (snap["histograms"] or snap["counters"]):
+        return "No metrics recorded."
+
+    hists = snap["histograms"]
+    timings = {n: s for n, s in hists.items() if s["timing"]}
+    values = {n: s for n, s in hists.items() if not s["timing"]}
+
+    tables = []
+    if timings:
+        # durations are stored in seconds
+        tables.append(_histogram_table("operation (ms)", timings, 1000))
+    if values:
+        tables.append(_histogram_table("value", values, 1))
+
+    if snap["counters"]:
+        width = max(len("counter"), *map(len, snap["counters"]))
+        lines = [f"{'counter':{width}} {'total':>10}"]
+        lines.extend(f"{name:{width}} {value:10d}"
+                     for name, value in sorted(snap["counters"].items()))
+        tables.append("\n".join(lines))
+
+    return "\n\n".join(tables)
+
+
+def log_report():
+    """Send ``report()`` through the application's log queue"""
+    from skymodman.log import newLogger
+
+    newLogger(__name__).info("Timing report:\n" + report())
+
+
+# <editor-fold desc="helpers">
+
+def _histogram_table(title, summaries, scale):
+    """Format the histogram `summaries` as a table, largest total
+    first, multiplying each value by `scale`"""
+    width = max(len(title), *map(len, summaries))
+    lines = [f"{title:{width}} {'count':>7} {'total':>10} {'mean':>9} "
+             f"{'p50':>9} {'p95':>9} {'max':>9}"]
+
+    for name, s in sorted(summaries.items(),
+                          key=lambda i: -i[1]["total"]):
+        lines.append(
+            f"{name:{width}} {s['count']:7d} {s['total'] * scale:10.1f} "
+            + " ".join(f"{s[k] * scale:9.2f}"
+                       for k in ("mean", "p50", "p95", "max")))
+
+    return "\n".join(lines)
+
+
+def _record(name, value, timing=True):
+    with _lock:
+        try:
+            h = _histograms[name]
+        except KeyError:
+            h = _histograms[name] = _Histogram(timing)
+        h.add(value)
+
+
+class _Histogram:
+    """
+    Count, sum and extremes of the recorded values, plus how many fall
+    in each power-of-two bucket, from which percentiles are estimated.
+    Takes the same (small) space no matter how many values are added.
+    """
+
+    __slots__ = ("timing", "count", "total", "min", "max", "buckets")
+
+    def __init__(self, timing=True):
+        # whether the values are durations, in seconds
+        self.timing = timing
+        self.count = 0
+        self.total = 0.0
+        self.min = float("inf")
+        self.max = float("-inf")
+        # exponent -> number of values in [2**(exp-1), 2**exp)
+        self.buckets = {}
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+        exp = frexp(value)[1] if value > 0 else None
+        self.buckets[exp] = self.buckets.get(exp, 0) + 1
+
+    def quantile(self, q):
+        """An estimate (the top of its bucket) of the value below
+        which the fraction `q` of the values fall"""
+        if not self.count:
+            return 0.0
+
+        target = q * self.count
+        seen = 0
+        # None (zero or negative values) sorts first
+        for exp in sorted(self.buckets, key=lambda e: (e is not None, e)):
+            seen += self.buckets[exp]
+            if seen >= target:
+                if exp is None:
+                    return min(self.max, 0.0)
+                return min(self.max, 2.0 ** exp)
+        return self.max
+
+    def summary(self):
+        return {
+            "timing": self.timing,
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "min": self.min if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "max": self.max if self.count else 0.0,
+        }
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        _record(self.name, perf_counter() - self.start)
+
+
+class _NullSpan:
+    """Stands in for a _Span while recording is off"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+# </editor-fold>
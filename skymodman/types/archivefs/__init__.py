@@ -1 +1,4 @@
 from .archivefs import ArchiveFS
+from .compact import CompactArchiveFS
+from .batch import FSBatch, FSChangeSet
+from .subfs import ArchiveFSView
@@ -1,4 +1,10 @@
+import struct
+from array import array
+from collections import namedtuple
+from contextlib import contextmanager
+from copy import copy
 from pathlib import PurePath
+from weakref import WeakSet
 # from functools import lru_cache
 
 from typing import Dict
@@ -10,6 +16,22 @@ from skymodman.utils import singledispatch_m
 from .fserrors import *
 from .cipathlib import PureCIPath, CIPath, cistat, SortFlags
 from .inoderecord import InodeRecord
+from .fscache import VersionedCache
+from .batch import FSBatch
+from . import query
+
+# the structures of an ArchiveFS captured by ArchiveFS.snapshot()
+FSSnapshot = namedtuple("FSSnapshot", "inode_table directories name_index")
+
+# stands in for the parent of a deleted inode in the array form of
+# the inode table (see ArchiveFS.to_bytes())
+_DELETED = 0xFFFFFFFF
+
+# header of the serialized form: magic, format version, number of
+# inodes, number of directories, length of the encoded names
+_SERIAL_HEADER = struct.Struct("=4sHIII")
+_SERIAL_MAGIC = b"AFS\0"
+_SERIAL_VERSION = 1
 
 def get_associated_pathtype(arcfs):
 
@@ -22,6 +44,15 @@ class ArchiveFS:
 
     ROOT_INODE=0
 
+    # maximum number of entries held by each of the lookup caches
+    CACHE_MAXSIZE=16384
+
+    # storage types for the inode table and for the contents of each
+    # directory; subclasses may substitute more compact containers
+    # that provide the same interface (see CompactArchiveFS)
+    inode_table_type = list
+    dir_contents_type = set
+
     def __init__(self):
 
         # create a 'custom' subclass of CIPath that associates all
@@ -32,41 +63,92 @@ class ArchiveFS:
 
         # list of paths, where an item's index in the list
         # corresponds to its inode number.
-        self.inode_table = []
+        self.inode_table = self.inode_table_type()
         """:type: list[InodeRecord|None]"""
 
         # mapping of directory-inodes to set of inodes they contain
         self.directories = dict() # type: dict [int, set [int]]
         # inode -> {inode, ...}
 
+        # for each directory-inode, a mapping of the lower-case names
+        # of its contents to their inodes; lets inodeof() resolve each
+        # path component with a single lookup rather than a scan of
+        # the directory's contents
+        self.name_index = dict() # type: dict [int, dict [str, int]]
+        # inode -> {name.lower(): inode, ...}
+
         # create root of filesystem
         # only root should have its parent be the same as itself
         self._root = InodeRecord("/", 0, 0)
         self._rootpath = self.CIPath(self._root.name)
         self.inode_table.append(self._root)
 
-        self.directories[0]=set() # create empty set
+        self.directories[0]=self.dir_contents_type() # create empty set
+        self.name_index[0]={}
 
         self.sorting=SortFlags.Default
 
-        ## initialize caches with root information
+        ## copy-on-write snapshots (see snapshot())
+        # True while the inode table, directory map and name index
+        # may be referenced by a snapshot
+        self._shared = False
+        # directories whose contents have been copied since the last
+        # snapshot was taken or restored; None if there has never been
+        # a snapshot, meaning all directories are private to this fs
+        self._owned_dirs = None
+
+        ## cache invalidation
+        # Rather than deleting cached values key-by-key whenever the
+        # filesystem changes, each cache entry is stamped with a
+        # generation number and is ignored on lookup if that number
+        # is out of date:
+        #
+        #   * the tree generation is advanced whenever an existing
+        #     path changes or disappears (rename, move, removal); it
+        #     stamps the path-keyed "inodeof" cache and "pathfor".
+        #     Renaming or moving a directory with thousands of
+        #     descendants thus costs a single increment.
+        #   * each inode has its own generation, advanced when its name
+        #     changes or it is deleted, and--for directories--when
+        #     their contents change. It stamps the name caches and the
+        #     directory listings.
+        self._tree_gen = 0
+        self._inode_gen = {} # type: Dict[int, int]
+
+        # ArchiveFSViews onto this fs; their caches must be cleared
+        # along with ours
+        self._views = WeakSet()
 
+        self._init_caches()
+
+    def _init_caches(self):
+        """
+        Create the lookup caches and fill them with root information
+        """
         # keep the "inodeof" cache separate to maintain some
         # type-consistency (i.e., the inode cache is a keyed by
         # CIPath, while all the other caches are keyed by int)
-        self._inode_cache: Dict[PureCIPath, int] = {
-            self._rootpath: self.ROOT_INODE}
-
-            # "inodeof":           {self._rootpath: self.ROOT_INODE},
+        self._inode_cache = VersionedCache(self.CACHE_MAXSIZE)
 
         self.caches = {
-            "_inode_name":       {self.ROOT_INODE: "/"},
-            "_inode_name_lower": {self.ROOT_INODE: "/"},
-            "pathfor":           {self.ROOT_INODE: self._rootpath},
-            "listdir":           {self.ROOT_INODE: []},
+            "_inode_name":       VersionedCache(self.CACHE_MAXSIZE),
+            "_inode_name_lower": VersionedCache(self.CACHE_MAXSIZE),
+            "pathfor":           VersionedCache(self.CACHE_MAXSIZE),
+            "listdir":           VersionedCache(self.CACHE_MAXSIZE),
             # verbose version of listdir:
-            "vlistdir":          {self.ROOT_INODE: []},
-        }
+            "vlistdir":          VersionedCache(self.CACHE_MAXSIZE),
+        } # type: Dict[str, VersionedCache]
+
+        tree_stamp = self._tree_gen
+        root_stamp = self._inode_stamp(self.ROOT_INODE)
+
+        self._inode_cache.put(self._rootpath, tree_stamp,
+                              self.ROOT_INODE)
+        self.caches["_inode_name"].put(self.ROOT_INODE, root_stamp, "/")
+        self.caches["_inode_name_lower"].put(self.ROOT_INODE,
+                                             root_stamp, "/")
+        self.caches["pathfor"].put(self.ROOT_INODE, tree_stamp,
+                                   self._rootpath)
 
     @property
     def root(self):
@@ -94,8 +176,11 @@ class ArchiveFS:
             # also includes the inode cache, so just clear that here
             self._inode_cache.clear()
 
+            for view in self._views:
+                view.clearcaches()
+
         for c in which:
-            if which=="inodeof":
+            if c=="inodeof":
                 self._inode_cache.clear()
             else:
                 self.caches[c].clear()
@@ -115,13 +200,8 @@ class ArchiveFS:
             # don't want to ignore KeyErrors here
             cache = self.caches[cache_name]
 
-        for key in keys:
-            try:
-                # but here we do
-                del cache[key]
-            except KeyError:
-                # the key may not have been in the cache, which is fine
-                pass
+        # the key may not have been in the cache, which is fine
+        cache.discard(*keys)
 
     def del_from_caches(self, cache_list, *keys):
         """
@@ -134,6 +214,60 @@ class ArchiveFS:
         for c in cache_list:
             self.remove_cached_values(c, *keys)
 
+    def _unshare(self):
+        """
+        If the top-level tables are shared with a snapshot, replace
+        them with copies before they are modified. These are shallow
+        copies: the per-directory containers are still shared until
+        they are changed (see _writable_dir()).
+        """
+        if self._shared:
+            self.inode_table = copy(self.inode_table)
+            self.directories = dict(self.directories)
+            self.name_index = dict(self.name_index)
+            self._shared = False
+
+    def _writable_dir(self, dirinode):
+        """
+        Get the contents and name index of the directory `dirinode`
+        for modification, first copying them if they may be shared
+        with a snapshot.
+
+        :param int dirinode:
+        :return: 2-tuple of (set of child inodes, name index dict)
+        """
+        self._unshare()
+
+        owned = self._owned_dirs
+        if owned is not None and dirinode not in owned:
+            self.directories[dirinode] = copy(self.directories[dirinode])
+            self.name_index[dirinode] = dict(self.name_index[dirinode])
+            owned.add(dirinode)
+
+        return self.directories[dirinode], self.name_index[dirinode]
+
+    def _inode_stamp(self, inode):
+        """
+        :return: the current generation of `inode`
+        """
+        return self._inode_gen.get(inode, 0)
+
+    def _bump(self, *inodes):
+        """
+        Advance the generation of each of `inodes`, invalidating their
+        cached names and (for directories) cached listings.
+        """
+        gens = self._inode_gen
+        for i in inodes:
+            gens[i] = gens.get(i, 0) + 1
+
+    def _bump_tree(self):
+        """
+        Advance the tree generation, invalidating all cached
+        path->inode and inode->path lookups.
+        """
+        self._tree_gen += 1
+
     ##=====================================================
     ## File Access/stats
     ##-----------------------------------------------------
@@ -153,8 +287,7 @@ class ArchiveFS:
         path = PureCIPath(ppath)
 
         try:
-            return self._inode_cache[path]
-            # return self.caches["inodeof"][path]
+            return self._inode_cache.get(path, self._tree_gen)
         except KeyError:
 
             parts = path.parts
@@ -163,31 +296,26 @@ class ArchiveFS:
                 raise ValueError(f"Path must be absolute: {path}")
 
             if len(parts)==1:
-                self._inode_cache[path] = self.ROOT_INODE
-                # self.caches["inodeof"][path] = self.ROOT_INODE
-                return self.ROOT_INODE
+                return self._inode_cache.put(path, self._tree_gen,
+                                             self.ROOT_INODE)
 
-            ir=self.root
-            for p in parts[1:]:
+            inode = self.ROOT_INODE
+            for i, p in enumerate(parts[1:], 2):
 
+                # `inode` is the parent of the current path part
                 try:
-                    # `ir` is the parent of the current path part
-                    for i in self.dir_inodes(ir.inode):
-                        if self._inode_name_lower(i) == p.lower():
-                            ir = self.inode_table[i]
-                            break
-                    else:
-                        raise Error_ENOENT(
-                            PureCIPath(*parts[:parts.index(p) + 1])
-                        ) from None
-                except Error_EIO:
+                    children = self.name_index[inode]
+                except KeyError:
+                    raise Error_ENOTDIR(inode) from None
+
+                try:
+                    inode = children[p.lower()]
+                except KeyError:
                     raise Error_ENOENT(
-                        PureCIPath(*parts[:parts.index(p) + 1])
+                        PureCIPath(*parts[:i])
                     ) from None
 
-            # res = self.caches["inodeof"][path] = ir.inode
-            res = self._inode_cache[path] = ir.inode
-            return res
+            return self._inode_cache.put(path, self._tree_gen, inode)
 
     def _inode_name(self, int_inode:int):
         """
@@ -197,13 +325,14 @@ class ArchiveFS:
         :param int_inode:
         """
 
+        cache = self.caches["_inode_name"]
+        stamp = self._inode_stamp(int_inode)
         try:
-            return self.caches["_inode_name"][int_inode]
+            return cache.get(int_inode, stamp)
         except KeyError:
             try:
-                n = self.caches["_inode_name"][
-                    int_inode] = self.inode_table[int_inode].name
-                return n
+                return cache.put(int_inode, stamp,
+                                 self.inode_table[int_inode].name)
             except (IndexError, AttributeError):
                 raise Error_EIO(int_inode) from None
 
@@ -212,12 +341,13 @@ class ArchiveFS:
         :return: a lower-case version of the stored name,
             for case-insensitive comparisons
         """
+        cache = self.caches["_inode_name_lower"]
+        stamp = self._inode_stamp(inode)
         try:
-            return self.caches["_inode_name_lower"][inode]
+            return cache.get(inode, stamp)
         except KeyError:
-            n = self.caches["_inode_name_lower"][
-                inode] = self._inode_name(inode).lower()
-            return n
+            return cache.put(inode, stamp,
+                             self._inode_name(inode).lower())
 
     def pathfor(self, inode:int):
         """
@@ -225,7 +355,7 @@ class ArchiveFS:
             pointed to by `inode`.
         """
         try:
-            return self.caches["pathfor"][inode]
+            return self.caches["pathfor"].get(inode, self._tree_gen)
         except KeyError:
 
             try:
@@ -241,7 +371,11 @@ class ArchiveFS:
 
             path_parts = []
 
-            while ir.inode > 0: # since inode 0 == root
+            while ir.inode != self.ROOT_INODE:
+                if ir.parent == ir.inode:
+                    # reached the real root without passing through
+                    # ours (only possible for an ArchiveFSView)
+                    raise Error_EIO(inode)
                 path_parts.append(ir.name)
                 ir = self.inode_table[ir.parent]
 
@@ -250,10 +384,8 @@ class ArchiveFS:
 
             # and return a constructed path (requires reverse
             # iteration of path_parts)
-            path = self.caches["pathfor"][
-                inode] = self.CIPath(*path_parts[::-1])
-
-            return path
+            return self.caches["pathfor"].put(
+                inode, self._tree_gen, self.CIPath(*path_parts[::-1]))
 
     def get_path(self, path):
         """
@@ -333,24 +465,26 @@ class ArchiveFS:
     @ls.register(int)
     def _ls_inode(self, dirinode, verbose=False):
 
+        stamp = self._inode_stamp(dirinode)
+
         if verbose:
+            cache = self.caches["vlistdir"]
             try:
-                return self.caches["vlistdir"][dirinode]
+                return cache.get(dirinode, stamp)
             except KeyError:
-                filelist = self.caches["vlistdir"][dirinode] = [
+                return cache.put(dirinode, stamp, [
                     ## cistat(st_type, st_ino, st_name)
                     cistat("d" if i in self.directories else "f",
                            i, self._inode_name(i))
-                    for i in self.directories[dirinode]]
-                return filelist
+                    for i in self.directories[dirinode]])
         else:
+            cache = self.caches["listdir"]
             try:
-                return self.caches["listdir"][dirinode]
+                return cache.get(dirinode, stamp)
             except KeyError:
-                filelist = self.caches["listdir"][dirinode] = [
+                return cache.put(dirinode, stamp, [
                     self._inode_name(i)
-                    for i in self.directories[dirinode]]
-                return filelist
+                    for i in self.directories[dirinode]])
 
     # XXX: is there a need to cache the results of this function (the list of paths)? All the sub-functions it calls are cached, so it'd be slightly redundant; for now let's just watch how everything performs and see about it later.
     def listdir(self, directory):
@@ -579,7 +713,169 @@ class ArchiveFS:
 
             yield from _iter(rootpath, self.inodeof(rootpath))
 
+    ##=====================================================
+    ## Queries
+    ##=====================================================
+
+    def glob(self, pattern, root="/", *, dirs=True, files=True):
+        """
+        Lazily yield the inode of each entry under `root` whose path
+        relative to `root` matches the glob `pattern`. Matching is
+        case-insensitive. In addition to the usual "*", "?" and "[]"
+        wildcards (which never match across a "/"), a component of
+        "**" matches any number of directories, including none, e.g.::
 
+            fs.glob("**/*.esp")           # plugins at any depth
+            fs.glob("data/**/textures")   # any textures dir in data
+
+        Components without wildcards are looked up directly in the
+        name index of each directory reached, so only the subtrees
+        the pattern can actually match are visited.
+
+        :param str pattern:
+        :param root: directory to search under
+        :param dirs: include matching directories
+        :param files: include matching files
+        :rtype: collections.abc.Iterator[int]
+        """
+        matchers = query.compile_pattern(pattern)
+        end = len(matchers)
+
+        if not matchers:
+            return
+
+        directories = self.directories
+        name_index = self.name_index
+
+        # memoized query.closure()
+        closures = {}
+        def closure(states):
+            try:
+                return closures[states]
+            except KeyError:
+                c = closures[states] = query.closure(states, matchers)
+                return c
+
+        # each stack entry is a directory along with the positions in
+        # `matchers` that its children must match next
+        stack = [(self.inodeof(root),
+                  closure(frozenset((0,))) - {end})]
+
+        while stack:
+            dirinode, states = stack.pop()
+            children = name_index[dirinode]
+
+            # "**" positions carry over into every subdirectory
+            recurse = frozenset(i for i in states
+                                if matchers[i] is query.RECURSE)
+
+            # find the children matching each of the other positions
+            groups = []
+            for i in states:
+                m = matchers[i]
+                if m is query.RECURSE:
+                    continue
+                if type(m) is str:
+                    # literal: just look it up
+                    matched = (children[m],) if m in children else ()
+                else:
+                    matched = [children[n] for n in filter(m, children)]
+                if matched:
+                    groups.append((frozenset((i + 1,)), matched))
+
+            if len(groups) > 1:
+                # a child may match several positions at once
+                merged = {}
+                for adv, matched in groups:
+                    for inode in matched:
+                        merged[inode] = merged.get(inode, adv) | adv
+                groups = [(adv, [inode]) for inode, adv in merged.items()]
+
+            advanced = set()
+            for adv, matched in groups:
+                next_states = closure(recurse | adv)
+                matches = end in next_states
+                next_states -= {end}
+
+                for inode in matched:
+                    advanced.add(inode)
+                    isdir = inode in directories
+
+                    if matches and (dirs if isdir else files):
+                        yield inode
+
+                    if isdir and next_states:
+                        stack.append((inode, next_states))
+
+            if recurse:
+                # the remaining children are matched only by "**"
+                next_states = closure(recurse)
+
+                if end in next_states:
+                    # trailing "**": everything below here matches
+                    next_states -= {end}
+                    for inode in children.values():
+                        if inode in advanced:
+                            continue
+                        if inode in directories:
+                            if dirs:
+                                yield inode
+                            stack.append((inode, next_states))
+                        elif files:
+                            yield inode
+                else:
+                    for inode in directories.keys() & directories[dirinode]:
+                        if inode not in advanced:
+                            stack.append((inode, next_states))
+
+    def find(self, root="/", *, name=None, suffixes=None,
+             dirs=True, files=True, maxdepth=None):
+        """
+        Lazily yield the inode of every entry under `root` that meets
+        all of the given criteria.
+
+        :param root: directory to search under
+        :param str name: glob pattern (e.g. "*.es[pm]") that the final
+            component of the path must match, case-insensitively
+        :param suffixes: iterable of file extensions, with or without
+            a leading "." (e.g. ``{"esp", ".esm", "bsa"}``); if given,
+            only entries with one of these extensions are included
+        :param dirs: include directories
+        :param files: include files
+        :param int maxdepth: if given, do not descend more than this
+            many levels below `root` (1 means only the direct contents
+            of `root`)
+        :rtype: collections.abc.Iterator[int]
+        """
+        match = None if name is None else query.compile_component(name)
+        if type(match) is str:
+            match = match.__eq__
+        elif match is query.RECURSE:
+            match = None
+
+        if suffixes is not None:
+            suffixes = query.normalize_suffixes(suffixes)
+
+        directories = self.directories
+        name_index = self.name_index
+
+        stack = [(self.inodeof(root), 1)]
+
+        while stack:
+            dirinode, depth = stack.pop()
+
+            for lname, inode in name_index[dirinode].items():
+                isdir = inode in directories
+
+                if (dirs if isdir else files) \
+                        and (match is None or match(lname)) \
+                        and (suffixes is None
+                             or lname.rpartition(".")[2] in suffixes
+                             and "." in lname):
+                    yield inode
+
+                if isdir and (maxdepth is None or depth < maxdepth):
+                    stack.append((inode, depth + 1))
 
     @singledispatch_m
     def is_dir(self, path):
@@ -656,7 +952,10 @@ class ArchiveFS:
         try:
             inode = self._create(path)
             # print("created directory {}".format(path))
-            self.directories[inode] = set()
+            self.directories[inode] = self.dir_contents_type()
+            self.name_index[inode] = {}
+            if self._owned_dirs is not None:
+                self._owned_dirs.add(inode)
         except Error_EEXIST:
             if not exist_ok:
                 raise
@@ -673,6 +972,8 @@ class ArchiveFS:
         if self.exists(path):
             raise Error_EEXIST(path.str)
 
+        self._unshare()
+
         # new inode numbers are always == 1+current maximum inode.
         # since they start at 0, this is == the len of the table
         new_inode = len(self.inode_table)
@@ -700,10 +1001,12 @@ class ArchiveFS:
             return self.inodeof(parent)
 
     def _addtodir(self, inode:int, parent_inode:int):
-        self.directories[parent_inode].add(inode)
+        contents, index = self._writable_dir(parent_inode)
+        contents.add(inode)
+        index[self.inode_table[inode].name.lower()] = inode
 
-        # un-cache the parent-dir's file list
-        self.del_from_caches(("listdir", "vlistdir"), parent_inode)
+        # invalidate the parent-dir's file list
+        self._bump(parent_inode)
 
 
     ##===============================================
@@ -724,8 +1027,6 @@ class ArchiveFS:
 
         self._unlink(self.inodeof(path))
 
-        self.remove_cached_values("inodeof", path)
-
     def rmdir(self, dirpath):
         """
         Remove an empty directory. Raises Errors if `directory` is not
@@ -747,9 +1048,6 @@ class ArchiveFS:
 
         self._del_dir(dirinode)
 
-        # finally, remove the cached inodeof() value
-        self.remove_cached_values("inodeof", dirpath)
-
     def rmtree(self, directory):
         """
         Recursively remove a non-empty directory tree.
@@ -760,21 +1058,23 @@ class ArchiveFS:
         assert directory != self.root, "No. Stop that."
 
         dirinode = self.inodeof(directory)
+        # grab these before _del_dir_tree clears the record
+        dirrec = self.inode_table[dirinode]
+        par_inode, dirname = dirrec.parent, dirrec.name
+
+        self._unshare()
         self._del_dir_tree(dirinode)
 
         # have to do a final removal of the dir from its parent-list
         # (since we skip that step in _del_dir_tree)
-        par_inode = self.inode_table[dirinode].parent
-        self.directories[par_inode].remove(dirinode)
+        contents, index = self._writable_dir(par_inode)
+        contents.remove(dirinode)
+        del index[dirname.lower()]
 
-        # delete cached listdir() result for its parent
-        self.del_from_caches(("listdir", "vlistdir"), par_inode)
-
-        # and, since figuring out exactly which paths were deleted
-        # could be an expensive, superflous operation, it's easier
-        # just to clear the entire inodeof() cache
-        self._inode_cache.clear()
-        # self.caches["inodeof"].clear()
+        # invalidate the listdir() result for its parent, and all
+        # cached paths
+        self._bump(par_inode)
+        self._bump_tree()
 
     def _del_dir(self, dirinode):
         """
@@ -783,11 +1083,13 @@ class ArchiveFS:
 
         :param int dirinode:
         """
-        # remove it from directory table & listdir cache
+        # remove it from directory table
+        self._unshare()
         del self.directories[dirinode]
-        self.del_from_caches(("listdir", "vlistdir"), dirinode)
+        del self.name_index[dirinode]
 
-        # now delete it like any other file
+        # now delete it like any other file (which also invalidates
+        # its cached listing)
         self._unlink(dirinode)
 
     def _del_dir_tree(self, dirinode:int):
@@ -804,15 +1106,14 @@ class ArchiveFS:
             else:
                 self._del_dir_tree(childnode)
 
-        # remove cached values
-        self.del_from_caches(("_inode_name", "pathfor",
-                              "_inode_name_lower"),
-                             *child_inodes)
+        # invalidate cached names
+        self._bump(*child_inodes)
 
         # remove the empty dir when it's all done
         del self.directories[dirinode]
+        del self.name_index[dirinode]
         self.inode_table[dirinode]=None
-        self.del_from_caches(("listdir", "vlistdir"), dirinode)
+        self._bump(dirinode)
 
 
     def _unlink(self, inode):
@@ -827,27 +1128,17 @@ class ArchiveFS:
         inorec = self.inode_table[inode]
 
         # remove this node from its parent-directory's nodelist
-        self.directories[inorec.parent].remove(inode)
+        contents, index = self._writable_dir(inorec.parent)
+        contents.remove(inode)
+        del index[inorec.name.lower()]
 
-        # clear it from some of the caches
-        self._cleanup_inode_cache(inorec)
+        # invalidate its cached values and its parent's listing
+        self._bump(inode, inorec.parent)
+        self._bump_tree()
 
         # and null out its entry in the inode table
         self.inode_table[inode] = None
 
-    def _cleanup_inode_cache(self, inode_record):
-        """
-        :param InodeRecord inode_record:
-        """
-        # clear some cache values
-        self.del_from_caches(("_inode_name",
-                              "_inode_name_lower",
-                              "pathfor"),
-                             inode_record.inode)
-
-        self.del_from_caches(("listdir", "vlistdir"),
-                             inode_record.parent)
-
 
     ##===============================================
     ## Name/Path Manipulation
@@ -1052,38 +1343,33 @@ class ArchiveFS:
         # PRINT << "_move(" << from_path << ", " << to_path << ")"
 
         # get inode record from current path value
-        inorec = self.inode_table[self.inodeof(from_path)]
+        inode = self.inodeof(from_path)
+        inorec = self.inode_table[inode]
+        old_parent = inorec.parent
 
         # remove from old dir
-        self.directories[inorec.parent].remove(inorec.inode)
-        self.del_from_caches(("listdir", "vlistdir"), inorec.parent)
+        contents, index = self._writable_dir(old_parent)
+        contents.remove(inode)
+        del index[inorec.name.lower()]
 
-        # change name and parent
-        inorec.name = to_path.name
-        inorec.parent = self.inodeof(to_path.parent)
+        # change name and parent; records may be shared with a
+        # snapshot, so replace rather than modify it
+        new_parent = self.inodeof(to_path.parent)
+        self.inode_table[inode] = InodeRecord(to_path.name,
+                                              inode, new_parent)
 
         # add to new dir
-        self.directories[inorec.parent].add(inorec.inode)
+        contents, index = self._writable_dir(new_parent)
+        contents.add(inode)
+        index[to_path.name.lower()] = inode
 
-        ## final cleanup of some cache values ##
+        ## invalidate affected cache values ##
 
-        # clear listdir results for new parent
-        self.del_from_caches(("listdir", "vlistdir"), inorec.parent)
-
-        if self.is_dir(inorec.inode):
-            # if we move a directory, a lot of paths may have changed,
-            # so we're just going to clear the entire inodeof() and
-            # pathfor() caches
-            self.clearcaches("inodeof", "pathfor")
-        else:
-            # but if it was just a file, we don't need to be so dramatic
-            self.remove_cached_values("pathfor", inorec.inode)
-            self.remove_cached_values("inodeof", from_path)
-
-        # if the item changed names, also clear the name caches
-        if from_path.name != to_path.name:
-            self.del_from_caches(("_inode_name", "_inode_name_lower"),
-                                 inorec.inode)
+        # listdir results for both parents, and the item's name. Paths
+        # may have changed for an entire subtree, so advance the
+        # tree generation as well
+        self._bump(old_parent, new_parent, inode)
+        self._bump_tree()
 
         return True
 
@@ -1097,20 +1383,43 @@ class ArchiveFS:
         """
         # PRINT << "_change_name(" << path << ", " << new_name << ")"
 
+        inode = self.inodeof(path)
+        inorec = self.inode_table[inode]
 
-        inorec = self.inode_table[self.inodeof(path)]
-        inorec.name = new_name
+        _, siblings = self._writable_dir(inorec.parent)
+        del siblings[inorec.name.lower()]
+        siblings[new_name.lower()] = inode
 
-        self._cleanup_inode_cache(inorec)
+        self.inode_table[inode] = InodeRecord(new_name, inode,
+                                              inorec.parent)
 
-        if self.is_dir(inorec.inode):
-            self.clearcaches("inodeof", "pathfor")
-        else:
-            self.remove_cached_values("pathfor", inorec.inode)
-            self.remove_cached_values("inodeof", path)
+        self._bump(inode, inorec.parent)
+        self._bump_tree()
 
         return True
 
+    @contextmanager
+    def batch(self):
+        """
+        Collect a group of changes and apply them all at once when the
+        ``with`` block exits (unless it exits with an exception, in
+        which case nothing is changed)::
+
+            with fs.batch() as b:
+                for p in fs.iterdir("/Data"):
+                    b.move(p, "/")
+                b.remove("/Data")
+
+            b.changes # summary of what changed
+
+        See FSBatch for details.
+
+        :rtype: FSBatch
+        """
+        fsbatch = FSBatch(self)
+        yield fsbatch
+        fsbatch.apply()
+
     def _check_collision(self, target, overwrite):
         """
         If the file `target` exists and overwrite is True, `target`
@@ -1169,40 +1478,272 @@ class ArchiveFS:
     ## Misc
     ##===============================================
 
+    @classmethod
+    def from_listing(cls, entries):
+        """
+        Build a new filesystem from a listing of archive entries in a
+        single pass. This is equivalent to calling ``touch("/"+entry)``
+        for each entry, but the inode table, directory sets and name
+        caches are filled in directly, without creating a path object
+        or re-resolving the parent directory for every entry.
+
+        The listing is expected to be sorted (case-insensitively),
+        which lets consecutive entries in the same directory reuse
+        that directory's already-resolved inode. Unsorted input still
+        produces a correct filesystem, just a bit more slowly.
+
+        :param collections.abc.Iterable[str] entries: paths relative
+            to the root of the archive; entries ending with "/" are
+            created as (possibly empty) directories, all others as
+            files. As with ``touch()``, duplicates (compared
+            case-insensitively) are ignored.
+        """
+        fs = cls()
+
+        table = fs.inode_table
+        directories = fs.directories
+        dir_contents_type = fs.dir_contents_type
+        name_index = fs.name_index
+        names = fs.caches["_inode_name"]
+        lower_names = fs.caches["_inode_name_lower"]
+
+        # lower-case components and inodes of the directory that
+        # contained the previous entry; cur_inodes[0] is the root
+        cur_parts = []
+        cur_inodes = [cls.ROOT_INODE]
+
+        for entry in entries:
+            parts = [p for p in entry.split("/") if p]
+            if not parts:
+                continue
+
+            if entry.endswith("/"):
+                dir_parts, filename = parts, None
+            else:
+                dir_parts, filename = parts[:-1], parts[-1]
+
+            lparts = [p.lower() for p in dir_parts]
+
+            # find how much of the previous entry's directory is
+            # shared with this one, then discard the remainder
+            common = 0
+            for prev, new in zip(cur_parts, lparts):
+                if prev != new:
+                    break
+                common += 1
+
+            del cur_parts[common:]
+            del cur_inodes[common + 1:]
+
+            parent = cur_inodes[-1]
+
+            # resolve (or create) the remaining directories; looking
+            # them up in the name index merges case-variant paths
+            for name, lname in zip(dir_parts[common:], lparts[common:]):
+                try:
+                    parent = name_index[parent][lname]
+                except KeyError:
+                    inode = len(table)
+                    table.append(InodeRecord(name, inode, parent))
+                    directories[parent].add(inode)
+                    name_index[parent][lname] = inode
+                    directories[inode] = dir_contents_type()
+                    name_index[inode] = {}
+                    names.put(inode, 0, name)
+                    lower_names.put(inode, 0, lname)
+
+                    parent = inode
+
+                cur_parts.append(lname)
+                cur_inodes.append(parent)
+
+            if filename is not None:
+                lname = filename.lower()
+                if lname == filename:
+                    # share the string rather than keeping two copies
+                    lname = filename
+                if lname not in name_index[parent]:
+                    inode = len(table)
+                    table.append(InodeRecord(filename, inode, parent))
+                    directories[parent].add(inode)
+                    name_index[parent][lname] = inode
+                    names.put(inode, 0, filename)
+                    lower_names.put(inode, 0, lname)
+
+        return fs
+
     def mksubfs(self, from_path):
         """
-        Initialize a new ArchiveFS from a sub-directory in this one.
+        Return a view of the sub-directory `from_path` of this fs as a
+        filesystem in its own right (i.e. with `from_path` as its
+        root). The view shares this fs's storage, so creating it takes
+        constant time, and changes made through either one are visible
+        in both.
 
-        :param from_path: The path in this fs that will become the root
-            of the new fs.
+        :param from_path: The path (or inode) in this fs that will
+            become the root of the new fs.
+        :rtype: ArchiveFSView
         """
-        subfs = type(self)()
-        from_path = PureCIPath(from_path)
-
-        for p in self.itertree(from_path, include_root=False):
-            rel_path = p.relative_to(from_path)
-            if self.is_dir(p):
-                # re-root
-                subfs.mkdir("/" / rel_path)
-            else:
-                subfs.touch("/" / rel_path)
-
-        return subfs
+        from .subfs import ArchiveFSView
+        return ArchiveFSView(self, from_path)
 
     def mkdupefs(self):
         """
-        Create and return an exact duplicate of this filesystem
+        Create and return an exact duplicate of this filesystem. The
+        duplicate shares its structures with this one (see
+        ``snapshot()``), so this takes constant time regardless of the
+        size of the filesystem; each fs copies only what it later
+        modifies.
         """
-        import copy
         dupefs = type(self)()
+        dupefs.restore(self.snapshot())
+        return dupefs
 
-        dupefs.inode_table = copy.deepcopy(self.inode_table)
+    def snapshot(self):
+        """
+        Capture the current state of the filesystem. This takes
+        constant time: the snapshot shares all its structures with the
+        filesystem, which from then on copies a directory the first
+        time it modifies it (and its top-level tables on the first
+        modification of any kind).
+
+        :return: an FSSnapshot that can later be passed to
+            ``restore()``
+        :rtype: FSSnapshot
+        """
+        self._shared = True
+        self._owned_dirs = set()
 
-        # directories just contains ints
-        dupefs.directories = copy.deepcopy(self.directories)
+        return FSSnapshot(self.inode_table, self.directories,
+                          self.name_index)
 
-        del copy
-        return dupefs
+    def restore(self, snapshot):
+        """
+        Return the filesystem to the state captured by `snapshot`.
+        The snapshot is left unchanged, so it may be restored any
+        number of times.
+
+        :param FSSnapshot snapshot:
+        """
+        self.inode_table, self.directories, self.name_index = snapshot
+
+        self._shared = True
+        self._owned_dirs = set()
+
+        # anything might have changed, so drop all cached values
+        self.clearcaches()
+        self._bump_tree()
+
+    ##===============================================
+    ## Serialization
+    ##===============================================
+
+    def to_bytes(self):
+        """
+        Serialize the filesystem into a compact binary form that can
+        be turned back into an ArchiveFS by ``from_bytes()``. The data
+        consists of a short header, the parent of every inode as an
+        unsigned 32-bit array, the inodes of all directories (needed
+        to preserve empty ones) as another, and the names of all
+        inodes, NUL-separated.
+
+        Arrays are stored in native byte order; this is meant for
+        caching a layout on the same machine, not for exchange.
+
+        :rtype: bytes
+        """
+        parents, names = self._table_arrays()
+        dirs = array("I", sorted(self.directories))
+
+        namedata = "\0".join(names).encode()
+
+        return b"".join((
+            _SERIAL_HEADER.pack(_SERIAL_MAGIC, _SERIAL_VERSION,
+                                len(parents), len(dirs), len(namedata)),
+            parents.tobytes(),
+            dirs.tobytes(),
+            namedata))
+
+    @classmethod
+    def from_bytes(cls, data):
+        """
+        Create a new filesystem from data produced by ``to_bytes()``
+        (by any type of ArchiveFS).
+
+        :param bytes data:
+        :raises ValueError: if `data` is not a serialized ArchiveFS
+        """
+        try:
+            magic, version, num_inodes, num_dirs, namelen = \
+                _SERIAL_HEADER.unpack_from(data)
+        except struct.error as e:
+            raise ValueError("Invalid ArchiveFS data") from e
+
+        if magic != _SERIAL_MAGIC or version != _SERIAL_VERSION:
+            raise ValueError("Invalid ArchiveFS data")
+
+        start = _SERIAL_HEADER.size
+        parents = array("I")
+        dirs = array("I")
+
+        for arr, count in ((parents, num_inodes), (dirs, num_dirs)):
+            end = start + count * arr.itemsize
+            arr.frombytes(data[start:end])
+            start = end
+
+        names = bytes(data[start:start + namelen]).decode().split("\0")
+
+        if len(parents) != num_inodes or len(dirs) != num_dirs \
+                or len(names) != num_inodes:
+            raise ValueError("Truncated ArchiveFS data")
+
+        fs = cls()
+        fs.inode_table = cls._table_from_arrays(parents, names)
+
+        # gather the children of each directory in a single pass
+        # over the parent array
+        children = {d: [] for d in dirs}
+        lnames = {d: {} for d in dirs}
+        for inode in range(1, num_inodes):
+            parent = parents[inode]
+            if parent != _DELETED:
+                children[parent].append(inode)
+                lnames[parent][names[inode].lower()] = inode
+
+        fs.directories = {d: fs.dir_contents_type(c)
+                          for d, c in children.items()}
+        fs.name_index = lnames
+
+        return fs
+
+    def _table_arrays(self):
+        """
+        :return: the inode table as a pair of (array of parent inodes,
+            list of names); deleted inodes have the parent _DELETED
+            and an empty name
+        """
+        parents = array("I")
+        names = []
+        for rec in self.inode_table:
+            if rec is None:
+                parents.append(_DELETED)
+                names.append("")
+            else:
+                parents.append(rec.parent)
+                names.append(rec.name)
+
+        return parents, names
+
+    @classmethod
+    def _table_from_arrays(cls, parents, names):
+        """
+        Construct an inode table from the output of _table_arrays()
+        """
+        table = cls.inode_table_type()
+        for inode, (parent, name) in enumerate(zip(parents, names)):
+            table.append(None if parent == _DELETED
+                         else InodeRecord(name, inode, parent))
+        return table
 
     def fsck(self, root="/"):
         return fsck_modfs(self, root)
@@ -0,0 +1,308 @@
+from collections import namedtuple
+
+from skymodman.constants import OverwriteMode
+
+from .fserrors import *
+from .cipathlib import PureCIPath
+from .inoderecord import InodeRecord
+
+# The result of applying an FSBatch:
+#   dirs:    inodes of the (still existing) directories whose contents
+#            changed
+#   moved:   inodes of the items that were moved or renamed
+#   removed: inodes of all the items that were deleted, including the
+#            contents of deleted directories
+FSChangeSet = namedtuple("FSChangeSet", "dirs moved removed")
+
+
+class FSBatch:
+    """
+    Collects moves, renames and removals to be made to an ArchiveFS
+    and applies them together. Paths are resolved when each change is
+    added, but the filesystem is not modified until ``apply()``. At
+    that point all the changes are checked for collisions in a single
+    pass, then made directly on the fs structures. Cached values are
+    invalidated only once, at the end.
+
+    Either all of the changes are made, or none are.
+
+    A batch describes the final layout rather than a sequence of
+    steps. For example, an item moved out of a directory that the same
+    batch removes is kept, and two items may trade names.
+
+    Usually created with ``ArchiveFS.batch()``.
+    """
+
+    def __init__(self, fs):
+        """
+
+        :param skymodman.types.archivefs.ArchiveFS fs:
+        """
+        self.fs = fs
+
+        # inode -> (new parent inode, new name, overwrite mode, target
+        # path); the path is only kept for error messages
+        self._moves = {}
+
+        # inodes to remove (with their contents); a dict keeps them
+        # in the order given
+        self._removals = {}
+
+        # (moves, removals) after validation
+        self._plan = None
+
+        self.changes = None # type: FSChangeSet
+
+    def __len__(self):
+        return len(self._moves) + len(self._removals)
+
+    ##===============================================
+    ## Collecting changes
+    ##===============================================
+
+    def move(self, path, destination, overwrite=OverwriteMode.PROMPT):
+        """
+        As ``ArchiveFS.move()``: if `destination` is an existing
+        directory, `path` will be moved inside it; otherwise `path`
+        will be moved to `destination`.
+        """
+        src = PureCIPath(path)
+        dst = PureCIPath(destination)
+
+        if self.fs.exists(dst) and self.fs.is_dir(dst):
+            dst = PureCIPath(dst, src.name)
+
+        self._add_move(src, dst, overwrite)
+
+    def rename(self, path, destination, overwrite=OverwriteMode.PROMPT):
+        """
+        As ``ArchiveFS.rename()``: move `path` to exactly `destination`
+        """
+        self._add_move(PureCIPath(path), PureCIPath(destination),
+                       overwrite)
+
+    def chname(self, path, new_name, overwrite=OverwriteMode.PROMPT):
+        """
+        Change just the final component of `path` to `new_name`
+        """
+        src = PureCIPath(path)
+        self._add_move(src, src.with_name(new_name), overwrite)
+
+    def remove(self, path):
+        """
+        Delete `path`; if it is a directory, its contents are deleted
+        as well (except those moved elsewhere by this batch).
+        """
+        inode = self.fs.inodeof(path)
+
+        assert inode != self.fs.ROOT_INODE, "No. Stop that."
+
+        self._removals[inode] = None
+        self._plan = None
+
+    def _add_move(self, src, dst, overwrite):
+        fs = self.fs
+
+        inode = fs.inodeof(src)
+        parent = fs.inodeof(dst.parent)
+
+        if not fs.is_dir(parent):
+            raise Error_ENOTDIR(dst.parent)
+
+        self._moves[inode] = (parent, dst.name, overwrite, dst)
+        self._plan = None
+
+    ##===============================================
+    ## Validation
+    ##===============================================
+
+    def validate(self):
+        """
+        Check all the collected changes against the current state of
+        the filesystem without modifying it.
+
+        Moves whose target already exists are resolved according to
+        their overwrite mode: the existing item is replaced (REPLACE),
+        the move is dropped (IGNORE), or Error_EEXIST is raised. As
+        with ``ArchiveFS.rename()``, an empty directory is always
+        replaced. An existing item that is itself moved or removed by
+        this batch does not count as a collision.
+
+        :raises Error_EEXIST: a target already exists, or two changes
+            share the same target
+        :raises Error_EINVAL: a directory would end up inside itself
+        :raises Error_ENOENT: a target directory is being removed
+        """
+        if self._plan is not None:
+            return
+
+        moves = dict(self._moves)
+        removals = dict(self._removals)
+
+        for inode in moves:
+            if inode in removals:
+                raise Error_EINVAL(self.fs.pathfor(inode),
+                                   "Cannot both move and remove {path}")
+
+        # dropping an IGNOREd move means its source no longer vacates
+        # its place, which may create a new collision; so repeat the
+        # check until nothing more is dropped
+        replaced = self._check_collisions(moves, removals)
+        while replaced is None:
+            replaced = self._check_collisions(moves, removals)
+
+        removals.update(dict.fromkeys(replaced))
+
+        self._check_ancestry(moves, removals)
+
+        self._plan = (moves, removals)
+
+    def _check_collisions(self, moves, removals):
+        """
+        :return: inodes of the existing items that will be replaced,
+            or None if a move was dropped (and `moves` modified)
+        """
+        fs = self.fs
+        name_index = fs.name_index
+
+        vacating = moves.keys() | removals.keys()
+
+        targets = set()
+        replaced = []
+
+        for inode, (parent, name, overwrite, dst) in moves.items():
+            lname = name.lower()
+
+            if (parent, lname) in targets:
+                raise Error_EEXIST(dst)
+            targets.add((parent, lname))
+
+            occupant = name_index[parent].get(lname)
+
+            if occupant is None or occupant == inode \
+                    or occupant in vacating:
+                continue
+
+            if (fs.is_dir(occupant) and not fs.directories[occupant]) \
+                    or overwrite & OverwriteMode.REPLACE:
+                replaced.append(occupant)
+            elif overwrite & OverwriteMode.IGNORE:
+                del moves[inode]
+                return None
+            else:
+                raise Error_EEXIST(dst)
+
+        return replaced
+
+    def _check_ancestry(self, moves, removals):
+        """
+        Make sure that every moved item ends up attached to the root
+        of the filesystem: not within itself, and not within a
+        directory that is being removed.
+        """
+        table = self.fs.inode_table
+        root = self.fs.ROOT_INODE
+
+        def final_parent(i):
+            try:
+                return moves[i][0]
+            except KeyError:
+                return table[i].parent
+
+        for inode, (parent, _, _, dst) in moves.items():
+            seen = set()
+            anc = parent
+            while anc != root:
+                if anc == inode or anc in seen:
+                    raise Error_EINVAL(dst,
+                        "Cannot move a directory inside itself: {path}")
+                if anc in removals:
+                    raise Error_ENOENT(dst.parent)
+                seen.add(anc)
+                anc = final_parent(anc)
+
+    ##===============================================
+    ## Application
+    ##===============================================
+
+    def apply(self):
+        """
+        Validate (if not already done) and make all the collected
+        changes. If anything goes wrong partway, the filesystem is
+        returned to its prior state before the error is re-raised.
+
+        :return: a summary of the changes made (also available as
+            the `changes` attribute)
+        :rtype: FSChangeSet
+        """
+        if self.changes is not None:
+            return self.changes
+
+        self.validate()
+        moves, removals = self._plan
+
+        fs = self.fs
+
+        if not (moves or removals):
+            self.changes = FSChangeSet(set(), set(), set())
+            return self.changes
+
+        before = fs.snapshot()
+        try:
+            changed_dirs, removed = self._apply(moves, removals)
+        except Exception:
+            fs.restore(before)
+            raise
+
+        changed_dirs -= removed
+
+        # now invalidate everything affected, all at once
+        fs._bump(*changed_dirs, *moves, *removed)
+        fs._bump_tree()
+
+        self.changes = FSChangeSet(changed_dirs, set(moves), removed)
+        return self.changes
+
+    def _apply(self, moves, removals):
+        fs = self.fs
+
+        changed_dirs = set()
+        removed = set()
+
+        def detach(i):
+            rec = fs.inode_table[i]
+            contents, index = fs._writable_dir(rec.parent)
+            contents.remove(i)
+            del index[rec.name.lower()]
+            changed_dirs.add(rec.parent)
+
+        # take every moved item out of its current directory first,
+        # so that items leaving a removed directory survive it, and
+        # so that names given up by one item are free for another
+        for inode in moves:
+            detach(inode)
+
+        for inode in removals:
+            if not fs.exists(inode):
+                # was inside an already-removed directory
+                continue
+            detach(inode)
+
+            stack = [inode]
+            while stack:
+                i = stack.pop()
+                removed.add(i)
+                if i in fs.directories:
+                    stack.extend(fs.directories.pop(i))
+                    del fs.name_index[i]
+                fs.inode_table[i] = None
+
+        for inode, (parent, name, _, _) in moves.items():
+            fs.inode_table[inode] = InodeRecord(name, inode, parent)
+
+            contents, index = fs._writable_dir(parent)
+            contents.add(inode)
+            index[name.lower()] = inode
+            changed_dirs.add(parent)
+
+        return changed_dirs, removed
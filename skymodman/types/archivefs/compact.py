@@ -0,0 +1,177 @@
+from array import array
+from bisect import bisect_left
+from sys import intern
+
+# parent value marking a deleted inode
+from .archivefs import ArchiveFS, _DELETED
+
+
+class ChildList(array):
+    """
+    A sorted array of unsigned inode numbers, used in place of a
+    ``set`` to hold the contents of a directory. Membership tests,
+    additions and removals use binary search; since new inodes are
+    always numbered higher than existing ones, adding a freshly-created
+    file is an append.
+    """
+    __slots__ = ()
+
+    def __new__(cls, inodes=()):
+        return super().__new__(cls, "I", sorted(inodes))
+
+    def __contains__(self, inode):
+        i = bisect_left(self, inode)
+        return i < len(self) and self[i] == inode
+
+    def add(self, inode):
+        i = bisect_left(self, inode)
+        if i == len(self) or self[i] != inode:
+            self.insert(i, inode)
+
+    def remove(self, inode):
+        """
+        Remove `inode` from the list. As with ``set.remove()``, raises
+        KeyError if it is not present.
+        """
+        i = bisect_left(self, inode)
+        if i == len(self) or self[i] != inode:
+            raise KeyError(inode)
+        del self[i]
+
+    def __copy__(self):
+        return ChildList(self)
+
+    def __deepcopy__(self, memo):
+        return ChildList(self)
+
+
+class InodeView:
+    """
+    Stands in for an ``InodeRecord`` for entries in a
+    ``CompactInodeTable``. Reads and writes of `name` and `parent`
+    go straight to the table's arrays.
+    """
+    __slots__ = ("_table", "_inode")
+
+    def __init__(self, table, inode):
+        self._table = table
+        self._inode = inode
+
+    @property
+    def inode(self):
+        return self._inode
+
+    @property
+    def name(self):
+        return self._table.names[self._inode]
+
+    @name.setter
+    def name(self, value):
+        self._table.names[self._inode] = intern(value)
+
+    @property
+    def parent(self):
+        return self._table.parents[self._inode]
+
+    @parent.setter
+    def parent(self, value):
+        self._table.parents[self._inode] = value
+
+    def __int__(self):
+        return self._inode
+    def __index__(self):
+        return self._inode
+    def __lt__(self, other):
+        if not hasattr(other, "__int__"):
+            return NotImplemented
+        return self._inode < int(other)
+
+
+class CompactInodeTable:
+    """
+    An inode table that stores its records in parallel arrays rather
+    than as a list of ``InodeRecord`` objects: parent inodes in an
+    ``array('I')``, and names in a list of interned strings (so the
+    many files that share a name--"textures", "meshes", etc.--also
+    share a single string object).
+
+    Supports the subset of the list interface that ArchiveFS uses:
+    ``len()``, ``append()``, and getting/setting items by inode.
+    Getting an item returns an ``InodeView`` (or None if the inode has
+    been deleted); setting an item to None deletes the inode.
+    """
+    __slots__ = ("parents", "names")
+
+    def __init__(self):
+        self.parents = array("I")
+        self.names = []
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, inode):
+        if self.parents[inode] == _DELETED:
+            return None
+        return InodeView(self, inode)
+
+    def __setitem__(self, inode, record):
+        if record is None:
+            self.parents[inode] = _DELETED
+            self.names[inode] = None
+        else:
+            self.parents[inode] = record.parent
+            self.names[inode] = intern(record.name)
+
+    def append(self, record):
+        """
+        Add a new record to the end of the table.
+
+        :param InodeRecord|None record: if None, a placeholder (i.e.
+            deleted) entry is added.
+        """
+        if record is None:
+            self.parents.append(_DELETED)
+            self.names.append(None)
+        else:
+            self.parents.append(record.parent)
+            self.names.append(intern(record.name))
+
+    def __iter__(self):
+        for i in range(len(self.names)):
+            yield self[i]
+
+    def __copy__(self):
+        # the records live in the arrays, so a shallow copy must
+        # duplicate them too
+        dupe = CompactInodeTable()
+        dupe.parents = array("I", self.parents)
+        dupe.names = list(self.names)
+        return dupe
+
+    def __deepcopy__(self, memo):
+        return self.__copy__()
+
+
+class CompactArchiveFS(ArchiveFS):
+    """
+    An ArchiveFS that uses ``CompactInodeTable`` for its inode table
+    and ``ChildList`` arrays for directory contents. It behaves exactly
+    like ArchiveFS, but uses considerably less memory per entry, which
+    matters for archives with 100k+ files.
+    """
+
+    inode_table_type = CompactInodeTable
+    dir_contents_type = ChildList
+
+    def _table_arrays(self):
+        # the table is already in array form
+        table = self.inode_table
+        return table.parents, [n or "" for n in table.names]
+
+    @classmethod
+    def _table_from_arrays(cls, parents, names):
+        table = CompactInodeTable()
+        table.parents = parents
+        table.names = [None if p == _DELETED else intern(n)
+                       for p, n in zip(parents, names)]
+        return table
@@ -0,0 +1,80 @@
+from collections import OrderedDict
+
+
+class VersionedCache:
+    """
+    A size-bounded, least-recently-used cache in which every entry is
+    stored along with a "stamp" (usually a generation counter). A
+    lookup must present the current stamp for its key; if it does not
+    match the one the entry was stored with, the entry is considered
+    stale and is treated as missing.
+
+    This allows whole groups of entries to be invalidated in O(1) time
+    by simply changing the stamp that their owner will present on the
+    next lookup, rather than tracking down and deleting each key.
+    """
+
+    __slots__ = ("_data", "maxsize")
+
+    def __init__(self, maxsize=None):
+        """
+
+        :param int maxsize: maximum number of entries to hold. Once
+            this is exceeded, the least-recently-used entries are
+            dropped. If None, the cache is unbounded.
+        """
+        self._data = OrderedDict()
+        self.maxsize = maxsize
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, stamp):
+        """
+        Return the value cached for `key`.
+
+        :param key:
+        :param stamp: the current stamp for `key`
+        :raise KeyError: if `key` is not in the cache, or was stored
+            with a different stamp.
+        """
+        data = self._data
+
+        entry_stamp, value = data[key]
+
+        if entry_stamp != stamp:
+            # stale; may as well drop it now
+            del data[key]
+            raise KeyError(key)
+
+        data.move_to_end(key)
+        return value
+
+    def put(self, key, stamp, value):
+        """
+        Store `value` for `key`, tagged with `stamp`. Returns `value`.
+        """
+        data = self._data
+
+        data[key] = (stamp, value)
+        data.move_to_end(key)
+
+        if self.maxsize is not None and len(data) > self.maxsize:
+            # drop the least-recently used item
+            data.popitem(last=False)
+
+        return value
+
+    def discard(self, *keys):
+        """
+        Remove the entries for each of `keys`, if they are present.
+        """
+        data = self._data
+        for key in keys:
+            try:
+                del data[key]
+            except KeyError:
+                pass
+
+    def clear(self):
+        self._data.clear()
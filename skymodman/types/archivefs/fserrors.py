@@ -2,7 +2,7 @@ from skymodman.exceptions import Error
 
 __all__ = ['FSError', 'Error_EEXIST', 'Error_ENOTDIR', 'Error_EISDIR',
            'Error_EISDIR', 'Error_ENOTEMPTY', 'Error_ENOENT',
-           'Error_EIO']
+           'Error_EIO', 'Error_EINVAL']
 
 class FSError(Error):
     """ Represents some sort of error in the ArchiveFS """
@@ -31,4 +31,7 @@ class Error_ENOENT(FSError):
     msg="No such file or directory: {path}"
 class Error_EIO(FSError):
     """ Input/Output Error (inode not found) """
-    msg="I/O Error: bad inode {path}" # not actually a path in this case
\ No newline at end of file
+    msg="I/O Error: bad inode {path}" # not actually a path in this case
+class Error_EINVAL(FSError):
+    """ Invalid Argument """
+    msg="Invalid operation on path: {path}"
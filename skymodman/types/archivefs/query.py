@@ -0,0 +1,89 @@
+import re
+from fnmatch import translate
+
+# stands in for a "**" component in a compiled glob pattern
+RECURSE = object()
+
+_wildcards = re.compile(r"[*?\[]")
+
+
+def compile_component(part):
+    """
+    Compile a single component of a glob pattern into a matcher for
+    case-folded names. The result is one of:
+
+        * ``RECURSE``, for "**"
+        * a str, if `part` contains no wildcards; it must equal the
+          name exactly (such components can be looked up directly in
+          a directory's name index rather than tested against every
+          entry)
+        * a predicate taking a case-folded name
+
+    :param str part:
+    """
+    if part == "**":
+        return RECURSE
+
+    part = part.lower()
+
+    if not _wildcards.search(part):
+        return part
+
+    # "*.esp" and the like are by far the most common; a suffix test
+    # is much quicker than a regular expression
+    if part.startswith("*") and not _wildcards.search(part, 1):
+        suffix = part[1:]
+        return lambda name: name.endswith(suffix)
+
+    return re.compile(translate(part), re.DOTALL).match
+
+
+def compile_pattern(pattern):
+    """
+    Split `pattern` on "/" and compile each component with
+    compile_component(). Runs of consecutive "**" are collapsed,
+    since they match exactly what a single one does.
+
+    :param str pattern:
+    :rtype: list
+    """
+    matchers = []
+    for part in pattern.split("/"):
+        if not part:
+            continue
+        m = compile_component(part)
+        if m is RECURSE and matchers and matchers[-1] is RECURSE:
+            continue
+        matchers.append(m)
+    return matchers
+
+
+def closure(states, matchers):
+    """
+    Given a set of positions in `matchers`, add those reachable by
+    letting each "**" match zero directories.
+
+    :param set[int] states:
+    :param list matchers:
+    :rtype: frozenset[int]
+    """
+    pending = list(states)
+    states = set(states)
+    end = len(matchers)
+
+    while pending:
+        i = pending.pop()
+        if i < end and matchers[i] is RECURSE and i + 1 not in states:
+            states.add(i + 1)
+            pending.append(i + 1)
+
+    return frozenset(states)
+
+
+def normalize_suffixes(suffixes):
+    """
+    :param suffixes: iterable of file extensions, with or without
+        the leading "."
+    :return: frozenset of the case-folded extensions, without dots
+    """
+    return frozenset(s.lower().lstrip(".") for s in suffixes)
@@ -0,0 +1,113 @@
+from .archivefs import ArchiveFS, get_associated_pathtype
+from .fserrors import Error_ENOTDIR
+from .inoderecord import InodeRecord
+
+
+def _shared_attr(name):
+    """
+    Create a property that reads and writes the attribute `name` of
+    the view's underlying filesystem.
+    """
+    return property(lambda self: getattr(self._fs, name),
+                    lambda self, value: setattr(self._fs, name, value))
+
+
+class ArchiveFSView(ArchiveFS):
+    """
+    Presents a directory of an ArchiveFS as the root of a filesystem
+    of its own. The view holds no entries itself: the inode table,
+    directory contents, name index and cache generations all belong
+    to the underlying fs, and only the lookup caches and the root
+    inode are the view's own. Thus creating a view takes constant
+    time, inode numbers are the same in both, and any change made
+    through one is immediately visible through the other.
+
+    Paths given to and returned by the view are relative to its root;
+    inodes outside the root's subtree cannot be reached through it.
+    """
+
+    # the fs-wide state lives in the underlying fs
+    inode_table = _shared_attr("inode_table")
+    directories = _shared_attr("directories")
+    name_index = _shared_attr("name_index")
+    sorting = _shared_attr("sorting")
+    _shared = _shared_attr("_shared")
+    _owned_dirs = _shared_attr("_owned_dirs")
+    _tree_gen = _shared_attr("_tree_gen")
+    _inode_gen = _shared_attr("_inode_gen")
+
+    # views of views are attached to the underlying fs directly
+    _views = ()
+
+    # noinspection PyMissingConstructor
+    def __init__(self, fs, root):
+        """
+
+        :param ArchiveFS fs: the filesystem to view
+        :param root: path to (or inode of) the directory in `fs` that
+            will be the root of the view
+        """
+        if isinstance(fs, ArchiveFSView):
+            # translate to a path in the underlying fs
+            root = root if isinstance(root, int) else fs.inodeof(root)
+            fs = fs.fs
+
+        self._fs = fs
+
+        root_inode = root if isinstance(root, int) else fs.inodeof(root)
+        if not fs.is_dir(root_inode):
+            raise Error_ENOTDIR(root)
+
+        # shadows the class attribute, which every lookup uses as
+        # its starting point
+        self.ROOT_INODE = root_inode
+
+        self.CIPath = get_associated_pathtype(self)
+
+        self._root = InodeRecord("/", root_inode, root_inode)
+        self._rootpath = self.CIPath(self._root.name)
+
+        self._init_caches()
+
+        fs._views.add(self)
+
+    @property
+    def fs(self):
+        """
+        :return: the underlying ArchiveFS
+        """
+        return self._fs
+
+    @property
+    def dir_contents_type(self):
+        return self._fs.dir_contents_type
+
+    @property
+    def root_in_fs(self):
+        """
+        :return: the current path of this view's root within the
+            underlying filesystem
+        """
+        return self._fs.pathfor(self.ROOT_INODE)
+
+    def restore(self, snapshot):
+        # the state (and caches needing to be cleared) are the
+        # underlying fs's
+        self._fs.restore(snapshot)
+
+    def mkdupefs(self):
+        """
+        Duplicate the underlying filesystem (see
+        ``ArchiveFS.mkdupefs()``) and return a view of the duplicate
+        with the same root.
+        """
+        return ArchiveFSView(self._fs.mkdupefs(), self.ROOT_INODE)
+
+    def to_bytes(self):
+        """
+        Serialize just the contents of the view; unlike the view
+        itself, this requires copying them all.
+        """
+        return ArchiveFS.from_listing(
+            str(p)[1:] + ("/" if self.is_dir(p) else "")
+            for p in self.itertree()).to_bytes()
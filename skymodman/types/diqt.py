@@ -1,4 +1,5 @@
-from collections import deque, Mapping, Sequence
+from collections import deque
+from collections.abc import Mapping, Sequence
 
 
 class diqt(deque):
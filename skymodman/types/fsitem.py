@@ -1,6 +1,6 @@
+import sys
+from array import array
 from pathlib import Path
-from os.path import join
-from itertools import count
 from functools import total_ordering
 
 # @humanizer.humanize
@@ -14,20 +14,27 @@ class FSItem:
 
     #Since we may be creating LOTS of these things (some mods have gajiblions of files), we'll define
     # __slots__ to keep the memory footprint as low as possible
-    __slots__=("path", "lpath", "name", "parent", "isdir", "row", "_children", "_childnames", "_hidden", "_hasconflict")
+    __slots__=("_path", "name", "parent", "isdir", "row", "_children", "_childnames", "_hasconflict", "_span", "_filepos")
 
-    def __init__(self, path, name, parent=None, isdir=True, **kwargs):
+    def __init__(self, path, name, parent=None, isdir=True, span=None,
+                 **kwargs):
         """
 
-        :param str path: a relative path from an arbitray root to this file
+        :param str|None path: a relative path from an arbitray root to
+            this file. May be ``None`` for a file with a `parent`, in
+            which case it is derived from the parent's path and `name`
+            when needed rather than stored
         :param str name: the name that will displayed for this file; usually just the basename
         :param parent: this Item's parent, if any. will be None for top-level items
         :param bool isdir: Is this a directory? If not, it will be marked as never being able to hold children
+        :param range span: the positions, in a sorted and flattened
+            list of all the files in the hierarchy, of the files this
+            item covers: just its own for a file, or every file below
+            it for a directory
         """
         # noinspection PyArgumentList
         super().__init__(**kwargs)
-        self.path = path
-        self.lpath = path.lower() # used to case-insensitively compare two FSItems
+        self._path = path
         self.name = name
         self.parent = parent
 
@@ -39,14 +46,61 @@ class FSItem:
             self._children = None #type: list [FSItem]
             self._childnames = None
 
+        # for a directory built by build_filetree(), the spans of its
+        # files, in the same order as its children
+        self._filepos = None
+
         self.row=0
 
         # as opposed to row, this is relative to the *entire* hierarchy
-        # of files this fsitem belongs to; basically, this is the index
-        # of this item in a flattened list of all files in the mod
-        # self.index = index
+        # of files this fsitem belongs to; basically, these are the
+        # indices of this item (or of this directory's contents) in a
+        # flattened list of all files in the mod
+        self.span = span
+
+        # File_Conflict info for this file, if it conflicts with
+        # another mod; see ModManager.file_conflict_details()
+        self._hasconflict = None
+
+    @property
+    def path(self):
+        """The relative path of this item"""
+        p = self._path
+        if p is None:
+            ppath = self.parent.path
+            return ppath + "/" + self.name if ppath else self.name
+        return p
+
+    @property
+    def lpath(self):
+        """The lower-cased path of this item; used to case-insensitively
+        compare two FSItems"""
+        return self.path.lower()
+
+    @property
+    def span(self):
+        """The positions, in the flattened list of files, covered by
+        this item
+
+        :rtype: range"""
+        s = self._span
+        if self.isdir:
+            return s
+        if s is None:
+            # kept by the parent; its files come after its directories
+            fp = self.parent._filepos
+            if fp is None:
+                return None
+            s = fp[self.row - (len(self.parent._children) - len(fp))]
+        return range(s, s+1)
 
-        self._hidden = False
+    @span.setter
+    def span(self, value):
+        # there can be a great many files, so they only store their
+        # position rather than a whole range object
+        if value is not None and not self.isdir:
+            value = value.start
+        self._span = value
 
     @property
     def ppath(self):
@@ -54,13 +108,13 @@ class FSItem:
         return Path(self.path)
 
     @property
-    def hidden(self):
-        """Return whether this item is marked as hidden"""
-        return self._hidden
+    def conflict(self):
+        """Return the conflict details for this item, or None"""
+        return self._hasconflict
 
-    @hidden.setter
-    def hidden(self, value:bool):
-        self._hidden = value
+    @conflict.setter
+    def conflict(self, value):
+        self._hasconflict = value
 
     @property
     def child_count(self):
@@ -109,6 +163,17 @@ class FSItem:
         else:
             return [self.row]
 
+    def add_child(self, child):
+        """
+        Append `child` to this directory's list of children, setting
+        its row accordingly
+
+        :param FSItem child:
+        """
+        child.row = len(self._children)
+        self._children.append(child)
+        self._childnames.append(child.name)
+
     @property
     def children(self):
         """Returns a list of this item's direct children"""
@@ -133,60 +198,94 @@ class FSItem:
             yield from self._children
 
     @staticmethod
-    def build_filetree(root, file_tree, name_filter=None):
+    def build_filetree(root, paths, name_filter=None, start=0):
         """
+        Create the items for every file and directory in `paths` in a
+        single pass, adding them below `root`. Within each directory,
+        subdirectories come before files.
 
         :param FSItem root: Root container item of the tree
-        :param skymodman.utils.tree.AutoTree file_tree:
+        :param paths: sorted sequence of the paths of the files to add,
+            each relative to the same directory as ``root.path``
+            (i.e. beginning with ``root.path`` if that is not empty).
+            As when sorting strings, everything within a directory must
+            be contiguous.
         :param (str)->bool name_filter: if given and not ``None``, each
-            filename found will be passed to the `namefilter` callable.
-            If the namefiter returns True, that file will NOT be added
-            to the list of children
-        :return: `root`
+            file and directory name found will be passed to the
+            `namefilter` callable. If the namefiter returns True, that
+            file (or directory and its contents) will NOT be added to
+            the tree
+        :param int start: position of the first file in the flattened
+            list of all files; the spans of the new items begin here
+        :return: the new file items, in the same order as `paths`
+        :rtype: list[FSItem]
         """
-
-        if name_filter is None:
-            name_filter = lambda n: False
-
-        root._build_tree(file_tree, name_filter)
-
-        return root
-
-    def _build_tree(self, file_tree, name_filter):
-        row = count()
-        # recurse=False; do it manually by passing child tree to child item
-        for dirs, files in file_tree.walk(recurse=False):
-
-            for d in dirs:
-                if name_filter(d):
-                    continue  # skip names that match filter
-
-                # child=type(self)(path=join(self.path, d),
-                #                  name=d,
-                #                  parent=self,
-                #                  isdir=True)
-
-                child = type(self)(join(self.path, d), d, self, True)
-
-                child._build_tree(file_tree[d], name_filter)
-                child.row = next(row)
-
-                self._children.append(child)
-                self._childnames.append(child.name)
-
-            for f in files:
-                if name_filter(f):
-                    continue
-
-                child = type(self)(join(self.path, f),
-                                   f,
-                                   self,
-                                   False)
-                child.row = next(row)
-
-                self._children.append(child)
-                self._childnames.append(child.name)
-
+        cls = type(root)
+        files = []
+
+        skip = len(root.path) + 1 if root.path else 0
+
+        # the same names turn up over and over in different folders;
+        # only keep one copy of each
+        intern = sys.intern
+
+        # the directories containing the current path, from the root
+        # down, each with the position of its first file, and the file
+        # items that will follow its subdirectories along with their
+        # positions
+        stack = [(root, start, [], array("I"))]
+        # names of the directories on the stack, after the root
+        opendirs = []
+
+        def close_dir():
+            item, first, pending, positions = stack.pop()
+            for f in pending:
+                item.add_child(f)
+            if positions:
+                # the files' spans are kept here rather than on each
+                # of them; see span
+                item._filepos = positions
+            item.span = range(first, start + len(files))
+
+        for path in paths:
+            parts = path[skip:].split("/")
+            name = intern(parts.pop())
+
+            # close the directories this path is not in...
+            depth = 0
+            for d in parts:
+                if depth == len(opendirs) or opendirs[depth] != d:
+                    break
+                depth += 1
+
+            while len(opendirs) > depth:
+                opendirs.pop()
+                close_dir()
+
+            if name_filter and (name_filter(name) or any(
+                    name_filter(d) for d in parts[depth:])):
+                continue
+
+            # ...and open any it is in that are new
+            for d in parts[depth:]:
+                parent = stack[-1][0]
+                child = cls(parent.path + "/" + d if parent.path else d,
+                            intern(d), parent, True)
+                parent.add_child(child)
+
+                stack.append((child, start + len(files), [], array("I")))
+                opendirs.append(d)
+
+            # the file's path is derived from its parent's when needed
+            parent, _, pending, positions = stack[-1]
+            pending.append(cls(None, name, parent, False))
+            positions.append(start + len(files))
+            files.append(pending[-1])
+
+        while stack:
+            close_dir()
+
+        return files
 
     def __eq__(self, other):
         """Return true when these 2 items refer to the same relative path.
@@ -224,8 +323,7 @@ class FSItem:
             f"path: '{self.path}'",
             f"row: {self.row}",
             f"isdir: {self.isdir}",
-            f"kids: {self.child_count}",
-            f"hidden: {self._hidden})",
+            f"kids: {self.child_count})",
             ])
 
     def __hash__(self):
@@ -242,8 +340,7 @@ class FSItem:
         lines= (f"Name: {self.name} ",
                   f"  Path: {self.path}",
                   f"  row: {self.row}",
-                  f"  kids: {self.child_count}",
-                  f"  hidden: {self._hidden}")
+                  f"  kids: {self.child_count}")
 
         if file is not None:
             for l in lines:
@@ -74,7 +74,8 @@ class ModEntry:
 
     @property
     def filetree(self):
-        """Return the files contained by this mod as a tree"""
+        """Return the files contained by this mod as a tree of
+        FSItems"""
         try:
             return Manager().get_mod_file_tree(self.key)
         except AttributeError:
@@ -0,0 +1,238 @@
+import re
+from collections import defaultdict
+
+__all__ = ["ModSearchIndex"]
+
+# separates the fields of a mod's searchable text; no search text can
+# contain it, so a match can never run from one field into the next
+_SEP = "\0"
+
+# the longest n-gram kept in the index
+_N = 3
+
+# how many recent search results are remembered
+_CACHE_SIZE = 16
+
+
+class ModSearchIndex:
+    """
+    An index of the searchable text (name, directory, mod id and
+    version) of each mod in a collection, for finding the mods that
+    match a search string without checking every entry.
+
+    Search strings work as they always have in the mod table: the
+    text may appear anywhere in a field, case is ignored, and ``*``
+    and ``?`` match any run of characters or any single character.
+
+    Every substring of up to three characters of each mod's text is
+    recorded along with the set of mods it appears in. A search for a
+    string of three or fewer characters is then a single lookup; for a
+    longer string, the sets for its three-character pieces are
+    intersected and only the few mods left are checked against the
+    full pattern. When the search text is extended (as happens while
+    the user types), only the previous results need to be checked.
+    The results of recent searches are kept until the index changes,
+    so asking again (e.g. once for every row of a filtered view) is a
+    dict lookup.
+    """
+
+    __slots__ = ("_docs", "_grams", "_last", "_results")
+
+    def __init__(self, entries=()):
+        # mod key -> casefolded searchable text
+        self._docs = {} # type: dict [str, str]
+
+        # n-gram -> set of mod keys
+        self._grams = defaultdict(set)
+
+        # (search text, matching keys) for the most recent search
+        self._last = None
+
+        # search text -> matching keys
+        self._results = {}
+
+        for e in entries:
+            self.add(e)
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, key):
+        return key in self._docs
+
+    @staticmethod
+    def document(entry):
+        """
+        :param skymodman.types.ModEntry entry:
+        :return: the casefolded text of `entry` that is searched
+        """
+        fields = [entry.name or "", entry.directory or ""]
+        if entry.modid:
+            fields.append(str(entry.modid))
+        if entry.version:
+            fields.append(str(entry.version))
+
+        return _SEP.join(fields).casefold()
+
+    ##===============================================
+    ## Maintaining the index
+    ##===============================================
+
+    def add(self, entry):
+        """Add `entry` to the index, replacing any previous text
+        recorded for the same mod"""
+        key = entry.key
+        doc = self.document(entry)
+
+        old = self._docs.get(key)
+        if old == doc:
+            return
+        if old is not None:
+            self.discard(key)
+
+        self._docs[key] = doc
+        for g in _ngrams(doc):
+            self._grams[g].add(key)
+
+        self._changed()
+
+    # re-indexing an entry is no different than adding it again
+    update = add
+
+    def discard(self, key):
+        """Remove the mod with key `key` from the index, if present"""
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+
+        grams = self._grams
+        for g in _ngrams(doc):
+            keys = grams[g]
+            keys.discard(key)
+            if not keys:
+                del grams[g]
+
+        self._changed()
+
+    def rebuild(self, entries):
+        """Discard the current contents and index each of `entries`"""
+        self._docs.clear()
+        self._grams.clear()
+        self._changed()
+
+        for e in entries:
+            self.add(e)
+
+    def _changed(self):
+        """Forget previous search results"""
+        self._last = None
+        self._results.clear()
+
+    ##===============================================
+    ## Searching
+    ##===============================================
+
+    def find(self, text):
+        """
+        :param str text: search string, possibly containing ``*`` or
+            ``?`` wildcards
+        :return: the keys of all the mods matching `text`
+        :rtype: frozenset[str]
+        """
+        text = text.casefold()
+
+        try:
+            return self._results[text]
+        except KeyError:
+            pass
+
+        if not text.strip("*"):
+            # matches everything
+            matches = frozenset(self._docs)
+        else:
+            matches = self._search(text)
+            self._last = (text, matches)
+
+        if len(self._results) >= _CACHE_SIZE:
+            self._results.clear()
+        self._results[text] = matches
+
+        return matches
+
+    def _search(self, text):
+        pieces = [p for p in re.split(r"[*?]", text) if p]
+
+        candidates = None
+        last = self._last
+        if (last is not None and not _has_wildcards(last[0])
+                and last[0] in text):
+            # anything containing the new text also contained the old
+            candidates = last[1]
+
+        for piece in pieces:
+            keys = self._lookup(piece)
+            candidates = keys if candidates is None else candidates & keys
+            if not candidates:
+                return frozenset()
+
+        if candidates is None:
+            # nothing but wildcards
+            candidates = self._docs.keys()
+
+        if len(pieces) == 1 and len(text) <= _N and text == pieces[0]:
+            # the gram lookup was exact
+            return frozenset(candidates)
+
+        regex = _compile(text)
+        docs = self._docs
+        return frozenset(k for k in candidates if regex.search(docs[k]))
+
+    def _lookup(self, piece):
+        """
+        :return: the keys of the mods whose text might contain
+            `piece`; exact if `piece` is no longer than an n-gram
+        """
+        grams = self._grams
+
+        if len(piece) <= _N:
+            return grams.get(piece, frozenset())
+
+        # intersect the smallest sets first
+        sets = sorted((grams.get(piece[i:i+_N], frozenset())
+                       for i in range(len(piece) - _N + 1)),
+                      key=len)
+
+        keys = sets[0]
+        for s in sets[1:]:
+            if not keys:
+                break
+            keys = keys & s
+
+        return keys
+
+
+# <editor-fold desc="helpers">
+
+def _ngrams(doc):
+    """Every distinct substring of `doc` of length 1 to _N that does
+    not cross a field separator"""
+    grams = set()
+    for field in doc.split(_SEP):
+        flen = len(field)
+        for n in range(1, _N + 1):
+            grams.update(field[i:i+n] for i in range(flen - n + 1))
+    return grams
+
+def _has_wildcards(text):
+    return "*" in text or "?" in text
+
+def _compile(text):
+    """Turn a (casefolded) wildcard search string into a regular
+    expression whose wildcards do not match across fields"""
+    return re.compile(
+        "".join(f"[^{_SEP}]*" if c == "*"
+                else f"[^{_SEP}]" if c == "?"
+                else re.escape(c)
+                for c in text))
+
+# </editor-fold>
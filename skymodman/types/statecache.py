@@ -0,0 +1,101 @@
+from collections import OrderedDict
+
+__all__ = ["StateCache"]
+
+
+class StateCache:
+    """
+    A least-recently-used cache whose capacity is a (rough) number of
+    bytes rather than a number of items, and whose items are only good
+    as long as the data they were built from has not changed.
+
+    Each item is stored with a `fingerprint`: any hashable summary of
+    its sources (paths, file sizes and modification times, ...). A
+    lookup must supply the current fingerprint; if it does not match
+    the stored one, the item is stale, so it is dropped and the lookup
+    misses.
+
+    When an item is added, it also gives an estimate of its size.
+    Least-recently-used items are evicted until the total fits in
+    `max_size`; an item larger than that is not stored at all.
+    """
+
+    __slots__ = ("max_size", "_items", "_size")
+
+    def __init__(self, max_size):
+        """
+        :param int max_size: the most bytes (as estimated by the
+            items' producers) to keep
+        """
+        self.max_size = max_size
+
+        # key -> (fingerprint, value, size)
+        self._items = OrderedDict()
+        self._size = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, key):
+        return key in self._items
+
+    @property
+    def size(self):
+        """Total estimated size of the items currently held"""
+        return self._size
+
+    def get(self, key, fingerprint, default=None):
+        """
+        :param key:
+        :param fingerprint: the current fingerprint of the data from
+            which the item for `key` would be built
+        :return: the item stored for `key` if its fingerprint matches
+            `fingerprint`, `default` otherwise
+        """
+        try:
+            fp, value, _ = self._items[key]
+        except KeyError:
+            return default
+
+        if fp != fingerprint:
+            self.discard(key)
+            return default
+
+        self._items.move_to_end(key)
+        return value
+
+    def put(self, key, fingerprint, value, size):
+        """
+        Store `value` for `key` (replacing any previous item), then
+        evict old items until everything fits.
+
+        :param fingerprint: see ``get()``
+        :param int size: estimated size of `value`, in bytes
+        :return: True if the value was stored
+        """
+        self.discard(key)
+
+        if size > self.max_size:
+            return False
+
+        self._items[key] = (fingerprint, value, size)
+        self._size += size
+
+        items = self._items
+        while self._size > self.max_size:
+            _, (_, _, s) = items.popitem(last=False)
+            self._size -= s
+
+        return True
+
+    def discard(self, key):
+        """Remove the item for `key`, if there is one"""
+        try:
+            _, _, size = self._items.pop(key)
+        except KeyError:
+            return
+        self._size -= size
+
+    def clear(self):
+        self._items.clear()
+        self._size = 0
@@ -1,9 +1,11 @@
 import asyncio
 import os
 import re
+from bisect import bisect_left
 # from itertools import count
 from pathlib import Path
 
+from skymodman import metrics
 from skymodman.exceptions import ArchiverError, ExternalProcessError
 from skymodman.types import diqt
 from skymodman.log import withlogger
@@ -14,6 +16,121 @@ _7zopts=("-bd",    # disable progress indic (uses readline, won't really work he
           "-y",    # assume yes to queries
           )
 
+def _prefix_bounds(keys, prefix):
+    """
+    Return the (start, stop) slice indices of the run of items in the
+    sorted list `keys` that begin with `prefix`.
+
+    :param list[str] keys: sorted list of case-folded strings
+    :param str prefix: case-folded prefix
+    """
+    if not prefix:
+        return 0, len(keys)
+
+    start = bisect_left(keys, prefix)
+
+    # every string starting with `prefix` sorts before the string
+    # obtained by incrementing the final character of `prefix`
+    stop = bisect_left(keys,
+                       prefix[:-1] + chr(ord(prefix[-1]) + 1),
+                       start)
+    return start, stop
+
+class ArchiveListing:
+    """
+    Holds the directory and file entries of an archive (as returned by
+    ``7z l``) in sorted order, along with a case-folded prefix index
+    for each. This allows all the entries under a given folder to be
+    counted in O(log n) time, and enumerated in O(log n + k) time,
+    rather than scanning the full listing each time.
+
+    Since 7z is always run in case-insensitive mode, folder lookups
+    are case-insensitive as well.
+
+    The listing also carries `layout`: the most recent ArchiveFS built
+    for the archive--possibly rearranged by the user--in serialized
+    form (see ``ArchiveFS.to_bytes()``), or None. Since listings are
+    cached by the ArchiveHandler, this lets the layout be reused the
+    next time the archive is opened.
+    """
+
+    __slots__ = ("dirs", "files", "_dirkeys", "_filekeys", "layout")
+
+    def __init__(self, dirs, files):
+        """
+
+        :param list[str] dirs: directory entries; each should end with
+            a "/"
+        :param list[str] files: file entries
+        """
+        self.dirs = sorted(dirs, key=str.lower)
+        self.files = sorted(files, key=str.lower)
+
+        self._dirkeys = [d.lower() for d in self.dirs]
+        self._filekeys = [f.lower() for f in self.files]
+
+        self.layout = None # type: bytes
+
+    def __len__(self):
+        return len(self.dirs) + len(self.files)
+
+    @staticmethod
+    def _folder_prefix(folder):
+        """
+        Normalize `folder` into the form used for prefix lookups:
+        case-folded, no leading "/", and exactly one trailing "/".
+        The archive root (empty string or "/") becomes an empty
+        prefix.
+        """
+        folder = folder.strip("/")
+        if not folder:
+            return ""
+        return folder.lower() + "/"
+
+    def count(self, folder, *, dirs=True, files=True):
+        """
+        Return the number of entries contained within `folder` and its
+        subdirectories. If `dirs` is True, the entry for `folder`
+        itself is included in the count.
+
+        :param str folder: path to a directory within the archive
+        :param dirs: count directory entries
+        :param files: count file entries
+        """
+        prefix = self._folder_prefix(folder)
+        n = 0
+
+        if dirs:
+            start, stop = _prefix_bounds(self._dirkeys, prefix)
+            n += stop - start
+        if files:
+            start, stop = _prefix_bounds(self._filekeys, prefix)
+            n += stop - start
+
+        return n
+
+    def subtree(self, folder, *, dirs=True, files=True):
+        """
+        Return a list of all the entries contained within `folder`
+        and its subdirectories. Directories (if requested) are listed
+        before files; each group is sorted case-insensitively.
+
+        :param str folder: path to a directory within the archive
+        :param dirs: include directory entries
+        :param files: include file entries
+        """
+        prefix = self._folder_prefix(folder)
+        entries = []
+
+        if dirs:
+            start, stop = _prefix_bounds(self._dirkeys, prefix)
+            entries.extend(self.dirs[start:stop])
+        if files:
+            start, stop = _prefix_bounds(self._filekeys, prefix)
+            entries.extend(self.files[start:stop])
+
+        return entries
+
 @withlogger
 class ArchiveHandler:
     """
@@ -72,25 +189,37 @@ class ArchiveHandler:
         Returns a 2-tuple where the first item is a list of all the
         directories in the `archive`, the second a list of all the files
         """
+        listing = await self.archive_listing(archive)
+
+        return listing.dirs, listing.files
+
+    async def archive_listing(self, archive):
+        """
+        Return an ``ArchiveListing`` for the contents of `archive`.
+        The listing is cached, so repeated requests for the same
+        archive will not invoke 7z again.
+        """
 
         try:
-            dirs, files = ArchiveHandler._list_archive_cache[archive]
-            # ArchiveHandler._cache_hits+=1
+            listing = ArchiveHandler._list_archive_cache[archive]
+            metrics.count("ArchiveHandler.listing_cache_hits")
         except KeyError:
-            # ArchiveHandler._cache_misses+=1
+            metrics.count("ArchiveHandler.listing_cache_misses")
 
             retcode, dirs, files = await self._archive_contents(archive)
 
             if retcode:
                 raise ArchiverError(
                     f"7z-list process returned a non-zero exit code: {retcode}")
-            else:
-                ArchiveHandler._list_archive_cache[archive] = (dirs, files)
+
+            listing = ArchiveHandler._list_archive_cache[
+                archive] = ArchiveListing(dirs, files)
 
         # self.LOGGER << "Cache hits: {0._cache_hits}, misses: {0._cache_misses}".format(ArchiveHandler)
-        return dirs, files
+        return listing
 
 
+    @metrics.timed
     async def _archive_contents(self, archive):
         """
         Use the 'list' option of 7z to examine the types of files
@@ -179,6 +308,7 @@ class ArchiveHandler:
 
         # return [l+suffix for l in lines]
 
+    @metrics.timed
     async def extract(self, archive, destination,
                       # specific_entries=None, callback=None):
                       specific_entries=None):
@@ -242,20 +372,31 @@ class ArchiveHandler:
         proc = await create
         # c = count(start=1)
         # loop = asyncio.get_event_loop()
-        while True:
-            # simulate long processes
-            # await asyncio.sleep(1)
-
-            line = await proc.stdout.readline()
-            # print("{!r}".format(line))
-            if not line: break
-
-            # 7z logs filepaths on lines starting w/ '- '
-            if line.startswith(b'- '):
-                yield line[2:].decode()
-                # loop.call_soon_threadsafe(callback, line[2:].decode(), next(c))
-
-        await proc.wait()
+        try:
+            while True:
+                # simulate long processes
+                # await asyncio.sleep(1)
+
+                line = await proc.stdout.readline()
+                # print("{!r}".format(line))
+                if not line: break
+
+                # 7z logs filepaths on lines starting w/ '- '
+                if line.startswith(b'- '):
+                    metrics.count("ArchiveHandler.files_extracted")
+                    yield line[2:].decode()
+                    # loop.call_soon_threadsafe(callback, line[2:].decode(), next(c))
+
+            await proc.wait()
+        finally:
+            # if we were cancelled (or the caller stopped reading),
+            # don't leave 7z writing files behind us
+            if proc.returncode is None:
+                try:
+                    proc.kill()
+                except ProcessLookupError:
+                    # finished in the meantime
+                    pass
 
         if proc.returncode: # non-zero
             raise ExternalProcessError(proc.returncode)
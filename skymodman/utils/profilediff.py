@@ -0,0 +1,313 @@
+"""
+Compare the saved states of two profiles: which mods each one has,
+which are enabled, the order they are in, and which files are hidden.
+
+Only the profiles' files (``modinfo.json`` and ``hiddenfiles.json``)
+are read; neither profile needs to be loaded.
+"""
+
+import json
+from bisect import bisect_left
+from collections import namedtuple
+from os.path import join as _join
+
+__all__ = ["ProfileDiff", "diff_profiles", "diff_mods", "diff_hidden",
+           "iter_json"]
+
+ProfileDiff = namedtuple("ProfileDiff",
+                         "added removed enabled disabled moved "
+                         "hidden unhidden")
+ProfileDiff.__doc__ = """
+The changes needed to go from one profile (A) to another (B).
+
+    * added: keys of the mods in B but not in A, in B's order
+    * removed: keys of the mods in A but not in B, in A's order
+    * enabled: keys of mods disabled in A but enabled in B
+    * disabled: keys of mods enabled in A but disabled in B
+    * moved: keys of mods in both profiles whose place in B's order
+      differs from A's, in B's order. This is as few mods as
+      possible: all other shared mods keep their relative order.
+    * hidden: mapping of mod keys to the sorted paths of files that
+      are hidden in B but not in A
+    * unhidden: likewise, for files hidden in A but not in B
+"""
+
+# how much of a file to read at a time while decoding it
+_CHUNK_SIZE = 1 << 16
+
+
+def diff_profiles(profile_a, profile_b):
+    """
+    Compare the saved mod lists and hidden files of two profiles.
+
+    :param skymodman.types.Profile profile_a:
+    :param skymodman.types.Profile profile_b:
+    :rtype: ProfileDiff
+    """
+    mods = diff_mods(_read_modinfo(profile_a.modinfo),
+                     _read_modinfo(profile_b.modinfo))
+
+    hidden, unhidden = diff_hidden(
+        _read_hidden_files(profile_a.hidden_files),
+        _read_hidden_files(profile_b.hidden_files))
+
+    return ProfileDiff(*mods, hidden, unhidden)
+
+
+def diff_mods(mods_a, mods_b):
+    """
+    Compare two ordered mod lists.
+
+    Mod keys are unique within each list, so the longest common
+    subsequence of the two orders (the mods that did *not* move) is
+    found as in a patience diff: take the position in A of each shared
+    mod, in B's order, and find the longest increasing run of those
+    positions. This takes O(n log n) time rather than the O(n^2) of a
+    general LCS.
+
+    :param mods_a: iterable of (key, enabled) pairs, in order
+    :param mods_b: same, for the other profile; consumed only once
+    :return: (added, removed, enabled, disabled, moved), as described
+        for ``ProfileDiff``
+    """
+    # key -> (position, enabled)
+    in_a = {}
+    for key, enabled in mods_a:
+        in_a[key] = (len(in_a), bool(enabled))
+
+    added, enabled, disabled = [], [], []
+    # the shared mods in B's order, and their positions in A
+    shared, positions = [], []
+
+    for key, now_enabled in mods_b:
+        try:
+            pos, was_enabled = in_a[key]
+        except KeyError:
+            added.append(key)
+            continue
+
+        shared.append(key)
+        positions.append(pos)
+
+        if bool(now_enabled) != was_enabled:
+            (enabled if now_enabled else disabled).append(key)
+
+    kept = _longest_increasing(positions)
+    moved = [k for i, k in enumerate(shared) if i not in kept]
+
+    seen = set(shared)
+    removed = [k for k in in_a if k not in seen]
+
+    return added, removed, enabled, disabled, moved
+
+
+def diff_hidden(hidden_a, hidden_b):
+    """
+    Compare two sets of hidden files.
+
+    :param hidden_a: iterable of (mod key, collection of paths) pairs
+    :param hidden_b: same, for the other profile
+    :return: (hidden, unhidden), as described for ``ProfileDiff``
+    """
+    before = {mod: set(paths) for mod, paths in hidden_a}
+
+    hidden, unhidden = {}, {}
+
+    for mod, paths in hidden_b:
+        paths = set(paths)
+        old = before.pop(mod, set())
+
+        if paths - old:
+            hidden[mod] = sorted(paths - old)
+        if old - paths:
+            unhidden[mod] = sorted(old - paths)
+
+    # anything left was only hidden in A
+    for mod, paths in before.items():
+        if paths:
+            unhidden[mod] = sorted(paths)
+
+    return hidden, unhidden
+
+
+def iter_json(path):
+    """
+    Decode the JSON file at `path` one top-level item at a time: if it
+    holds an array, yield its elements; if an object, yield its
+    (key, value) pairs. Only the item being decoded (and a bit of
+    the file) is held in memory.
+
+    A missing or blank file yields nothing. Other malformed content
+    raises ``json.JSONDecodeError``.
+
+    :param str|pathlib.Path path:
+    """
+    try:
+        f = open(path)
+    except FileNotFoundError:
+        return
+
+    with f:
+        yield from _JSONItems(f)
+
+
+# <editor-fold desc="helpers">
+
+def _read_modinfo(path):
+    """Yield (key, enabled) for each mod saved in a modinfo file"""
+    for entry in iter_json(path):
+        # see disk.py for the defaults of missing fields
+        yield entry["directory"], entry.get("enabled", 1)
+
+
+def _read_hidden_files(path):
+    """Yield (mod key, list of paths) for each mod with hidden files"""
+    for mod, tree in iter_json(path):
+        yield mod, list(_flatten(tree, ""))
+
+
+def _flatten(tree, parent):
+    """Paths of the files in a saved tree of hidden files, in which a
+    dict is a directory and a list holds the names of files"""
+    for key, value in tree.items():
+        if isinstance(value, list):
+            yield from (_join(parent, name) for name in value)
+        else:
+            yield from _flatten(value, _join(parent, key))
+
+
+def _longest_increasing(seq):
+    """
+    :param list[int] seq: distinct integers
+    :return: the indices in `seq` of one of its longest strictly
+        increasing subsequences
+    :rtype: set[int]
+    """
+    # tails[k] is the smallest value that ends an increasing run of
+    # length k+1 found so far (patience sorting); tail_idx[k] is the
+    # index of that value, and prev[i] the index of the element
+    # before seq[i] in the best run ending at i
+    tails, tail_idx = [], []
+    prev = [-1] * len(seq)
+
+    for i, v in enumerate(seq):
+        k = bisect_left(tails, v)
+        if k:
+            prev[i] = tail_idx[k-1]
+        if k == len(tails):
+            tails.append(v)
+            tail_idx.append(i)
+        else:
+            tails[k] = v
+            tail_idx[k] = i
+
+    result = set()
+    i = tail_idx[-1] if tail_idx else -1
+    while i >= 0:
+        result.add(i)
+        i = prev[i]
+    return result
+
+
+class _JSONItems:
+    """Iterator behind ``iter_json()``"""
+
+    _ws = " \t\n\r"
+    # characters that can follow a complete value
+    _ends = _ws + ",:]}"
+
+    def __init__(self, file):
+        self._file = file
+        self._buf = ""
+        self._pos = 0
+        self._eof = False
+        self._decode = json.JSONDecoder().raw_decode
+
+    def __iter__(self):
+        opener = self._next_char()
+        if opener is None:
+            # blank file
+            return
+        if opener not in "[{":
+            self._fail("Expecting '[' or '{'")
+
+        closer = "]" if opener == "[" else "}"
+        self._pos += 1
+
+        first = True
+        while True:
+            c = self._next_char()
+            if c == closer:
+                return
+            if not first:
+                if c != ",":
+                    self._fail(f"Expecting ',' or '{closer}'")
+                self._pos += 1
+            first = False
+
+            if opener == "[":
+                yield self._value()
+            else:
+                key = self._value()
+                if not isinstance(key, str):
+                    self._fail("Expecting property name")
+                if self._next_char() != ":":
+                    self._fail("Expecting ':'")
+                self._pos += 1
+                yield key, self._value()
+
+    def _fill(self):
+        """Read another chunk of the file; return False at the end"""
+        if self._eof:
+            return False
+        chunk = self._file.read(_CHUNK_SIZE)
+        if not chunk:
+            self._eof = True
+            return False
+        # drop what's been consumed
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _next_char(self):
+        """Skip whitespace; return the next character without
+        consuming it, or None at the end of the file"""
+        while True:
+            buf, pos = self._buf, self._pos
+            while pos < len(buf) and buf[pos] in self._ws:
+                pos += 1
+            self._pos = pos
+            if pos < len(buf):
+                return buf[pos]
+            if not self._fill():
+                return None
+
+    def _value(self):
+        """Decode the value starting at the next non-whitespace
+        character, reading more of the file as needed"""
+        if self._next_char() is None:
+            self._fail("Expecting value")
+
+        while True:
+            try:
+                value, end = self._decode(self._buf, self._pos)
+            except json.JSONDecodeError:
+                # might just be cut off by the end of the chunk
+                if self._fill():
+                    continue
+                raise
+
+            # a number cut off by the end of the buffer (e.g. '1.' of
+            # '1.5') can decode to the wrong value; make sure it's
+            # followed by something that can end it
+            if (end == len(self._buf) or self._buf[end] not in self._ends) \
+                    and self._fill():
+                continue
+
+            self._pos = end
+            return value
+
+    def _fail(self, msg):
+        raise json.JSONDecodeError(msg, self._buf, self._pos)
+
+# </editor-fold>
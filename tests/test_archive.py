@@ -0,0 +1,78 @@
+from skymodman.utils.archive import ArchiveListing, _prefix_bounds
+
+import pytest
+
+DIRS = ["Data/", "Data/Textures/", "data/meshes/", "Data Files/",
+        "Data Files/Scripts/", "Data2/", "fomod/"]
+
+FILES = ["Data/plugin.esp", "Data/Textures/a.dds", "data/meshes/b.nif",
+         "Data Files/readme.txt", "Data Files/Scripts/c.pex",
+         "Data2/d.esp", "fomod/ModuleConfig.xml", "readme.txt"]
+
+
+@pytest.fixture
+def listing():
+    return ArchiveListing(DIRS, FILES)
+
+
+def test_prefix_bounds():
+    keys = sorted(["data files/x", "data/", "data/a", "data/b/c",
+                   "data2/", "fomod/"])
+
+    start, stop = _prefix_bounds(keys, "data/")
+    assert keys[start:stop] == ["data/", "data/a", "data/b/c"]
+
+    # an empty prefix matches everything
+    assert _prefix_bounds(keys, "") == (0, len(keys))
+
+    # no matches: an empty slice where the prefix would go
+    start, stop = _prefix_bounds(keys, "meshes/")
+    assert start == stop
+
+
+@pytest.mark.parametrize("root", ["", "/"])
+def test_root(listing, root):
+    assert listing.count(root) == len(DIRS) + len(FILES) == len(listing)
+    assert listing.subtree(root) == listing.dirs + listing.files
+
+
+@pytest.mark.parametrize("folder", ["Data", "data", "DATA/", "/data/"])
+def test_case_insensitive(listing, folder):
+    # "Data/..." and "data/meshes/..." are all within the same folder
+    assert listing.subtree(folder) == [
+        "Data/", "data/meshes/", "Data/Textures/",
+        "data/meshes/b.nif", "Data/plugin.esp", "Data/Textures/a.dds"]
+
+
+def test_sibling_prefixes(listing):
+    # "data/" must not pick up "Data Files/" or "Data2/", though they
+    # sort right next to it
+    assert listing.count("data", dirs=False) == 3
+    assert listing.subtree("data files", dirs=False) == [
+        "Data Files/readme.txt", "Data Files/Scripts/c.pex"]
+    assert listing.subtree("data2") == ["Data2/", "Data2/d.esp"]
+
+
+def test_dirs_or_files(listing):
+    assert listing.subtree("data files", files=False) == [
+        "Data Files/", "Data Files/Scripts/"]
+    assert listing.count("data files", files=False) == 2
+    assert listing.count("data files", dirs=False) == 2
+    assert listing.count("data files", dirs=False, files=False) == 0
+    assert listing.subtree("data files", dirs=False, files=False) == []
+
+
+def test_own_entry(listing):
+    # the folder's own entry counts as one of its directories...
+    assert listing.count("fomod") == 2
+    assert listing.subtree("fomod", files=False) == ["fomod/"]
+    # ...but not of its files
+    assert listing.count("fomod", dirs=False) == 1
+
+    # a folder with no entry of its own (only implied by its files)
+    only_files = ArchiveListing([], ["textures/a.dds", "textures/b.dds"])
+    assert only_files.count("textures") == 2
+    assert only_files.count("textures", files=False) == 0
+
+    assert listing.count("missing") == 0
+    assert listing.subtree("missing") == []
@@ -0,0 +1,258 @@
+from skymodman.types.archivefs import ArchiveFS, CompactArchiveFS
+from skymodman.types.archivefs.fserrors import Error_ENOENT, Error_EIO, \
+    Error_ENOTDIR
+
+import pytest
+
+listing = ["Data/Meshes/a.nif", "data/textures/B.dds",
+           "Data/Textures/c.dds", "fomod/ModuleConfig.xml",
+           "readme.txt"]
+
+def _paths(fs):
+    return sorted(str(p).lower() for p in fs.itertree())
+
+@pytest.fixture(params=[ArchiveFS, CompactArchiveFS],
+                ids=lambda t: t.__name__)
+def fs(request):
+    return request.param.from_listing(sorted(listing, key=str.lower))
+
+
+def test_from_listing_matches_touch(fs):
+    touched = type(fs)()
+    for e in listing:
+        touched.touch("/" + e)
+
+    assert _paths(fs) == _paths(touched)
+    assert sorted(fs.ls("/")) == sorted(touched.ls("/"))
+
+
+def test_inodeof_case_insensitive(fs):
+    assert fs.inodeof("/DATA/textures/b.DDS") == \
+           fs.inodeof("/data/Textures/B.dds")
+
+    with pytest.raises(Error_ENOENT):
+        fs.inodeof("/data/textures/nope.dds")
+
+
+def test_rename_and_move_update_lookups(fs):
+    fs.chname("/data/textures", "Tex")
+    assert fs.exists("/data/tex/c.dds")
+    assert not fs.exists("/data/textures/c.dds")
+
+    fs.move("/data/tex", "/fomod")
+    assert fs.exists("/fomod/tex/b.dds")
+    assert not fs.exists("/data/tex")
+
+    fs.rename("/readme.txt", "/fomod/readme.md")
+    assert fs.exists("/fomod/README.MD")
+    assert not fs.exists("/readme.txt")
+
+
+def test_remove(fs):
+    fs.rm("/readme.txt")
+    assert not fs.exists("/readme.txt")
+
+    fs.rmtree("/data")
+    assert not fs.exists("/data/meshes/a.nif")
+    assert _paths(fs) == ["/fomod", "/fomod/moduleconfig.xml"]
+
+    # names can be reused once removed
+    fs.touch("/Data/new.esp")
+    assert fs.exists("/data/NEW.esp")
+
+
+def test_cached_paths_follow_moved_directory(fs):
+    b_dds = fs.inodeof("/data/textures/b.dds")
+    assert str(fs.pathfor(b_dds)) == "/Data/textures/B.dds"
+    assert "B.dds" in fs.ls("/data/textures")
+
+    fs.move("/data/textures", "/fomod")
+    assert str(fs.pathfor(b_dds)) == "/fomod/textures/B.dds"
+    assert "textures" in fs.ls("/fomod")
+    assert "textures" not in fs.ls("/data")
+
+    fs.chname("/fomod/textures/b.dds", "b2.dds")
+    assert str(fs.pathfor(b_dds)) == "/fomod/textures/b2.dds"
+    assert sorted(fs.ls("/fomod/textures")) == ["b2.dds", "c.dds"]
+
+
+def test_caches_are_bounded():
+    fs = ArchiveFS.from_listing([f"dir/file{i}" for i in range(100)])
+    fs.caches["pathfor"].maxsize = 10
+
+    for i in range(100):
+        fs.pathfor(fs.inodeof(f"/dir/file{i}"))
+
+    assert len(fs.caches["pathfor"]) == 10
+
+
+def test_snapshot_restore(fs):
+    before = _paths(fs)
+    snap = fs.snapshot()
+
+    fs.move("/data/textures", "/fomod")
+    fs.chname("/readme.txt", "README.md")
+    fs.rmtree("/data")
+    after = _paths(fs)
+    assert after != before
+
+    fs.restore(snap)
+    assert _paths(fs) == before
+    assert fs.exists("/data/textures/b.dds")
+
+    # the snapshot is unaffected by changes made after a restore
+    fs.rm("/readme.txt")
+    fs.restore(snap)
+    assert _paths(fs) == before
+
+
+def test_mkdupefs_is_independent(fs):
+    dupe = fs.mkdupefs()
+    before = _paths(fs)
+
+    dupe.chname("/data/meshes", "m")
+    dupe.touch("/data/m/new.nif")
+    fs.rm("/fomod/moduleconfig.xml")
+
+    assert dupe.exists("/data/m/new.nif")
+    assert not dupe.exists("/data/meshes")
+    assert dupe.exists("/fomod/moduleconfig.xml")
+
+    assert fs.exists("/data/meshes/a.nif")
+    assert not fs.exists("/data/m")
+    assert _paths(fs) == [p for p in before
+                          if p != "/fomod/moduleconfig.xml"]
+
+
+def test_batch_flatten(fs):
+    data = fs.inodeof("/data")
+    meshes = fs.inodeof("/data/meshes")
+
+    with fs.batch() as b:
+        for p in fs.iterdir("/data"):
+            b.move(p, "/")
+        b.remove("/data")
+
+    assert _paths(fs) == ["/fomod", "/fomod/moduleconfig.xml",
+                          "/meshes", "/meshes/a.nif", "/readme.txt",
+                          "/textures", "/textures/b.dds",
+                          "/textures/c.dds"]
+    assert b.changes.removed == {data}
+    assert meshes in b.changes.moved
+    assert fs.ROOT_INODE in b.changes.dirs
+
+
+def test_batch_swap_names(fs):
+    with fs.batch() as b:
+        b.chname("/data", "fomod")
+        b.chname("/fomod", "data")
+
+    assert fs.exists("/fomod/meshes/a.nif")
+    assert fs.exists("/data/moduleconfig.xml")
+
+
+def test_batch_validation_is_atomic(fs):
+    from skymodman.types.archivefs.fserrors import Error_EEXIST, \
+        Error_EINVAL
+
+    before = _paths(fs)
+
+    with pytest.raises(Error_EEXIST):
+        with fs.batch() as b:
+            b.move("/data/textures/c.dds", "/")
+            b.rename("/fomod/moduleconfig.xml", "/readme.txt")
+
+    with pytest.raises(Error_EINVAL):
+        with fs.batch() as b:
+            b.move("/data", "/data/meshes")
+
+    assert _paths(fs) == before
+
+
+@pytest.mark.parametrize("load_type", [ArchiveFS, CompactArchiveFS],
+                         ids=lambda t: t.__name__)
+def test_serialization_roundtrip(fs, load_type):
+    # include an edit, a deletion and an empty directory
+    fs.move("/data/textures", "/")
+    fs.rm("/readme.txt")
+    fs.mkdir("/empty")
+
+    loaded = load_type.from_bytes(fs.to_bytes())
+
+    assert _paths(loaded) == _paths(fs)
+    assert loaded.is_dir("/empty")
+    assert not loaded.exists("/readme.txt")
+    assert loaded.inodeof("/TEXTURES/b.dds") == fs.inodeof("/textures/b.dds")
+
+    # still fully usable
+    loaded.touch("/Data/new.esp")
+    assert loaded.exists("/data/NEW.esp")
+
+
+def test_from_bytes_rejects_garbage():
+    with pytest.raises(ValueError):
+        ArchiveFS.from_bytes(b"not an archivefs")
+
+
+def _globbed(fs, pattern, **kwargs):
+    return sorted(str(fs.pathfor(i)).lower()
+                  for i in fs.glob(pattern, **kwargs))
+
+
+def test_glob(fs):
+    assert _globbed(fs, "**/*.DDS") == ["/data/textures/b.dds",
+                                        "/data/textures/c.dds"]
+    assert _globbed(fs, "data/*/?.nif") == ["/data/meshes/a.nif"]
+    assert _globbed(fs, "*.txt") == ["/readme.txt"]
+    assert _globbed(fs, "**/textures") == ["/data/textures"]
+    assert _globbed(fs, "data/**", files=False) == [
+        "/data", "/data/meshes", "/data/textures"]
+    assert _globbed(fs, "**/[ab].*") == ["/data/meshes/a.nif",
+                                         "/data/textures/b.dds"]
+    assert _globbed(fs, "nope/**/*") == []
+
+
+def test_find(fs):
+    def found(**kwargs):
+        return sorted(fs.inode_table[i].name.lower()
+                      for i in fs.find(**kwargs))
+
+    assert found(suffixes={".dds", "NIF"}) == ["a.nif", "b.dds", "c.dds"]
+    assert found(name="*o*", files=False) == ["fomod"]
+    assert found(maxdepth=1) == ["data", "fomod", "readme.txt"]
+    assert found(root="/data", dirs=False, name="[bc].*") == ["b.dds",
+                                                              "c.dds"]
+
+
+def test_subfs_view(fs):
+    view = fs.mksubfs("/data")
+
+    assert _paths(view) == ["/meshes", "/meshes/a.nif", "/textures",
+                            "/textures/b.dds", "/textures/c.dds"]
+
+    # changes in either are visible in the other
+    view.touch("/plugin.esp")
+    assert fs.exists("/data/plugin.esp")
+    fs.move("/data/textures/c.dds", "/data/meshes")
+    assert view.exists("/meshes/c.dds")
+
+    # the view follows its root when it's moved
+    fs.mkdir("/mod")
+    fs.move("/data", "/mod")
+    assert view.exists("/plugin.esp")
+    assert str(view.root_in_fs).lower() == "/mod/data"
+
+    # items outside the root can't be reached
+    with pytest.raises(Error_EIO):
+        view.pathfor(fs.inodeof("/readme.txt"))
+
+    snap = fs.snapshot()
+    view.rmtree("/meshes")
+    assert not fs.exists("/mod/data/meshes/a.nif")
+    fs.restore(snap)
+    assert view.exists("/meshes/c.dds")
+
+
+def test_subfs_requires_directory(fs):
+    with pytest.raises(Error_ENOTDIR):
+        fs.mksubfs("/readme.txt")
@@ -0,0 +1,215 @@
+from skymodman.installer import fomod
+from skymodman.installer.common import *
+from skymodman.installer.fomodconfig import parse_config
+
+CONFIG = b"""<?xml version="1.0" encoding="utf-8"?>
+<config>
+  <moduleName position="Left">Some Mod v1.2</moduleName>
+  <moduleImage path="fomod\\images\\main.png" height="200"/>
+  <moduleDependencies operator="Or">
+    <fileDependency file="Skyrim.esm" state="Active"/>
+    <flagDependency flag="x" value="On"/>
+  </moduleDependencies>
+  <requiredInstallFiles>
+    <folder source="Core" destination=""/>
+    <file source="core\\plugin.esp" priority="2"/>
+  </requiredInstallFiles>
+  <installSteps order="Explicit">
+    <installStep name="Options">
+      <visible>
+        <dependencies operator="And">
+          <flagDependency flag="a" value="1"/>
+        </dependencies>
+      </visible>
+      <optionalFileGroups order="Explicit">
+        <group name="Textures" type="SelectExactlyOne">
+          <plugins order="Explicit">
+            <plugin name="Hi-Res">
+              <description>
+  Big textures.
+
+
+  Really big.
+              </description>
+              <image path="fomod\\hires.jpg"/>
+              <files>
+                <folder source="Textures\\HiRes" destination="textures"
+                        priority="1"/>
+              </files>
+              <conditionFlags>
+                <flag name="hires">On</flag>
+              </conditionFlags>
+              <typeDescriptor>
+                <dependencyType>
+                  <defaultType name="Optional"/>
+                  <patterns>
+                    <pattern>
+                      <dependencies operator="Or">
+                        <fileDependency file="Other.esp" state="Missing"/>
+                      </dependencies>
+                      <type name="NotUsable"/>
+                    </pattern>
+                  </patterns>
+                </dependencyType>
+              </typeDescriptor>
+            </plugin>
+            <plugin name="Lo-Res">
+              <description>Small.</description>
+              <typeDescriptor><type name="Recommended"/></typeDescriptor>
+            </plugin>
+          </plugins>
+        </group>
+      </optionalFileGroups>
+    </installStep>
+  </installSteps>
+  <conditionalFileInstalls>
+    <patterns>
+      <pattern>
+        <dependencies>
+          <flagDependency flag="hires" value="On"/>
+        </dependencies>
+        <files><file source="extra.esp"/></files>
+      </pattern>
+    </patterns>
+  </conditionalFileInstalls>
+</config>
+"""
+
+
+def test_parse_config():
+    config = parse_config(CONFIG)
+
+    assert config.modname.name == "Some Mod v1.2"
+    assert config.modname.position == Position.L
+    assert config.modimage == ModImage("fomod/images/main.png",
+                                       True, True, 200)
+    assert config.all_images == ["fomod/images/main.png",
+                                 "fomod/hires.jpg"]
+
+    assert config.moddeps.operator == Operator.OR
+    assert list(config.moddeps) == [
+        ("fileDependency", FileDep("Skyrim.esm", FileState.A)),
+        ("flagDependency", FlagDep("x", "On"))]
+
+    assert config.reqfiles == [
+        File("folder", "Core", "", 0, False, False),
+        File("file", "core/plugin.esp", "core/plugin.esp", 2, False,
+             False)]
+
+    step, = config.installsteps
+    assert step.name == "Options"
+    assert step.visible.flagDependency == [FlagDep("a", "1")]
+
+    group, = step.optionalFileGroups
+    assert group.type == GroupType.EXO
+    assert group.plugin_order == "Explicit"
+
+    hires, lores = group.plugins
+    assert hires.description == "Big textures.\n\n  Really big."
+    assert hires.image == "fomod/hires.jpg"
+    assert hires.conditionFlags == [Flag("hires", "On")]
+    assert hires.files == [File("folder", "Textures/HiRes", "textures",
+                                1, False, False)]
+    assert hires.type == PluginType.OPT
+    pattern, = hires.patterns
+    assert pattern.type == PluginType.NOT
+    assert pattern.dependencies.operator == Operator.OR
+    assert pattern.dependencies.fileDependency == [
+        FileDep("Other.esp", FileState.M)]
+
+    assert lores.type == PluginType.REC
+    assert lores.files == [] and lores.patterns == []
+
+    cond, = config.condinstalls
+    assert cond.dependencies.flagDependency == [FlagDep("hires", "On")]
+    assert [f.source for f in cond.files] == ["extra.esp"]
+
+
+def test_config_cache(tmpdir):
+    path = tmpdir.join("ModuleConfig.xml")
+    path.write_binary(CONFIG)
+
+    a = fomod.Fomod(str(path), None, "mod.7z")
+    b = fomod.Fomod(str(path), None, "mod.7z")
+    assert a.installsteps is b.installsteps
+
+    # each gets its own install list
+    a.mark_file_for_install(a.reqfiles[0], False)
+    assert len(b.files_to_install) == 2
+
+    path.write_binary(CONFIG.replace(b"Some Mod", b"Other Mod"))
+    c = fomod.Fomod(str(path), None, "mod.7z")
+    assert c.modname.name == "Other Mod v1.2"
+
+
+def test_conditions():
+    queried = []
+
+    def file_states(files):
+        queried.append(set(files))
+        return {"skyrim.esm": FileState.A}
+
+    f = fomod.Fomod(CONFIG, file_states)
+
+    # all file states are looked up at once
+    assert queried == [{"Skyrim.esm", "Other.esp"}]
+
+    # Or: satisfied by the active file alone, whatever the flags
+    assert f.check_dependencies_pattern(f.moddeps)
+    assert not f.conditions.compile(f.moddeps).flags
+
+    step = f.installsteps[0]
+    hires = step.optionalFileGroups[0].plugins[0]
+    cond = f.condinstalls[0].dependencies
+
+    assert f.check_dependencies_pattern(hires.patterns[0].dependencies)
+    assert not f.check_dependencies_pattern(step.visible)
+    assert not f.check_dependencies_pattern(cond)
+
+    # only the conditions reading the flag are re-evaluated
+    assert f.set_flag("hires", "On") == [cond]
+    assert f.check_dependencies_pattern(cond)
+    assert f.set_flag("hires", "On") == []
+    assert f.unset_flag("hires") == [cond]
+    assert not f.check_dependencies_pattern(cond)
+
+
+def test_install_selection():
+    from skymodman.installer.selection import InstallSelection
+
+    a = File("file", "A.esp", "", 1, False, False)
+    b = File("folder", "b", "textures", 0, False, False)
+    b_hi = b._replace(source="B", priority=2)
+
+    sel = InstallSelection([a, b])
+    sel.add(b_hi)
+    assert list(sel) == [a, b_hi]
+    assert sel.in_install_order() == [a, b_hi]
+
+    # selected twice, so stays until both are discarded
+    sel.discard(b)
+    assert b in sel
+    assert sel.in_install_order() == [a, b_hi]
+    sel.discard(b)  # already discarded; no change
+    assert b in sel
+    sel.discard(b_hi)
+    assert list(sel) == [a]
+
+    sel.discard(b)  # not selected; no error
+    assert len(sel) == 1
+
+
+def test_install_selection_discard_highest():
+    from skymodman.installer.selection import InstallSelection
+
+    lo = File("file", "a.esp", "", 0, False, False)
+    hi = lo._replace(priority=5)
+
+    sel = InstallSelection([lo, hi])
+    assert sel.in_install_order() == [hi]
+
+    # the remaining selection drops back to its own priority
+    sel.discard(hi)
+    assert sel.in_install_order() == [lo]
+    sel.discard(lo)
+    assert sel.in_install_order() == []
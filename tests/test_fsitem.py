@@ -0,0 +1,46 @@
+from skymodman.types import FSItem
+
+import pytest
+
+PATHS = sorted(["a/b/c.txt", "a/b.txt", "a/b/d/e.txt", "a/z.txt",
+                "a-x/q", "b.txt", "meta.ini", "c/meta.ini/f"])
+
+
+@pytest.fixture
+def tree():
+    root = FSItem("", "data")
+    files = FSItem.build_filetree(
+        root, PATHS, name_filter=lambda n: n.lower() == "meta.ini")
+    return root, files
+
+
+def test_build_filetree(tree):
+    root, files = tree
+
+    # filtered names are skipped, along with their contents
+    assert [f.path for f in files] == ["a-x/q", "a/b.txt", "a/b/c.txt",
+                                       "a/b/d/e.txt", "a/z.txt", "b.txt"]
+    assert root.span == range(6)
+
+    # directories before files, rows in order
+    a = root["a"]
+    assert [c.name for c in a.iterchildren()] == ["b", "b.txt", "z.txt"]
+    assert [c.row for c in a.iterchildren()] == [0, 1, 2]
+    assert root["c"] is None
+
+    # each item covers a contiguous range of the flattened list
+    assert a.span == range(1, 5)
+    assert a["b"].span == range(2, 4)
+    for i, f in enumerate(files):
+        assert f.span == range(i, i+1)
+        assert f.parent[f.row] is f
+
+
+def test_build_subtree():
+    root = FSItem("a", "a")
+    files = FSItem.build_filetree(
+        root, [p for p in PATHS if p.startswith("a/")], start=1)
+
+    assert root.span == range(1, 5)
+    assert root["b"]["d"].path == "a/b/d"
+    assert [f.span.start for f in files] == [1, 2, 3, 4]
@@ -0,0 +1,121 @@
+import asyncio
+import time
+
+from skymodman import metrics
+
+import pytest
+
+
+@pytest.fixture
+def recording():
+    was_enabled = metrics.is_enabled()
+    metrics.reset()
+    metrics.enable()
+    yield
+    metrics.reset()
+    if not was_enabled:
+        metrics.disable()
+
+
+def histograms():
+    return metrics.snapshot()["histograms"]
+
+
+def test_disabled():
+    metrics.disable()
+    metrics.reset()
+
+    @metrics.timed
+    def f(x):
+        return x * 2
+
+    assert f(2) == 4
+    with metrics.span("block"):
+        pass
+    metrics.count("things")
+    metrics.observe("sizes", 3)
+
+    assert metrics.snapshot() == {"histograms": {}, "counters": {}}
+
+
+def test_timed(recording):
+    @metrics.timed
+    def f(x):
+        return x * 2
+
+    @metrics.timed("named")
+    def g():
+        raise ValueError
+
+    assert f(2) == 4
+    assert f(3) == 6
+    with pytest.raises(ValueError):
+        g()
+
+    hists = histograms()
+    assert hists[f.__qualname__]["count"] == 2
+    # failures are timed, too
+    assert hists["named"]["count"] == 1
+
+
+def test_timed_generator(recording):
+    @metrics.timed("gen")
+    def gen():
+        yield 1
+        time.sleep(0.01)
+        yield 2
+
+    items = []
+    for item in gen():
+        items.append(item)
+        # time spent by the caller doesn't count
+        time.sleep(0.05)
+
+    assert items == [1, 2]
+    gen_time = histograms()["gen"]
+    assert gen_time["count"] == 1
+    assert 0.01 <= gen_time["total"] < 0.05
+
+
+def test_timed_async(recording):
+    @metrics.timed("coro")
+    async def coro():
+        await asyncio.sleep(0.01)
+        return 5
+
+    @metrics.timed("agen")
+    async def agen():
+        for i in range(3):
+            await asyncio.sleep(0)
+            yield i
+
+    async def run():
+        return await coro(), [i async for i in agen()]
+
+    assert asyncio.run(run()) == (5, [0, 1, 2])
+
+    hists = histograms()
+    assert hists["coro"]["total"] >= 0.01
+    assert hists["agen"]["count"] == 1
+
+
+def test_counts_and_report(recording):
+    metrics.count("rows", 10)
+    metrics.count("rows", 5)
+    for v in (1, 2, 3, 100):
+        metrics.observe("sizes", v)
+    with metrics.span("block"):
+        pass
+
+    snap = metrics.snapshot()
+    assert snap["counters"] == {"rows": 15}
+
+    sizes = snap["histograms"]["sizes"]
+    assert (sizes["count"], sizes["min"], sizes["max"]) == (4, 1, 100)
+    assert sizes["mean"] == 26.5
+    # estimated from power-of-two buckets
+    assert 2 <= sizes["p50"] <= 4
+    assert sizes["p95"] == 100
+
+    text = metrics.report()
+    assert "rows" in text and "sizes" in text and "block" in text
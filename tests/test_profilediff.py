@@ -0,0 +1,112 @@
+import json
+import random
+from types import SimpleNamespace
+
+from skymodman.utils import profilediff
+from skymodman.utils.profilediff import (diff_mods, diff_hidden,
+                                         diff_profiles, iter_json)
+
+import pytest
+
+
+@pytest.fixture(params=[1, 7, 1 << 16])
+def chunk_size(request, monkeypatch):
+    monkeypatch.setattr(profilediff, "_CHUNK_SIZE", request.param)
+
+
+@pytest.mark.parametrize("data", [
+    [],
+    [{"directory": "a", "enabled": 1}, {"directory": "b", "modid": 1234}],
+    {"mod": {"dir": {"_files": ["x.dds"]}, "_files": ["y.esp"]}, "other": {}},
+    [12345, -1.5e10, "str\"ing", None, True, [[]], {}],
+])
+def test_iter_json(tmp_path, chunk_size, data):
+    path = tmp_path / "data.json"
+    path.write_text(json.dumps(data, indent=1))
+
+    expect = list(data.items()) if isinstance(data, dict) else data
+    assert list(iter_json(path)) == expect
+
+
+def test_iter_json_empty(tmp_path):
+    assert list(iter_json(tmp_path / "missing.json")) == []
+
+    path = tmp_path / "blank.json"
+    path.write_text("  \n")
+    assert list(iter_json(path)) == []
+
+    path.write_text('[{"a": 1}, {"b"')
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json(path))
+
+
+def test_diff_mods():
+    a = [("a", 1), ("b", 1), ("c", 0), ("d", 1), ("e", 1)]
+    b = [("b", 1), ("c", 1), ("a", 1), ("f", 0), ("d", 0)]
+
+    added, removed, enabled, disabled, moved = diff_mods(a, b)
+
+    assert added == ["f"]
+    assert removed == ["e"]
+    assert enabled == ["c"]
+    assert disabled == ["d"]
+    # b, c, d keep their order
+    assert moved == ["a"]
+
+
+def test_moved_is_minimal():
+    rnd = random.Random(5)
+    for _ in range(50):
+        keys = list(range(rnd.randrange(1, 9)))
+        shuffled = keys[:]
+        rnd.shuffle(shuffled)
+
+        moved = diff_mods(((k, 1) for k in keys),
+                          ((k, 1) for k in shuffled))[4]
+
+        # what's left is in order...
+        kept = [k for k in shuffled if k not in moved]
+        assert kept == sorted(kept)
+
+        # ...and as long as the longest common subsequence
+        lcs = [[0] * (len(keys) + 1) for _ in range(len(keys) + 1)]
+        for i, x in enumerate(keys):
+            for j, y in enumerate(shuffled):
+                lcs[i+1][j+1] = (lcs[i][j] + 1 if x == y
+                                 else max(lcs[i][j+1], lcs[i+1][j]))
+        assert len(kept) == lcs[-1][-1]
+
+
+def test_diff_hidden():
+    a = [("m1", ["x", "y"]), ("m2", ["z"])]
+    b = [("m1", ["y", "w"]), ("m3", ["q"])]
+
+    hidden, unhidden = diff_hidden(a, b)
+
+    assert hidden == {"m1": ["w"], "m3": ["q"]}
+    assert unhidden == {"m1": ["x"], "m2": ["z"]}
+
+
+def test_diff_profiles(tmp_path):
+    def profile(name, mods, hidden):
+        folder = tmp_path / name
+        folder.mkdir()
+        (folder / "modinfo.json").write_text(json.dumps(
+            [{"directory": d, "enabled": e} for d, e in mods]))
+        (folder / "hiddenfiles.json").write_text(json.dumps(hidden))
+        return SimpleNamespace(modinfo=folder / "modinfo.json",
+                               hidden_files=folder / "hiddenfiles.json")
+
+    a = profile("a", [("one", 1), ("two", 1)],
+                {"one": {"meshes": {"_files": ["x.nif"]}}})
+    b = profile("b", [("two", 1), ("one", 0), ("three", 1)],
+                {"one": {"meshes": {"_files": ["x.nif", "y.nif"]}}})
+
+    diff = diff_profiles(a, b)
+
+    assert diff.added == ["three"]
+    assert diff.removed == []
+    assert diff.disabled == ["one"]
+    assert len(diff.moved) == 1
+    assert diff.hidden == {"one": ["meshes/y.nif"]}
+    assert diff.unhidden == {}
@@ -0,0 +1,58 @@
+from skymodman.types import ModEntry
+from skymodman.types.searchindex import ModSearchIndex
+
+import pytest
+
+MODS = [ModEntry("skyui", "SkyUI", 3863, "5.1", True),
+        ModEntry("ihud", "Immersive HUD", 3222, "1.0", True),
+        ModEntry("smim", "Static Mesh Improvement Mod", 659, "2.08", True),
+        ModEntry("uskp", "Unofficial Skyrim Patch", 19, "2.1.3", False),
+        ModEntry("strasse", "Straße Textures", 0, "", True)]
+
+
+@pytest.fixture
+def index():
+    return ModSearchIndex(MODS)
+
+
+@pytest.mark.parametrize("text, expect", [
+    ("sky", {"skyui", "uskp"}),
+    ("SKY", {"skyui", "uskp"}),
+    ("immersive hud", {"ihud"}),
+    ("mesh*mod", {"smim"}),
+    ("p?tch", {"uskp"}),
+    ("2.1", {"uskp"}),
+    ("3222", {"ihud"}),
+    ("strasse", {"strasse"}),
+    ("ui*5.1", set()), # wildcards don't span fields
+    ("nothing", set()),
+    ("", {m.key for m in MODS}),
+    ("*", {m.key for m in MODS}),
+])
+def test_find(index, text, expect):
+    assert index.find(text) == expect
+
+
+def test_incremental(index):
+    typed = "static mesh"
+    for i in range(1, len(typed)+1):
+        assert ("smim" in index.find(typed[:i]))
+    assert index.find(typed) == {"smim"}
+
+    # deleting characters works, too
+    assert index.find("s") == {"skyui", "smim", "uskp", "strasse", "ihud"}
+
+
+def test_update(index):
+    mod = MODS[1]
+    index.find("hud")
+
+    renamed = ModEntry(mod.directory, "Less HUD", mod.modid,
+                       mod.version, True)
+    index.update(renamed)
+    assert index.find("immersive") == set()
+    assert index.find("less") == {"ihud"}
+
+    index.discard("ihud")
+    assert index.find("hud") == set()
+    assert "ihud" not in index
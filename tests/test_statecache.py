@@ -0,0 +1,35 @@
+from skymodman.types.statecache import StateCache
+
+
+def test_fingerprint():
+    cache = StateCache(100)
+    cache.put("a", (1, 2), "value", 10)
+
+    assert cache.get("a", (1, 2)) == "value"
+
+    # stale items are dropped
+    assert cache.get("a", (1, 3), "missing") == "missing"
+    assert "a" not in cache
+    assert cache.size == 0
+
+
+def test_eviction():
+    cache = StateCache(100)
+    cache.put("a", 0, "A", 40)
+    cache.put("b", 0, "B", 40)
+
+    # using 'a' makes 'b' the least recently used
+    assert cache.get("a", 0) == "A"
+    cache.put("c", 0, "C", 40)
+
+    assert "b" not in cache
+    assert cache.get("a", 0) == "A" and cache.get("c", 0) == "C"
+    assert cache.size == 80
+
+    # replacing an item releases its old size
+    cache.put("a", 1, "A2", 10)
+    assert cache.size == 50
+
+    # too big to keep at all
+    assert not cache.put("d", 0, "D", 101)
+    assert len(cache) == 2